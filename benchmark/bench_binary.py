@@ -0,0 +1,57 @@
+"""
+Benchmark the binary format against JSON on a national sized tree.
+
+Usage:
+    python benchmark/bench_binary.py [directory]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from thbud.model import BudgetItem, dump_binary, load_binary
+
+from synthetic import national_tree
+
+
+def timeit(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f'{label:<14} {time.perf_counter() - start:.3f}s')
+    return result
+
+
+def save_json(root, path):
+    with open(path, 'w') as f:
+        json.dump(root.to_json(), f, indent=4, ensure_ascii=False)
+
+
+def load_json(path):
+    with open(path) as f:
+        return BudgetItem.from_json(json.load(f))
+
+
+def save_binary(root, path):
+    with open(path, 'wb') as f:
+        dump_binary(root, f)
+
+
+def read_binary(path):
+    with open(path, 'rb') as f:
+        return load_binary(f)
+
+
+if __name__ == '__main__':
+    directory = sys.argv[1] if len(sys.argv) > 1 else tempfile.mkdtemp()
+    json_path = os.path.join(directory, 'tree.json')
+    binary_path = os.path.join(directory, 'tree.thbt')
+    root = national_tree()
+
+    timeit('save json', save_json, root, json_path)
+    timeit('save binary', save_binary, root, binary_path)
+    print(f'json size      {os.path.getsize(json_path) / 1e6:.1f}MB')
+    print(f'binary size    {os.path.getsize(binary_path) / 1e6:.1f}MB')
+    timeit('load json', load_json, json_path)
+    loaded = timeit('load binary', read_binary, binary_path)
+    assert loaded.to_json() == root.to_json()
@@ -0,0 +1,65 @@
+"""
+Benchmark `get_connected_lines` against the pairwise scan it replaced.
+
+Usage:
+    python benchmark/bench_connected_lines.py [rows] [cols]
+"""
+import sys
+import time
+
+from fitz import Rect
+
+from thbud.tableparser.extract import get_connected_lines, is_on_line
+
+
+def pairwise_connected_lines(rects, tolerance=10):
+    connected_lines = {}
+    for rect in rects:
+        start = rect.top_left
+        end = rect.bottom_right
+        connected_lines[rect] = []
+        for line in rects:
+            if line is rect:
+                continue
+            if (is_on_line(line.top_left, start, end, tolerance)
+                    or is_on_line(line.bottom_right, start, end, tolerance)):
+                connected_lines[rect].append(line)
+    return connected_lines
+
+
+def dense_table_rulings(rows, cols, cell_width=40, cell_height=12):
+    """
+    Builds the ruling segments of a `rows` x `cols` table where every cell
+    border is drawn as its own short segment, as budget summary pages do.
+    """
+    rects = []
+    for i in range(rows + 1):
+        for j in range(cols):
+            x, y = j * cell_width, i * cell_height
+            rects.append(Rect(x, y, x + cell_width, y + 0.5))
+    for i in range(rows):
+        for j in range(cols + 1):
+            x, y = j * cell_width, i * cell_height
+            rects.append(Rect(x, y, x + 0.5, y + cell_height))
+    return rects
+
+
+def timeit(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    cols = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    rects = dense_table_rulings(rows, cols)
+
+    expected, pairwise_time = timeit(pairwise_connected_lines, rects)
+    result, grid_time = timeit(get_connected_lines, rects)
+    assert result == expected
+
+    print(f'rects:    {len(rects)}')
+    print(f'pairwise: {pairwise_time:.3f}s')
+    print(f'grid:     {grid_time:.3f}s')
+    print(f'speedup:  {pairwise_time / grid_time:.1f}x')
@@ -0,0 +1,89 @@
+"""
+Benchmark generating and writing the leaf rows of a national tree.
+
+Usage:
+    python benchmark/bench_csv_rows.py [directory]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from thbud.build_csv import iter_csv_rows, write_csv
+from thbud.model import BudgetType
+
+from synthetic import national_tree
+
+
+def timeit(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f'{label:<22} {time.perf_counter() - start:.3f}s')
+    return result
+
+
+def walk_up_rows(root):
+    # the previous build_csv: every leaf walks up to the root
+    result = []
+
+    for node in root.iter_preorder():
+        if node.is_leaf:
+            row = dict(
+                REF_DOC=node.document,
+                REF_PAGE_NO=node.page,
+                ITEM_DESCRIPTION=node.name,
+                AMOUNT=node.amount,
+                OUTPUT='',
+                PROJECT='',
+                FISCAL_YEAR=None,
+            )
+
+            row['OBLIGED?'] = len(node.fiscal_year_budget) > 0
+
+            curr = node.parent
+            categories = []
+            while curr is not None:
+                if curr.budget_type == BudgetType.MINISTRY:
+                    row['MINISTRY'] = curr.name
+
+                if curr.budget_type == BudgetType.BUDGETARY_UNIT:
+                    row['BUDGETARY_UNIT'] = curr.name
+
+                if curr.budget_type == BudgetType.BUDGET_PLAN:
+                    row['BUDGET_PLAN'] = curr.name
+                    row['CROSS_FUNC?'] = curr.name.startswith('แผนงานบูรณาการ')
+
+                if curr.budget_type == BudgetType.PROJECT:
+                    row['PROJECT'] = curr.name
+
+                if curr.budget_type == BudgetType.OUTPUT:
+                    row['OUTPUT'] = curr.name
+
+                if curr.budget_type == BudgetType.BUDGET_DETAIL:
+                    categories.append(curr.name)
+
+                curr = curr.parent
+
+            for i, category in enumerate(reversed(categories)):
+                row[f'CATEGORY_LV{i+1}'] = category
+
+            if len(node.fiscal_year_budget) > 0:
+                for fy_node in node.fiscal_year_budget:
+                    total_year = fy_node.year_end - fy_node.year
+                    for year in range(fy_node.year, fy_node.year_end+1):
+                        copy_row = row.copy()
+                        copy_row['FISCAL_YEAR'] = year
+                        copy_row['AMOUNT'] = fy_node.amount / max(1, total_year)
+                        result.append(copy_row)
+            else:
+                result.append(row)
+
+    return result
+
+
+if __name__ == '__main__':
+    directory = sys.argv[1] if len(sys.argv) > 1 else tempfile.mkdtemp()
+    root = national_tree()
+    timeit('walk up per leaf', lambda: len(walk_up_rows(root)))
+    timeit('iter_csv_rows', lambda: sum(1 for _ in iter_csv_rows(root)))
+    timeit('write_csv', write_csv, iter_csv_rows(root), os.path.join(directory, 'rows.csv'))
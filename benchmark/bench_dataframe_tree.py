@@ -0,0 +1,52 @@
+"""
+Benchmark rebuilding a tree from a 511k-row validation CSV.
+
+Usage:
+    python benchmark/bench_dataframe_tree.py [directory]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from thbud.model import BudgetItem, read_tree_csv
+
+from synthetic import national_tree
+
+
+def timeit(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f'{label:<28} {time.perf_counter() - start:.3f}s')
+    return result
+
+
+def build_by_rows(path):
+    # the per-row dicts can hold only the name column of their level
+    df = pd.read_csv(path, low_memory=False)
+    df['document'] = df['document'].fillna('')
+    rows = [
+        {
+            key: value for key, value in row.items()
+            if not (key.startswith('name_') and value != value)
+        }
+        for row in df.to_dict('records')
+    ]
+    for row in rows:
+        if row['page'] == row['page']:
+            row['page'] = int(row['page'])
+    return BudgetItem.build_tree_by_rows(rows)
+
+
+if __name__ == '__main__':
+    directory = sys.argv[1] if len(sys.argv) > 1 else tempfile.mkdtemp()
+    path = os.path.join(directory, 'tree.csv')
+    root = national_tree([20, 10, 5, 10, 50])
+    rows = root.to_rows()
+    pd.DataFrame(rows).to_csv(path, index=False)
+    print(f'rows: {len(rows)}')
+
+    timeit('read_csv + build_tree_by_rows', build_by_rows, path)
+    timeit('read_tree_csv', read_tree_csv, path)
@@ -0,0 +1,43 @@
+"""
+Benchmark hashing and diffing two national trees that differ in a few nodes.
+
+Usage:
+    python benchmark/bench_diff.py [edits]
+"""
+import random
+import sys
+import time
+
+from thbud.model import diff_trees, subtree_hash
+
+from synthetic import national_tree
+
+
+if __name__ == '__main__':
+    edits = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    old = national_tree()
+    new = national_tree()
+
+    rng = random.Random(0)
+    leaves = [node for node in new.iter_preorder() if node.is_leaf]
+    for leaf in rng.sample(leaves, edits):
+        leaf.amount = leaf.amount + 1
+
+    start = time.perf_counter()
+    subtree_hash(old)
+    subtree_hash(new)
+    print(f'subtree_hash (both trees):   {time.perf_counter() - start:.3f}s')
+
+    start = time.perf_counter()
+    changes = diff_trees(old, new)
+    print(f'diff_trees:                  {time.perf_counter() - start:.4f}s')
+    print(f'{len(changes)} changes for {edits} edited leaves')
+
+    # the hashes are kept on the nodes, so only the edited paths are
+    # hashed again
+    for leaf in rng.sample(leaves, edits):
+        leaf.amount = leaf.amount + 1
+    start = time.perf_counter()
+    changes = diff_trees(old, new)
+    print(f'diff_trees after more edits: {time.perf_counter() - start:.4f}s')
+    print(f'{len(changes)} changes for {2 * edits} edited leaves')
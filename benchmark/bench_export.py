@@ -0,0 +1,64 @@
+"""
+Benchmark exporting a directory of JSON trees to a partitioned CSV dataset
+with a process pool, against loading and writing the trees one by one.
+
+Usage:
+    python benchmark/bench_export.py [workers]
+"""
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+
+from thbud.build_csv import build_csv, write_csv
+from thbud.export import export_directory, list_json_files
+from thbud.model import BudgetItem, dump_json
+
+from synthetic import national_tree
+
+
+def timeit(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f'{label:<22} {time.perf_counter() - start:.3f}s')
+    return result
+
+
+def serial(input_directory, output_path):
+    rows = []
+    for path in list_json_files(input_directory):
+        with open(path, encoding='utf-8') as fp:
+            rows.extend(build_csv(BudgetItem.from_json(json.load(fp))))
+    write_csv(rows, output_path)
+    return len(rows)
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    root = national_tree(fiscal_year_every=5)
+    with tempfile.TemporaryDirectory() as directory:
+        input_directory = os.path.join(directory, '2568')
+        os.mkdir(input_directory)
+        for index, ministry in enumerate(root.children):
+            path = os.path.join(input_directory, f'{index:03d}.json')
+            with open(path, 'w', encoding='utf-8') as fp:
+                dump_json(ministry, fp, ensure_ascii=False, indent=4)
+        print(f'{len(root.children)} files')
+        # forked workers would otherwise copy and collect the whole tree
+        del root, ministry
+        gc.collect()
+
+        count = timeit('serial', serial, input_directory, os.path.join(directory, 'all.csv'))
+        result = timeit(
+            'export_directory', export_directory,
+            input_directory, os.path.join(directory, 'dataset'), 'csv',
+            8, None, workers,
+        )
+        assert sum(result.rows.values()) == count
+        print(f'{count} rows in {len(result.partitions)} partitions')
+
+
+if __name__ == '__main__':
+    main()
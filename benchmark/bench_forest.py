@@ -0,0 +1,44 @@
+"""
+Benchmark BudgetForest rollups against per-node Python checks.
+
+Usage:
+    python benchmark/bench_forest.py
+"""
+import time
+
+from thbud.model import BudgetForest
+
+from synthetic import national_tree
+
+
+def timeit(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f'{label:<22} {time.perf_counter() - start:.3f}s')
+    return result
+
+
+def check_sums(root):
+    inconsistent = 0
+    for node in root.iter_preorder():
+        try:
+            node._check_sum()
+        except ValueError:
+            inconsistent += 1
+    return inconsistent
+
+
+if __name__ == '__main__':
+    root = national_tree()
+    forest = timeit('from_items', BudgetForest.from_items, root)
+    print(f'nodes: {len(forest)}')
+
+    expected = timeit('_check_sum per node', check_sums, root)
+    inconsistent = timeit('inconsistent_sums', forest.inconsistent_sums)
+    assert len(inconsistent) == expected
+
+    timeit('subtree_sums', forest.subtree_sums)
+    timeit('child_counts', forest.child_counts)
+    timeit('depth_histogram', forest.depth_histogram)
+    timeit('totals_by_type', forest.totals_by_type)
+    timeit('to_items', forest.to_items)
@@ -0,0 +1,39 @@
+"""
+Benchmark revalidation after single edits of a tracked national tree.
+
+Usage:
+    python benchmark/bench_incremental.py [edits]
+"""
+import random
+import sys
+import time
+
+from thbud.model import validate
+
+from synthetic import national_tree
+
+
+if __name__ == '__main__':
+    edits = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    root = national_tree()
+    leaves = [node for node in root.iter_preorder() if node.is_leaf]
+
+    start = time.perf_counter()
+    validate(root)
+    print(f'full validate:     {time.perf_counter() - start:.3f}s')
+
+    start = time.perf_counter()
+    validator = root.enable_tracking()
+    print(f'enable_tracking:   {time.perf_counter() - start:.3f}s')
+
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(edits):
+        leaf = rng.choice(leaves)
+        leaf.amount = leaf.amount + 1
+        validator.error_message(leaf.parent)
+        leaf.amount = leaf.amount - 1
+        validator.error_message(leaf.parent)
+    elapsed = time.perf_counter() - start
+    print(f'edit + revalidate: {elapsed / (2 * edits) * 1e6:.1f}us per edit')
+    assert validator.is_valid
@@ -0,0 +1,67 @@
+"""
+Benchmark streaming JSON output and input against json.dump and json.load.
+Times are measured first, then peak memory with tracemalloc in a second
+run, on a tree of about 111k nodes.
+
+Usage:
+    python benchmark/bench_json_stream.py [directory]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from thbud.model import BudgetItem, dump_json, load_json
+
+from synthetic import national_tree
+
+
+def measure(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    del result
+    # tracemalloc slows Python code down, so it is not timed
+    tracemalloc.start()
+    result = fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:<22} {elapsed:.3f}s  peak {peak / 1e6:.1f}MB')
+    return result
+
+
+def save_json(root, path):
+    with open(path, 'w') as f:
+        json.dump(root.to_json(), f, indent=4, ensure_ascii=False)
+
+
+def save_stream(root, path):
+    with open(path, 'w') as f:
+        dump_json(root, f, indent=4, ensure_ascii=False)
+
+
+def read_json(path):
+    with open(path) as f:
+        return BudgetItem.from_json(json.load(f))
+
+
+def read_stream(path):
+    with open(path) as f:
+        return load_json(f)
+
+
+if __name__ == '__main__':
+    directory = sys.argv[1] if len(sys.argv) > 1 else tempfile.mkdtemp()
+    json_path = os.path.join(directory, 'tree.json')
+    stream_path = os.path.join(directory, 'tree-stream.json')
+    root = national_tree([20, 10, 5, 10, 10])
+
+    measure('json.dump(to_json())', save_json, root, json_path)
+    measure('dump_json', save_stream, root, stream_path)
+    with open(json_path) as a, open(stream_path) as b:
+        assert a.read() == b.read()
+
+    measure('from_json(json.load)', read_json, json_path)
+    measure('load_json', read_stream, json_path)
@@ -0,0 +1,73 @@
+"""
+Benchmark cleaning the names of a national tree with precompiled patterns
+and a cache of distinct names, against compiling `re.sub` calls per name.
+
+Usage:
+    python benchmark/bench_names.py
+"""
+import re
+import time
+
+from thbud.build_csv import extract_budget_item_name, extract_budget_item_names
+
+from synthetic import national_tree
+
+BULLETS = ['1. ', '(3) ', '7.2.1 ', '7.2.2 ผลผลิตที่ 1 : ', 'โครงการ : 7 ', '']
+
+
+def timeit(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f'{label:<22} {time.perf_counter() - start:.3f}s')
+    return result
+
+
+def uncompiled(line_string, double_amount=False):
+    # the previous extract_budget_item_name
+    if line_string.startswith('ผลผลิต :'):
+        line_string = line_string[9:]
+
+    line_string = re.sub(r'([0-9\.]+\s+)?ผลผลิต(ที่)?\s+(\d+\s+)?:', '', line_string)
+
+    if line_string.startswith('โครงการ :'):
+        line_string = line_string[9:]
+
+    line_string = re.sub(r'([0-9\.]+\s+)?โครงการ(ที่)?\s+(\d+\s+)?:', '', line_string)
+
+    regex_bullet = r'^[\d\s\(\)\. ]+'
+    if re.match(regex_bullet, line_string):
+        line_string = re.sub(regex_bullet, '', line_string)
+
+    line_string = line_string.rsplit('$', 1)[0].strip()
+    regex_amount = r' ([\d,]+|-) บาท( บาท)*'
+    if double_amount:
+        regex_amount = r' ?([\d,]+|-)?' + regex_amount
+    line_string = re.sub(regex_amount, '', line_string)
+
+    line_string = re.sub(r'^[\*\-\.:\)\s]+', '', line_string)
+    line_string = re.sub(r'[\*\-\.:\(\s]$', '', line_string)
+    return line_string.strip()
+
+
+def main():
+    lines = [
+        f'{BULLETS[index % len(BULLETS)]}{node.name} {node.amount:,} บาท'
+        for index, node in enumerate(national_tree().iter_preorder())
+    ]
+    print(f'{len(lines)} lines, {len(set(lines))} distinct')
+
+    # every name distinct, so that only the precompiled patterns help
+    unique = [f'{line} {index}' for index, line in enumerate(lines[:200_000])]
+    timeit('re.sub, distinct', lambda: [uncompiled(line) for line in unique])
+    timeit('compiled, distinct', lambda: [extract_budget_item_name(line) for line in unique])
+
+    expected = timeit('re.sub per name', lambda: [uncompiled(line) for line in lines])
+    extract_budget_item_name.cache_clear()
+    names = timeit('batch', extract_budget_item_names, lines)
+    assert names == expected
+    names = timeit('batch, warm cache', extract_budget_item_names, lines)
+    assert names == expected
+
+
+if __name__ == '__main__':
+    main()
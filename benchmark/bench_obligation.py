@@ -0,0 +1,43 @@
+"""
+Benchmark expanding the fiscal year budgets of a national tree, as columnar
+arrays against a dict per leaf and year.
+
+Usage:
+    python benchmark/bench_obligation.py
+"""
+import time
+
+import pandas as pd
+
+from thbud.build_csv import build_csv_frame, csv_columns, iter_csv_rows
+from thbud.model import ObligationMatrix
+
+from synthetic import national_tree
+
+
+def timeit(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f'{label:<22} {time.perf_counter() - start:.3f}s')
+    return result
+
+
+def dict_rows(root):
+    return pd.DataFrame.from_records(list(iter_csv_rows(root)), columns=csv_columns())
+
+
+def main():
+    root = national_tree(fiscal_year_every=5)
+    matrix = timeit('obligation matrix', ObligationMatrix.from_items, root)
+    print(f'{len(matrix)} entries over {len(matrix.years)} years')
+    timeit('totals by year', matrix.totals_by_year)
+    timeit('subtree totals', matrix.subtree_totals)
+
+    expected = timeit('dict rows', dict_rows, root)
+    df = timeit('build_csv_frame', build_csv_frame, root)
+    assert len(df) == len(expected)
+    assert df['AMOUNT'].tolist() == expected['AMOUNT'].tolist()
+
+
+if __name__ == '__main__':
+    main()
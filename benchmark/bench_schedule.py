@@ -0,0 +1,41 @@
+"""
+Simulates the makespan of converting files of skewed sizes in alphabetical
+order against largest first, with and without packing small files into
+shared tasks that pay a fixed overhead each.
+
+Usage:
+    python benchmark/bench_schedule.py [workers]
+"""
+import sys
+
+import numpy as np
+
+from thbud.schedule import lpt_makespan, pack_tasks
+
+FILES = 800
+# seconds every task pays, e.g. sending it to a worker process
+TASK_OVERHEAD = 0.05
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    rng = np.random.default_rng(0)
+    # most files are small, a few ministries are giant
+    costs = rng.lognormal(mean=0.0, sigma=1.5, size=FILES).tolist()
+    print(f'{FILES} files, {sum(costs):.0f}s of work on {workers} workers, '
+          f'lower bound {max(sum(costs) / workers, max(costs)):.1f}s')
+
+    alphabetical = lpt_makespan([cost + TASK_OVERHEAD for cost in costs], workers)
+    largest_first = lpt_makespan(
+        sorted((cost + TASK_OVERHEAD for cost in costs), reverse=True), workers)
+    tasks = pack_tasks(costs, workers)
+    packed = lpt_makespan([
+        sum(costs[index] for index in task) + TASK_OVERHEAD for task in tasks
+    ], workers)
+    print(f'{"alphabetical":<22} {alphabetical:.1f}s')
+    print(f'{"largest first":<22} {largest_first:.1f}s')
+    print(f'{"largest first, packed":<22} {packed:.1f}s in {len(tasks)} tasks')
+
+
+if __name__ == '__main__':
+    main()
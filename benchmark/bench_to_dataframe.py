@@ -0,0 +1,45 @@
+"""
+Benchmark building the validation DataFrame of a 521k-row tree. Times are
+measured first, then peak memory with tracemalloc in a second run.
+
+Usage:
+    python benchmark/bench_to_dataframe.py
+"""
+import time
+import tracemalloc
+
+import pandas as pd
+
+from synthetic import national_tree
+
+
+def measure(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    del result
+    tracemalloc.start()
+    result = fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:<26} {elapsed:.3f}s  peak {peak / 1e6:.1f}MB')
+    return result
+
+
+def from_rows(root):
+    df = pd.DataFrame(root.to_rows())
+    name_columns = sorted(
+        (column for column in df.columns if column.startswith('name_')),
+        key=lambda column: int(column.split('_')[1]),
+    )
+    columns = ['error_message', 'budget_type', *name_columns,
+               'amount', 'document', 'page', 'fiscal_year', 'fiscal_year_end']
+    return df[columns]
+
+
+if __name__ == '__main__':
+    root = national_tree([20, 10, 5, 10, 50])
+    expected = measure('pd.DataFrame(to_rows())', from_rows, root)
+    df = measure('to_dataframe', root.to_dataframe)
+    assert list(df.columns) == list(expected.columns)
+    assert len(df) == len(expected)
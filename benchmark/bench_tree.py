@@ -0,0 +1,29 @@
+"""
+Benchmark building, traversing and serializing a national sized tree.
+
+Usage:
+    python benchmark/bench_tree.py
+"""
+import json
+import time
+
+from thbud.model import BudgetItem
+
+from synthetic import national_tree, count_nodes
+
+
+def timeit(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f'{label:<12} {time.perf_counter() - start:.3f}s')
+    return result
+
+
+if __name__ == '__main__':
+    root = timeit('build', national_tree)
+    print(f'nodes:       {count_nodes(root)}')
+    timeit('pre-order', lambda: sum(1 for _ in root.iter_preorder()))
+    timeit('leaves', lambda: sum(1 for n in root.iter_preorder() if n.is_leaf))
+    json_obj = timeit('to_json', root.to_json)
+    text = timeit('json.dumps', json.dumps, json_obj)
+    timeit('from_json', BudgetItem.from_json, json.loads(text))
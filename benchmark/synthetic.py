@@ -0,0 +1,65 @@
+"""
+Synthetic budget trees shaped like the national budget, for benchmarks.
+"""
+from thbud.model import BudgetItem, FiscalYearBudget
+
+# ministries, budgetary units, plans, outputs, budget details, sub details
+NATIONAL_FANOUTS = [20, 10, 5, 10, 10, 10]
+
+LEVEL_TYPES = [
+    'MINISTRY',
+    'BUDGETARY_UNIT',
+    'BUDGET_PLAN',
+    'OUTPUT',
+    'BUDGET_DETAIL',
+    'BUDGET_DETAIL',
+]
+
+LEAF_AMOUNT = 1000
+
+
+def national_tree(fanouts=None, fiscal_year_every=50) -> BudgetItem:
+    """
+    Builds a tree with `fanouts[i]` children per node at level i, about
+    1.1M nodes with the default fanouts. Amounts add up, and every
+    `fiscal_year_every`-th leaf has a two-year obligation.
+    """
+    if fanouts is None:
+        fanouts = NATIONAL_FANOUTS
+
+    subtree_amounts = [LEAF_AMOUNT]
+    for fanout in reversed(fanouts[1:]):
+        subtree_amounts.insert(0, subtree_amounts[0] * fanout)
+
+    root = BudgetItem('ROOT', 'ROOT', sum(
+        [subtree_amounts[0]] * fanouts[0]), '', 0)
+    leaf_count = 0
+    stack = [(root, 0)]
+    while stack:
+        parent, level = stack.pop()
+        if level == len(fanouts):
+            continue
+        for i in range(fanouts[level]):
+            node = BudgetItem(
+                LEVEL_TYPES[level % len(LEVEL_TYPES)],
+                f'{LEVEL_TYPES[level % len(LEVEL_TYPES)].lower()} {level}.{i}',
+                subtree_amounts[level],
+                f'documents/{parent.name}.pdf' if level else 'documents/root.pdf',
+                i,
+                parent=parent,
+            )
+            if level == len(fanouts) - 1:
+                leaf_count += 1
+                if leaf_count % fiscal_year_every == 0:
+                    node.fiscal_year_budget.append(FiscalYearBudget(
+                        line='ปี 2568-2569 ตั้งงบประมาณ 1,000 บาท',
+                        year=2568,
+                        year_end=2569,
+                        amount=LEAF_AMOUNT,
+                    ))
+            stack.append((node, level + 1))
+    return root
+
+
+def count_nodes(root: BudgetItem) -> int:
+    return sum(1 for _ in root.iter_preorder())
@@ -1,13 +1,26 @@
 from thbud.textextract import XLSXDocumentText
+from thbud.archive import close_archives, iter_archive_documents
 from thbud.textextract.pdf_to_tree import extract_tree_levels, get_entries
-import json
+from thbud.model import dump_json
+from thbud.manifest import BuildManifest, code_version
+from thbud.statuslog import CRASH, OK, SKIPPED, StatusLog, new_run_id
+from thbud.pipeline import Pipeline, Stage, run_concurrently
+from thbud.workerpool import RecyclingPool
+from thbud.schedule import CostModel, estimate_cost, lpt_makespan, pack_tasks, page_count
+import argparse
 import os
 import re
-import concurrent.futures
+import collections
+import time
 import traceback
 
 
 xlsx_dir = './ฉบับร่างพระราชบัญญัติงบประมาณรายจ่าย (ร่าง พ.ร.บ.) (Excel)/'
+output_dir = os.path.join('.', 'output', '2568')
+# content hashes of the converted files, see thbud.manifest
+manifest_path = os.path.join(output_dir, '_manifest.json')
+# outcome of every file of every run, see thbud.statuslog
+status_log_path = os.path.join(output_dir, '_status.jsonl')
 
 
 class CannotFindStartPageError(Exception):
@@ -22,13 +35,28 @@ class NoEntriesFoundError(Exception):
     """
 
 
-def list_all_document_in_directory():
+def list_all_document_in_directory(inputs=None):
+    """
+    Lists the Excel documents in the directories and zip archives of
+    `inputs`, `xlsx_dir` by default. Documents in a zip archive, also in a
+    directory, are listed as `<archive>/<name in the archive>` and are read
+    from the archive without extracting them, see `thbud.archive`.
+    """
+    if inputs is None:
+        inputs = [xlsx_dir]
     file_paths = []
-    for root, dirs, files in os.walk(xlsx_dir):
-        for file in files:
-            if (file.endswith('.xlsx')
-                    and not file.startswith('~$')):
-                file_paths.append(os.path.join(root, file))
+    for path in inputs:
+        if os.path.isfile(path):
+            file_paths.extend(iter_archive_documents(path, ('.xlsx',)))
+            continue
+        for root, dirs, files in os.walk(path):
+            for file in files:
+                if file.lower().endswith('.zip'):
+                    file_paths.extend(iter_archive_documents(
+                        os.path.join(root, file), ('.xlsx',)))
+                elif (file.endswith('.xlsx')
+                        and not file.startswith('~$')):
+                    file_paths.append(os.path.join(root, file))
     return file_paths
 
 
@@ -57,9 +85,11 @@ def is_end_page(page):
     return any(check_page(page, t) for t in required_text)
 
 
-def build_tree_from_xlsx(file_path):
-    doc = XLSXDocumentText(file_path)
-
+def budget_lines(doc):
+    """
+    Returns the lines of the budget details, from the start page to the
+    end page of a document.
+    """
     start_page_idx = None
     end_page_idx = None
     for i, page in enumerate(doc.pages):
@@ -71,70 +101,499 @@ def build_tree_from_xlsx(file_path):
     if start_page_idx is None:
         raise CannotFindStartPageError('Cannot find start page')
 
-    lines = doc.get_lines_in_page(
+    return doc.get_lines_in_page(
         start=start_page_idx, end=end_page_idx)
 
-    # print('\n'.join([str(p) for p in lines if str(p).strip()]))
 
+def budget_entries(lines):
     entries = get_entries(lines)
 
     if not entries:
         raise NoEntriesFoundError('No entries found')
 
-    return extract_tree_levels(entries)
+    return entries
 
-    # tree_s = json.dumps(root.to_json(), ensure_ascii=False, indent=4)
 
-    # tree_s = re.sub(r'"children": \[\s+\]', '"children": []', tree_s)
+def build_tree_from_xlsx(file_path):
+    doc = XLSXDocumentText(file_path)
+    lines = budget_lines(doc)
+
+    # print('\n'.join([str(p) for p in lines if str(p).strip()]))
+
+    return extract_tree_levels(budget_entries(lines))
+
+
+class ConversionJob:
+    """
+    A file going through the stages of `conversion_pipeline`. Every stage
+    fills the field of its result.
+    """
 
-    # print(json.dumps(root.to_json(), ensure_ascii=False, indent=4))
+    def __init__(self, file_path, output_file_path, info):
+        self.file_path = file_path
+        self.output_file_path = output_file_path
+        self.info = info
+        self.pages = 0
+        self.cost = 0.0
+        self.stage_seconds = {}
+        # type name, message, traceback and stage of a failure in a worker
+        self.error = None
+        self.doc = None
+        self.lines = None
+        self.entries = None
+        self.tree = None
 
 
-def process_file(file_path):
+def load_stage(job):
+    job.doc = XLSXDocumentText(job.file_path)
+    return job
+
+
+def lines_stage(job):
+    with job.doc as doc:
+        job.lines = budget_lines(doc)
+    job.doc = None
+    return job
+
+
+def entries_stage(job):
+    job.entries = budget_entries(job.lines)
+    job.lines = None
+    return job
+
+
+def tree_stage(job):
+    job.tree = extract_tree_levels(job.entries)
+    job.entries = None
+    return job
+
+
+def write_tree(tree, output_file_path):
+    # a run that is stopped while writing leaves no partial output
+    tmp_path = output_file_path + '.tmp'
+    with open(tmp_path, 'w') as fp:
+        dump_json(
+            tree,
+            fp,
+            ensure_ascii=False,
+            indent=4
+        )
+    os.replace(tmp_path, output_file_path)
+
+
+def serialize_stage(job):
+    write_tree(job.tree, job.output_file_path)
+    job.tree = None
+    return job
+
+
+def convert_file(paths):
+    """
+    Converts a file in a worker process of a `RecyclingPool`, and returns
+    the seconds of every step.
+    """
+    file_path, output_file_path = paths
+    seconds = {}
+    start = time.perf_counter()
+    with XLSXDocumentText(file_path) as doc:
+        seconds['load'] = time.perf_counter() - start
+        lines = budget_lines(doc)
+    seconds['lines'] = time.perf_counter() - start - sum(seconds.values())
+    entries = budget_entries(lines)
+    del lines
+    seconds['entries'] = time.perf_counter() - start - sum(seconds.values())
+    tree = extract_tree_levels(entries)
+    del entries
+    seconds['tree'] = time.perf_counter() - start - sum(seconds.values())
+    write_tree(tree, output_file_path)
+    seconds['serialize'] = time.perf_counter() - start - sum(seconds.values())
+    return seconds
+
+
+def convert_files(paths):
+    """
+    Converts the files of a task in a worker process of a `RecyclingPool`.
+    A file that fails does not fail the other files of the task.
+
+    Returns:
+        The seconds of every step of every file, and its type name,
+        message and traceback if it failed.
+    """
+    outcomes = []
+    for file_paths in paths:
+        start = time.perf_counter()
+        try:
+            outcomes.append((convert_file(file_paths), None))
+        except Exception as e:
+            outcomes.append((
+                {'convert': time.perf_counter() - start},
+                (type(e).__name__, str(e), traceback.format_exc()),
+            ))
+    return outcomes
+
+
+class ConversionLanes:
+    """
+    Worker processes for the conversion: `pool` for most files, and
+    `large_pool` with fewer workers for the files of at least
+    `large_file_size` bytes, so that few large files are parsed at once.
+    """
+
+    def __init__(self, pool, large_pool, large_file_size):
+        self.pool = pool
+        self.large_pool = large_pool
+        self.large_file_size = large_file_size
+
+    def is_large(self, job):
+        return job.info.size >= self.large_file_size
+
+    def is_large_task(self, jobs):
+        return any(self.is_large(job) for job in jobs)
+
+    def convert(self, jobs):
+        """
+        Converts a task, a list of jobs, in the lane of its largest file.
+        """
+        if self.is_large_task(jobs):
+            pool = self.large_pool
+        else:
+            pool = self.pool
+        outcomes = pool.run([(job.file_path, job.output_file_path) for job in jobs])
+        for job, (seconds, error) in zip(jobs, outcomes):
+            job.stage_seconds = seconds
+            if error is not None:
+                job.error = error + ('convert',)
+        return jobs
+
+    def schedule(self, jobs):
+        """
+        Returns the tasks of the jobs, largest first, and the predicted
+        makespan. Small files share tasks, large files are alone.
+        """
+        small = [job for job in jobs if not self.is_large(job)]
+        large = [job for job in jobs if self.is_large(job)]
+        tasks = [
+            [small[index] for index in indices]
+            for indices in pack_tasks([job.cost for job in small], self.pool.workers)
+        ]
+        tasks.extend([job] for job in large)
+        tasks.sort(key=lambda task: -sum(job.cost for job in task))
+
+        makespan = max(
+            lpt_makespan([
+                sum(job.cost for job in task)
+                for task in tasks if not self.is_large_task(task)
+            ], self.pool.workers),
+            lpt_makespan([job.cost for job in large], self.large_pool.workers),
+        )
+        return tasks, makespan
+
+    def runs(self, tasks, queue_size=4):
+        """
+        Returns a pipeline of one `convert` stage and its tasks for each
+        lane, to run with `thbud.pipeline.run_concurrently`. A lane has a
+        thread per worker process, so tasks waiting for one lane never
+        hold the threads of the other.
+        """
+        return [
+            (
+                Pipeline([Stage('convert', self.convert, self.pool.workers)],
+                         queue_size=queue_size),
+                [task for task in tasks if not self.is_large_task(task)],
+            ),
+            (
+                Pipeline([Stage('large', self.convert, self.large_pool.workers)],
+                         queue_size=queue_size),
+                [task for task in tasks if self.is_large_task(task)],
+            ),
+        ]
+
+    def close(self):
+        self.pool.close()
+        self.large_pool.close()
+
+
+# stages of the conversion and their default number of workers
+STAGE_WORKERS = {
+    'load': 4,
+    'lines': 1,
+    'entries': 1,
+    'tree': 1,
+    'serialize': 2,
+}
+
+
+def conversion_pipeline(workers=None, queue_size=4):
+    """
+    Returns the pipeline that loads, finds the lines, entries and tree of
+    `ConversionJob`s and writes the trees, with `workers` threads for the
+    stages named in it and `STAGE_WORKERS` for the others. With worker
+    processes, see `ConversionLanes.runs` instead.
+    """
+    workers = dict(STAGE_WORKERS, **(workers or {}))
+    return Pipeline([
+        Stage('load', load_stage, workers['load']),
+        Stage('lines', lines_stage, workers['lines']),
+        Stage('entries', entries_stage, workers['entries']),
+        Stage('tree', tree_stage, workers['tree']),
+        Stage('serialize', serialize_stage, workers['serialize']),
+    ], queue_size=queue_size)
+
+
+def prepare_file(file_path, manifest, run):
+    """
+    Checks if a file is stale in the manifest.
+
+    Returns:
+        A `ConversionJob` and why the file must be converted, or None and
+        the status record of the skipped file, see `thbud.statuslog`.
+    """
+    record = {'run': run, 'file': file_path}
+
     # TODO: remove this
     if 'องค์กรปกครองส่วนท้องถิ่น' in file_path:
         print('Skip not supported yet', file_path)
-        return
+        return None, dict(record, status=SKIPPED, reason='not supported')
 
     file_name = os.path.basename(file_path)
     file_name = os.path.splitext(file_name)[0]
-    output_file_path = os.path.join(
-        '.', 'output', '2568', file_name + '.json'
+    output_file_path = os.path.join(output_dir, file_name + '.json')
+
+    info = manifest.file_info(file_path)
+    reason = manifest.stale_reason(file_path, output_file_path, info)
+    if reason is None:
+        print('Skip unchanged', file_path)
+        return None, dict(record, status=SKIPPED, reason='unchanged')
+    return ConversionJob(file_path, output_file_path, info), reason
+
+
+def pipeline_error(result):
+    """
+    Returns the type name, message, traceback and stage of the error of a
+    pipeline result, or None.
+    """
+    e = result.error
+    if e is None:
+        return None
+    # errors in worker processes arrive as WorkerError
+    return (
+        getattr(e, 'type_name', type(e).__name__),
+        getattr(e, 'message', str(e)),
+        getattr(e, 'traceback', result.traceback),
+        result.stage,
     )
 
-    if os.path.exists(output_file_path):
-        print('Skip already processed', file_path)
-        return
 
-    try:
-        tree = build_tree_from_xlsx(file_path)
-        print('Done', file_path)
-
-        with open(output_file_path, 'w') as fp:
-            json.dump(
-                tree.to_json(),
-                fp,
-                ensure_ascii=False,
-                indent=4
-            )
-
-    except CannotFindStartPageError as e:
-        print(e, 'in', '"'+file_path+'"')
-    except NoEntriesFoundError as e:
-        print(e, 'in', '"'+file_path+'"')
-    except Exception as e:
-        # print the error and traceback
-        print(e, 'in', '"'+file_path+'"')
-        traceback.print_exc()
-        return
+def file_record(job, reason, run, seconds, error):
+    """
+    Returns the status record of a file that went through the pipeline.
+    """
+    file_path = job.file_path
+    record = {
+        'run': run,
+        'file': file_path,
+        'reason': reason,
+        'size': job.info.size,
+        'pages': job.pages,
+        'predicted_seconds': job.cost,
+        'seconds': sum(job.stage_seconds.values()) or sum(seconds.values()),
+        'stage_seconds': dict(seconds, **job.stage_seconds),
+    }
+    if error is None:
+        print('Done', '('+reason+')', file_path)
+        return dict(record, status=OK)
+
+    error_type, message, error_traceback, stage = error
+    if error_type in (CannotFindStartPageError.__name__, NoEntriesFoundError.__name__):
+        print(message, 'in', '"'+file_path+'"')
+        return dict(record, status=error_type, error=message)
+
+    # print the error and traceback
+    print(message, 'in', '"'+file_path+'"')
+    print(error_traceback, end='')
+    return dict(
+        record,
+        status=CRASH,
+        stage=stage,
+        error=f'{error_type}: {message}',
+        traceback=error_traceback,
+    )
+
+
+def estimate_costs(jobs, status_log):
+    """
+    Estimates the seconds of every job from its size and pages, and from
+    the timings of earlier runs in the status log.
+    """
+    converted = {
+        file_path: record
+        for file_path, record in status_log.last_statuses().items()
+        if record['status'] == OK
+    }
+    model = CostModel.fit(converted.values())
+    for job in jobs:
+        job.pages = page_count(job.file_path)
+        job.cost = estimate_cost(
+            model, job.info.size, job.pages, converted.get(job.file_path))
+
+
+def parse_stage_workers(values):
+    workers = {}
+    for value in values:
+        name, _, count = value.partition('=')
+        if name not in STAGE_WORKERS or not count.isdigit() or int(count) < 1:
+            raise argparse.ArgumentTypeError(
+                f'expected STAGE=N with STAGE one of {list(STAGE_WORKERS)}, got {value}')
+        workers[name] = int(count)
+    return workers
 
 
 def main():
-    file_paths = list_all_document_in_directory()
-    file_paths.sort()
+    parser = argparse.ArgumentParser(
+        description='Converts the Excel documents to JSON trees')
+    parser.add_argument(
+        'inputs', nargs='*', default=[xlsx_dir], metavar='INPUT',
+        help='directories or zip archives of the documents')
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='continue the last run, skipping the files it logged')
+    parser.add_argument(
+        '--retry-failed', action='store_true',
+        help='only convert the files whose last logged outcome is a failure')
+    parser.add_argument(
+        '--workers', action='append', default=[], metavar='STAGE=N',
+        help=f'number of threads of a stage, one of {list(STAGE_WORKERS)}')
+    parser.add_argument(
+        '--queue-size', type=int, default=4,
+        help='number of files waiting between two stages')
+    parser.add_argument(
+        '--processes', type=int, default=0,
+        help='convert in this many worker processes instead of threads')
+    parser.add_argument(
+        '--max-files-per-worker', type=int, default=50,
+        help='replace a worker process after this many files')
+    parser.add_argument(
+        '--max-worker-memory', type=int, default=2048, metavar='MB',
+        help='replace a worker process once its memory passes this size')
+    parser.add_argument(
+        '--large-file-size', type=int, default=20, metavar='MB',
+        help='convert files of at least this size in the large file lane')
+    parser.add_argument(
+        '--large-workers', type=int, default=1,
+        help='number of worker processes of the large file lane')
+    args = parser.parse_args()
+    try:
+        workers = parse_stage_workers(args.workers)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    try:
+        convert(args, workers)
+    finally:
+        # the archives of the inputs are kept open while the run reads them
+        close_archives()
 
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        executor.map(process_file, file_paths)
+
+def convert(args, workers):
+    """
+    Converts the documents of `args.inputs` that are new or changed since
+    the last run, with the options parsed by `main`.
+    """
+    all_file_paths = sorted(list_all_document_in_directory(args.inputs))
+    file_paths = all_file_paths
+
+    os.makedirs(output_dir, exist_ok=True)
+    # the outputs are stale once thbud or this script change
+    manifest = BuildManifest(manifest_path, code_version(__file__))
+    status_log = StatusLog(status_log_path)
+
+    run = status_log.last_run() if args.resume else None
+    if run is None:
+        run = new_run_id()
+    else:
+        done = status_log.files_of_run(run)
+        print('Resume run', run, 'with', len(done), 'files done')
+        file_paths = [file_path for file_path in file_paths if file_path not in done]
+    if args.retry_failed:
+        failed = status_log.failed_files()
+        file_paths = [file_path for file_path in file_paths if file_path in failed]
+        print('Retry', len(file_paths), 'failed files')
+
+    records = []
+    reasons = {}
+    jobs = []
+    for file_path in file_paths:
+        job, reason = prepare_file(file_path, manifest, run)
+        if job is None:
+            status_log.append(reason)
+            records.append(reason)
+            continue
+        reasons[file_path] = reason
+        jobs.append(job)
+
+    # dispatch the files that take longest first, so that they do not
+    # finish last
+    estimate_costs(jobs, status_log)
+    lanes = None
+    if args.processes > 0:
+        lanes = ConversionLanes(
+            RecyclingPool(
+                convert_files, args.processes,
+                args.max_files_per_worker, args.max_worker_memory << 20),
+            RecyclingPool(
+                convert_files, args.large_workers,
+                args.max_files_per_worker, args.max_worker_memory << 20),
+            args.large_file_size << 20,
+        )
+        tasks, predicted = lanes.schedule(jobs)
+        runs = lanes.runs(tasks, args.queue_size)
+        print('Scheduled', len(jobs), 'files in', len(tasks), 'tasks')
+    else:
+        # the stages overlap and share one interpreter, so the costs of the
+        # files do not predict the makespan
+        predicted = None
+        runs = [(
+            conversion_pipeline(workers, args.queue_size),
+            sorted(jobs, key=lambda job: -job.cost),
+        )]
+
+    start = time.perf_counter()
+    try:
+        for result in run_concurrently(runs):
+            error = pipeline_error(result)
+            task = result.item if lanes is not None else [result.item]
+            for job in task:
+                job_error = job.error or error
+                if job_error is None:
+                    manifest.record(job.file_path, job.output_file_path, job.info)
+                record = file_record(
+                    job, reasons[job.file_path], run, result.seconds, job_error)
+                status_log.append(record)
+                records.append(record)
+    finally:
+        if lanes is not None:
+            lanes.close()
+        manifest.close()
+    makespan = time.perf_counter() - start
+
+    statuses = collections.Counter(record['status'] for record in records)
+    converted = collections.Counter(
+        record['reason'] for record in records if record['status'] == OK)
+    print('Converted', sum(converted.values()), 'of', len(file_paths), 'files',
+          dict(converted), dict(statuses))
+    if predicted is None:
+        print(f'Makespan {makespan:.1f}s')
+    else:
+        print(f'Makespan {makespan:.1f}s, predicted {predicted:.1f}s')
+    for pipeline, _ in runs:
+        for stats in pipeline.stats():
+            print(
+                f'{stats.name:<10} {stats.processed} done, {stats.failed} failed, '
+                f'{stats.busy_seconds:.1f}s busy, {stats.items_per_second:.2f} files/s')
+    if lanes is not None:
+        print('Replaced workers', lanes.pool.replaced, 'large', lanes.large_pool.replaced)
+    for file_path in manifest.removed_inputs(all_file_paths):
+        print('Removed', file_path)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,47 @@
+"""
+Exports the JSON trees written by `convertxlsx.py` to one CSV or Parquet
+dataset partitioned by ministry and fiscal year.
+
+Usage:
+    python exportdataset.py [input_directory] [output_directory]
+        [--format csv|parquet] [--workers N] [--category-levels N]
+"""
+import argparse
+import os
+
+from thbud.build_csv import CATEGORY_LEVELS
+from thbud.export import FORMATS, export_directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        'input_directory', nargs='?', default=os.path.join('.', 'output', '2568'))
+    parser.add_argument(
+        'output_directory', nargs='?', default=os.path.join('.', 'output', 'dataset-2568'))
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--category-levels', type=int, default=CATEGORY_LEVELS)
+    parser.add_argument(
+        '--fiscal-year', type=int, default=None,
+        help='year of the rows without a fiscal year, the name of the input '
+             'directory by default')
+    args = parser.parse_args()
+
+    result = export_directory(
+        args.input_directory,
+        args.output_directory,
+        fmt=args.format,
+        category_levels=args.category_levels,
+        fiscal_year=args.fiscal_year,
+        max_workers=args.workers,
+    )
+    for path, error in sorted(result.errors.items()):
+        print(error, 'in', '"'+path+'"')
+    print(
+        'Exported', sum(result.rows.values()), 'rows of', len(result.rows),
+        'files to', len(result.partitions), 'partitions in', args.output_directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import pytest
+
+from thbud.model import BudgetItem, FiscalYearBudget
+
+
+def build_tree():
+  # ROOT
+  #   กระทรวง ก 300
+  #     หน่วย 300
+  #       แผนงานบูรณาการ ก 300
+  #         งบลงทุน 300
+  #           ค่าก่อสร้าง 200, ปี 2568-2569 200
+  #           ค่าครุภัณฑ์ 100
+  #   กระทรวง ข 0
+  root = BudgetItem('ROOT', 'ROOT', None, '', 0)
+  ministry = BudgetItem('MINISTRY', 'กระทรวง ก', 300, 'doc.pdf', 1, parent=root)
+  unit = BudgetItem('BUDGETARY_UNIT', 'หน่วย', 300, 'doc.pdf', 2, parent=ministry)
+  plan = BudgetItem('BUDGET_PLAN', 'แผนงานบูรณาการ ก', 300, 'doc.pdf', 3, parent=unit)
+  category = BudgetItem('BUDGET_DETAIL', 'งบลงทุน', 300, 'doc.pdf', 4, parent=plan)
+  building = BudgetItem('BUDGET_DETAIL', 'ค่าก่อสร้าง', 200, 'doc.pdf', 5, parent=category)
+  building.fiscal_year_budget.append(FiscalYearBudget('ปี 2568-2569', 2568, 200, 2569))
+  BudgetItem('BUDGET_DETAIL', 'ค่าครุภัณฑ์', 100, 'doc.pdf', 6, parent=category)
+  BudgetItem('MINISTRY', 'กระทรวง ข', 0, 'doc.pdf', 7, parent=root)
+  return root
+
+
+def build_ministry():
+  ministry = build_tree().children[0]
+  ministry.parent = None
+  return ministry
+
+
+@pytest.fixture
+def make_tree():
+  """
+  Returns a function that builds a new sample tree, a ROOT with two
+  ministries. Its nodes in pre-order are the root, the ministry, unit, plan,
+  category, building and equipment of `build_tree`, and the other ministry.
+  """
+  return build_tree
+
+
+@pytest.fixture
+def make_ministry():
+  """
+  Returns a function that builds the first ministry of the sample tree,
+  without the root.
+  """
+  return build_ministry
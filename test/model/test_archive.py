@@ -0,0 +1,143 @@
+import io
+import os
+import zipfile
+
+import openpyxl
+
+from thbud.archive import (
+    close_archives,
+    decode_member_name,
+    iter_archive_documents,
+    read_document,
+    split_archive_path,
+    stat_document,
+)
+from thbud.manifest import BuildManifest, NEW, file_hash
+from thbud.schedule import page_count
+from thbud.textextract import DocumentText, XLSXDocumentText
+
+PDF_PATH = 'test/data/budget-1page-5nodes.pdf'
+
+
+def xlsx_bytes(text):
+  wb = openpyxl.Workbook()
+  wb.active['A1'] = text
+  fp = io.BytesIO()
+  wb.save(fp)
+  return fp.getvalue()
+
+def write_legacy_member(archive_path, name, data, encoding):
+  # zipfile sets the UTF-8 flag on every non-ASCII name, so the name is
+  # written as ASCII and replaced by its bytes in another encoding
+  raw = name.encode(encoding)
+  placeholder = b'#' * len(raw)
+  with zipfile.ZipFile(archive_path, 'a') as archive:
+    archive.writestr(placeholder.decode('ascii'), data)
+  with open(archive_path, 'rb') as fp:
+    content = fp.read()
+  with open(archive_path, 'wb') as fp:
+    fp.write(content.replace(placeholder, raw))
+
+def make_archive(tmp_path):
+  archive_path = str(tmp_path / 'กระทรวง.zip')
+  with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+    archive.writestr('กระทรวง/', '')
+    archive.writestr('กระทรวง/งบ สป.xlsx', xlsx_bytes('งบประมาณ'))
+    archive.writestr('กระทรวง/~$งบ สป.xlsx', b'lock')
+    archive.write(PDF_PATH, 'กระทรวง/budget.pdf')
+    archive.writestr('readme.txt', 'text')
+  write_legacy_member(archive_path, 'กรม.xlsx', xlsx_bytes('กรม'), 'cp874')
+  return archive_path
+
+def test_decode_member_name(tmp_path):
+  archive_path = make_archive(tmp_path)
+  with zipfile.ZipFile(archive_path) as archive:
+    names = [decode_member_name(info) for info in archive.infolist()]
+  assert 'กระทรวง/งบ สป.xlsx' in names
+  assert 'กรม.xlsx' in names
+
+def test_iter_archive_documents(tmp_path):
+  archive_path = make_archive(tmp_path)
+  assert sorted(iter_archive_documents(archive_path)) == sorted([
+    os.path.join(archive_path, 'กระทรวง/งบ สป.xlsx'),
+    os.path.join(archive_path, 'กระทรวง/budget.pdf'),
+    os.path.join(archive_path, 'กรม.xlsx'),
+  ])
+  assert list(iter_archive_documents(archive_path, ('.pdf',))) == [
+    os.path.join(archive_path, 'กระทรวง/budget.pdf'),
+  ]
+
+def test_split_archive_path(tmp_path):
+  archive_path = make_archive(tmp_path)
+  member_path = os.path.join(archive_path, 'กระทรวง', 'งบ สป.xlsx')
+  assert split_archive_path(member_path) == (archive_path, 'กระทรวง/งบ สป.xlsx')
+  assert split_archive_path(archive_path) is None
+  assert split_archive_path(PDF_PATH) is None
+
+def test_read_document(tmp_path):
+  archive_path = make_archive(tmp_path)
+  member_path = os.path.join(archive_path, 'กระทรวง/budget.pdf')
+  with open(PDF_PATH, 'rb') as fp:
+    content = fp.read()
+  assert read_document(member_path).getvalue() == content
+  assert read_document(PDF_PATH).getvalue() == content
+  assert stat_document(member_path)[0] == len(content)
+  assert file_hash(member_path) == file_hash(PDF_PATH)
+
+def test_documents_in_archive(tmp_path):
+  archive_path = make_archive(tmp_path)
+  with XLSXDocumentText(os.path.join(archive_path, 'กรม.xlsx')) as text:
+    assert str(text.get_lines_in_page()[0]) == 'กรม'
+  with DocumentText(os.path.join(archive_path, 'กระทรวง/budget.pdf')) as text:
+    expected = DocumentText(PDF_PATH)
+    assert [str(line) for line in text.get_lines_in_page()] == \
+      [str(line) for line in expected.get_lines_in_page()]
+  assert page_count(os.path.join(archive_path, 'กระทรวง/งบ สป.xlsx')) == 1
+  assert page_count(os.path.join(archive_path, 'กระทรวง/budget.pdf')) == 1
+
+def test_documents_from_stream():
+  with open(PDF_PATH, 'rb') as fp:
+    content = fp.read()
+  with DocumentText('budget.pdf', stream=content) as text:
+    assert len(text.pages) == 1
+  with DocumentText('budget.pdf', stream=io.BytesIO(content)) as text:
+    assert len(text.pages) == 1
+  with XLSXDocumentText('doc.xlsx', stream=xlsx_bytes('งบประมาณ')) as text:
+    assert str(text.get_lines_in_page()[0]) == 'งบประมาณ'
+
+def test_manifest_of_archive(tmp_path):
+  archive_path = make_archive(tmp_path)
+  member_path = os.path.join(archive_path, 'กรม.xlsx')
+  output_path = str(tmp_path / 'กรม.json')
+  with open(output_path, 'w') as fp:
+    fp.write('{}')
+  manifest = BuildManifest(str(tmp_path / '_manifest.json'))
+  assert manifest.stale_reason(member_path, output_path) == NEW
+  manifest.record(member_path, output_path)
+  assert manifest.stale_reason(member_path, output_path) is None
+
+def test_archive_index_is_read_once(tmp_path):
+  from thbud.archive import _open_archive
+  archive_path = make_archive(tmp_path)
+  _open_archive.cache_clear()
+  for path in iter_archive_documents(archive_path):
+    stat_document(path)
+    file_hash(path)
+    page_count(path)
+  assert _open_archive.cache_info().misses == 1
+
+  # a changed archive is read again
+  write_legacy_member(archive_path, 'ใหม่.xlsx', xlsx_bytes('ใหม่'), 'cp874')
+  assert os.path.join(archive_path, 'ใหม่.xlsx') in iter_archive_documents(archive_path)
+
+def test_close_archives(tmp_path):
+  from thbud.archive import _archive, _open_archive
+  archive_path = make_archive(tmp_path)
+  path = os.path.join(archive_path, 'กระทรวง/budget.pdf')
+  archive, _ = _archive(archive_path)
+  close_archives()
+  assert _open_archive.cache_info().currsize == 0
+  assert archive.fp is None
+  # the archive is opened again
+  assert read_document(path).getvalue() == open(PDF_PATH, 'rb').read()
+  close_archives()
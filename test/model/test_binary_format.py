@@ -0,0 +1,64 @@
+import io
+
+from thbud.model import (
+  BudgetItem,
+  FiscalYearBudget,
+  BinaryFormatError,
+  dump_binary,
+  dumps_binary,
+  load_binary,
+  loads_binary,
+)
+from thbud.model import binary
+import pytest
+
+
+def make_varied_tree(make_tree):
+  # amounts of every type, a negative page and repeated strings
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  ministry.amount = 300.5
+  building.amount = 200.5
+  building.page = -1
+  building.fiscal_year_budget.append(FiscalYearBudget('ปี 2570', 2570, 0.25))
+  equipment.name = 'ค่าก่อสร้าง'
+  equipment.amount = None
+  equipment.document = 'documents/เล่ม 2.pdf'
+  other.amount = 2 ** 40
+  return root
+
+def test_round_trip(make_tree):
+  root = make_varied_tree(make_tree)
+  loaded = loads_binary(dumps_binary(root))
+  assert loaded.to_json() == root.to_json()
+
+  amounts = [node.amount for node in loaded.iter_preorder()]
+  assert [type(amount) for amount in amounts] == [
+    type(None), float, int, int, int, float, type(None), int]
+  fyb = loaded.children[0].children[0].children[0].children[0].children[0].fiscal_year_budget
+  assert type(fyb[0].amount) is int and type(fyb[1].amount) is float
+
+def test_strings_are_stored_once(make_tree):
+  data = dumps_binary(make_varied_tree(make_tree))
+  assert data.count('doc.pdf'.encode('utf-8')) == 1
+  assert data.count('ค่าก่อสร้าง'.encode('utf-8')) == 1
+
+def test_streaming(monkeypatch, make_tree):
+  monkeypatch.setattr(binary, 'BUFFER_SIZE', 7)
+  root = make_varied_tree(make_tree)
+  fp = io.BytesIO()
+  dump_binary(root, fp)
+  fp.seek(0)
+  assert load_binary(fp).to_json() == root.to_json()
+
+def test_single_node():
+  node = BudgetItem('PROJECT', 'project', 1, 'doc.pdf', 1)
+  assert loads_binary(dumps_binary(node)).to_json() == node.to_json()
+
+def test_invalid_data(make_tree):
+  data = dumps_binary(make_tree())
+  with pytest.raises(BinaryFormatError):
+    loads_binary(b'{"budget_type": "ROOT"}')
+  with pytest.raises(BinaryFormatError):
+    loads_binary(data[:-3])
+  with pytest.raises(BinaryFormatError):
+    loads_binary(data[:5])
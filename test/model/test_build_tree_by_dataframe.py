@@ -0,0 +1,63 @@
+import io
+
+import pandas as pd
+import pytest
+
+from thbud.model import BudgetItem, read_tree_csv
+
+
+def make_varied_tree(make_tree):
+  # a missing amount and an amount with satang
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  building.amount = 200.5
+  equipment.amount = None
+  return root
+
+def as_floats(json_obj):
+  json_obj = dict(json_obj)
+  if json_obj['amount'] is not None:
+    json_obj['amount'] = float(json_obj['amount'])
+  json_obj['fiscal_year_budget'] = [
+    dict(fyb, amount=float(fyb['amount'])) for fyb in json_obj['fiscal_year_budget']]
+  json_obj['children'] = [as_floats(child) for child in json_obj['children']]
+  return json_obj
+
+def test_same_as_build_tree_by_rows(make_tree):
+  rows = make_varied_tree(make_tree).children[0].to_rows()
+  expected = BudgetItem.build_tree_by_rows(rows)
+  root = BudgetItem.build_tree_by_dataframe(pd.DataFrame(rows))
+  assert as_floats(root.to_json()) == as_floats(expected.to_json())
+
+@pytest.mark.parametrize('chunksize', [1, 2, 100])
+def test_read_csv_in_chunks(chunksize, make_tree):
+  tree = make_varied_tree(make_tree)
+  root_row = {'budget_type': 'ROOT', 'name_0': 'ROOT', 'document': '', 'page': 0}
+  rows = [root_row] + [row for ministry in tree.children for row in ministry.to_rows()]
+  fp = io.StringIO()
+  pd.DataFrame(rows).to_csv(fp, index=False)
+  fp.seek(0)
+
+  root = read_tree_csv(fp, chunksize=chunksize)
+  assert root.name == 'ROOT'
+  assert root.document == ''
+  assert [child.name for child in root.children] == ['กระทรวง ก', 'กระทรวง ข']
+  assert as_floats(root.to_json()) == as_floats(tree.to_json())
+  building = root.children[0].children[0].children[0].children[0].children[0]
+  assert building.fiscal_year_budget[0].year_end == 2569
+
+def test_empty_and_invalid_rows():
+  assert BudgetItem.build_tree_by_dataframe(pd.DataFrame()) is None
+
+  df = pd.DataFrame([{'budget_type': 'FISCAL_YEAR_BUDGET', 'name_1': 'line',
+                      'amount': 1, 'fiscal_year': 2568, 'fiscal_year_end': 2568}])
+  with pytest.raises(ValueError, match='must have parent'):
+    BudgetItem.build_tree_by_dataframe(df)
+
+  df = pd.DataFrame([{'budget_type': 'MINISTRY', 'name_1': None, 'amount': 1}])
+  with pytest.raises(ValueError, match='Cannot find level'):
+    BudgetItem.build_tree_by_dataframe(df)
+
+  df = pd.DataFrame([{'budget_type': 'MINISTRY', 'name_1': 'ministry',
+                      'amount': 1, 'document': 'doc.pdf', 'page': None}])
+  with pytest.raises(ValueError, match='from row 0'):
+    BudgetItem.build_tree_by_dataframe(df)
@@ -0,0 +1,38 @@
+import csv
+import io
+
+import pytest
+
+from thbud.build_csv import csv_columns, iter_csv_rows, write_csv, write_parquet
+
+
+def test_rows_are_generated_lazily(make_ministry):
+  rows = iter_csv_rows(make_ministry())
+  first = next(rows)
+  assert first['MINISTRY'] == 'กระทรวง ก'
+  assert first['CROSS_FUNC?'] is True
+  assert first['CATEGORY_LV1'] == 'งบลงทุน'
+  assert first['FISCAL_YEAR'] == 2568
+  assert [row['ITEM_DESCRIPTION'] for row in rows] == ['ค่าก่อสร้าง', 'ค่าครุภัณฑ์']
+
+def test_write_csv(make_ministry):
+  fp = io.StringIO()
+  write_csv(iter_csv_rows(make_ministry()), fp, category_levels=2)
+  fp.seek(0)
+  rows = list(csv.DictReader(fp))
+  assert list(rows[0].keys()) == csv_columns(2)
+  assert [row['FISCAL_YEAR'] for row in rows] == ['2568', '2569', '']
+  assert [row['AMOUNT'] for row in rows] == ['200.0', '200.0', '100']
+  assert rows[2]['CATEGORY_LV2'] == ''
+
+def test_too_many_category_levels(make_ministry):
+  with pytest.raises(ValueError, match='category levels'):
+    write_csv(iter_csv_rows(make_ministry()), io.StringIO(), category_levels=0)
+
+def test_write_parquet(tmp_path, make_ministry):
+  pq = pytest.importorskip('pyarrow.parquet')
+  path = str(tmp_path / 'rows.parquet')
+  write_parquet(iter_csv_rows(make_ministry()), path, category_levels=2, batch_size=2)
+  table = pq.read_table(path)
+  assert table.schema.names == csv_columns(2)
+  assert table.column('FISCAL_YEAR').to_pylist() == [2568, 2569, None]
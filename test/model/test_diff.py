@@ -0,0 +1,115 @@
+import pickle
+
+from thbud.model import BudgetItem, FiscalYearBudget, diff_trees, subtree_hash
+
+MINISTRY_PATH = ('ROOT', 'กระทรวง ก')
+CATEGORY_PATH = MINISTRY_PATH + ('หน่วย', 'แผนงานบูรณาการ ก', 'งบลงทุน')
+
+
+def summary(changes):
+  return [(change.kind, change.old_path, change.new_path, change.fields) for change in changes]
+
+def test_hashes(make_tree):
+  old, new = make_tree(), make_tree()
+  old_hash = subtree_hash(old)
+  assert all(node._subtree_hash is not None for node in old.iter_preorder())
+  assert subtree_hash(new) == old_hash
+
+  building = new.children[0].children[0].children[0].children[0].children[0]
+  building.amount = 200.0
+  assert subtree_hash(new) == old_hash
+  building.page = 10
+  assert subtree_hash(new) == old_hash
+  building.amount = 201
+  assert subtree_hash(new) != old_hash
+  building.amount = 200
+  assert subtree_hash(new) == old_hash
+
+def test_hashes_are_cleared_up_to_the_root(make_tree):
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  subtree_hash(root)
+  building.name = 'renamed'
+  assert [node._subtree_hash for node in (building, category, plan, unit, ministry, root)] == [None] * 6
+  # siblings and descendants keep their hashes
+  assert equipment._subtree_hash is not None
+  assert other._subtree_hash is not None
+
+  subtree_hash(root)
+  BudgetItem('BUDGET_DETAIL', 'new', 1, 'doc.pdf', 8, parent=other)
+  assert other._subtree_hash is None and root._subtree_hash is None
+  subtree_hash(root)
+  equipment.fiscal_year_budget = [FiscalYearBudget('ปี 2568', 2568, 100)]
+  assert category._subtree_hash is None
+  subtree_hash(root)
+  category.parent = None
+  assert plan._subtree_hash is None and category._subtree_hash is not None
+  # a pickled tree is hashed again
+  assert pickle.loads(pickle.dumps(root))._subtree_hash is None
+
+def test_tracked_fiscal_year_budget_edits_clear_hashes(make_tree):
+  old, new = make_tree(), make_tree()
+  new.enable_tracking()
+  assert subtree_hash(new) == subtree_hash(old)
+  building = new.children[0].children[0].children[0].children[0].children[0]
+  building.fiscal_year_budget.append(FiscalYearBudget('ปี 2570', 2570, 0))
+  assert subtree_hash(new) != subtree_hash(old)
+
+def test_no_changes(make_tree):
+  assert diff_trees(make_tree(), make_tree()) == []
+
+def test_changed(make_tree):
+  old = make_tree()
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  ministry.amount = 350
+  building.fiscal_year_budget[0].amount = 150
+  assert summary(diff_trees(old, root)) == [
+    ('CHANGED', MINISTRY_PATH, MINISTRY_PATH, ('amount',)),
+    ('CHANGED',
+     CATEGORY_PATH + ('ค่าก่อสร้าง',),
+     CATEGORY_PATH + ('ค่าก่อสร้าง',),
+     ('fiscal_year_budget',)),
+  ]
+
+def test_added_removed_and_moved(make_tree):
+  old = make_tree()
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  equipment.parent = None
+  BudgetItem('BUDGET_DETAIL', 'ค่าที่ดิน', 1, 'doc.pdf', 8, parent=category)
+  building.parent = other
+  assert summary(diff_trees(old, root)) == [
+    ('MOVED', CATEGORY_PATH + ('ค่าก่อสร้าง',), ('ROOT', 'กระทรวง ข', 'ค่าก่อสร้าง'), ()),
+    ('REMOVED', CATEGORY_PATH + ('ค่าครุภัณฑ์',), None, ()),
+    ('ADDED', None, CATEGORY_PATH + ('ค่าที่ดิน',), ()),
+  ]
+
+def test_reordered_children(make_tree):
+  old, new = make_tree(), make_tree()
+  category = new.children[0].children[0].children[0].children[0]
+  category.children = list(reversed(category.children))
+  assert summary(diff_trees(old, new)) == [
+    ('CHANGED', CATEGORY_PATH, CATEGORY_PATH, ('order',)),
+  ]
+
+def test_only_differing_subtrees_are_visited(make_tree):
+  old, new = make_tree(), make_tree()
+  subtree_hash(old)
+
+  class NotCompared:
+    def __eq__(self, other):
+      raise AssertionError('an unchanged subtree was descended into')
+
+  # the unit is unchanged, so the nodes under it are not compared
+  plan = old.children[0].children[0].children[0]
+  for node in plan.iter_preorder():
+    node._subtree_hash = NotCompared()
+  new.children[0].amount = 1
+  changes = diff_trees(old, new)
+  assert summary(changes) == [
+    ('CHANGED', MINISTRY_PATH, MINISTRY_PATH, ('amount',)),
+  ]
+  assert changes[0].to_json() == {
+    'kind': 'CHANGED',
+    'old_path': ['ROOT', 'กระทรวง ก'],
+    'new_path': ['ROOT', 'กระทรวง ก'],
+    'fields': ['amount'],
+  }
@@ -0,0 +1,80 @@
+import csv
+import os
+
+import pytest
+
+from thbud.model import dump_json
+from thbud.build_csv import build_csv, csv_columns
+from thbud.export import export_directory, export_json_file, partition_path
+
+
+def named_ministry(make_ministry, name):
+  ministry = make_ministry()
+  ministry.name = name
+  return ministry
+
+def write_tree(path, tree):
+  with open(path, 'w', encoding='utf-8') as fp:
+    dump_json(tree, fp, ensure_ascii=False)
+
+def read_csv(path):
+  with open(path, newline='', encoding='utf-8') as fp:
+    return list(csv.DictReader(fp))
+
+def test_export_directory(tmp_path, make_ministry):
+  input_directory = tmp_path / '2568'
+  input_directory.mkdir()
+  write_tree(input_directory / 'a.json', named_ministry(make_ministry, 'กระทรวง ก'))
+  write_tree(input_directory / 'b.json', named_ministry(make_ministry, 'กระทรวง ข'))
+  write_tree(input_directory / 'c.json', named_ministry(make_ministry, 'กระทรวง ข'))
+  (input_directory / 'broken.json').write_text('{')
+  output_directory = tmp_path / 'dataset'
+
+  result = export_directory(str(input_directory), str(output_directory), max_workers=2)
+
+  assert sorted(map(os.path.basename, result.rows)) == ['a.json', 'b.json', 'c.json']
+  assert all(count == 3 for count in result.rows.values())
+  assert [os.path.basename(path) for path in result.errors] == ['broken.json']
+  assert result.partitions == sorted([
+    partition_path('กระทรวง ก', 2568),
+    partition_path('กระทรวง ก', 2569),
+    partition_path('กระทรวง ข', 2568),
+    partition_path('กระทรวง ข', 2569),
+  ])
+  assert not os.path.exists(output_directory / '_parts')
+
+  rows = read_csv(output_directory / partition_path('กระทรวง ข', 2568) / 'part-0.csv')
+  assert list(rows[0].keys()) == csv_columns()
+  # the rows of b.json, then of c.json, without the header of c.json
+  assert [row['ITEM_DESCRIPTION'] for row in rows] == ['ค่าก่อสร้าง', 'ค่าครุภัณฑ์'] * 2
+  assert [row['FISCAL_YEAR'] for row in rows] == ['2568', ''] * 2
+
+def test_export_json_file_removes_parts_on_error(tmp_path, make_ministry):
+  # the ministry has a category level
+  write_tree(tmp_path / 'a.json', make_ministry())
+
+  with pytest.raises(ValueError, match='category levels'):
+    export_json_file(str(tmp_path / 'a.json'), str(tmp_path / 'parts'), category_levels=0)
+  assert not [files for _, _, files in os.walk(tmp_path / 'parts') if files]
+
+def test_export_json_file_raises_the_error_of_a_part(tmp_path, monkeypatch, make_ministry):
+  write_tree(tmp_path / 'a.json', make_ministry())
+
+  def fail(path, columns):
+    raise OSError(f'cannot create {path}')
+  monkeypatch.setattr('thbud.export._CsvPart', fail)
+
+  with pytest.raises(OSError, match='cannot create'):
+    export_json_file(str(tmp_path / 'a.json'), str(tmp_path / 'parts'))
+
+def test_export_json_file_rows(tmp_path, make_ministry):
+  tree = make_ministry()
+  write_tree(tmp_path / 'a.json', tree)
+  count = export_json_file(str(tmp_path / 'a.json'), str(tmp_path / 'parts'))
+  assert count == len(build_csv(tree))
+
+def test_output_directory_must_be_empty(tmp_path):
+  (tmp_path / 'dataset').mkdir()
+  (tmp_path / 'dataset' / 'file').write_text('')
+  with pytest.raises(FileExistsError):
+    export_directory(str(tmp_path), str(tmp_path / 'dataset'))
@@ -0,0 +1,56 @@
+from thbud.model import BudgetItem, BudgetForest, BudgetType
+
+
+def make_inconsistent_ministry(make_ministry):
+  ministry = make_ministry()
+  building, equipment = ministry.children[0].children[0].children[0].children
+  building.amount = 250
+  equipment.amount = None
+  return ministry
+
+def test_from_items(make_ministry):
+  forest = BudgetForest.from_items(make_ministry())
+  assert len(forest) == 6
+  assert forest.parent.tolist() == [-1, 0, 1, 2, 3, 3]
+  assert forest.depth.tolist() == [0, 1, 2, 3, 4, 4]
+  assert [forest.name(i) for i in range(6)] == [
+    'กระทรวง ก', 'หน่วย', 'แผนงานบูรณาการ ก', 'งบลงทุน', 'ค่าก่อสร้าง', 'ค่าครุภัณฑ์']
+  assert forest.documents.strings == ['doc.pdf']
+  assert forest.roots.tolist() == [0]
+  assert forest.fy_node.tolist() == [4]
+
+def test_round_trip(make_ministry):
+  root = make_inconsistent_ministry(make_ministry)
+  roots = BudgetForest.from_items([root, make_inconsistent_ministry(make_ministry)]).to_items()
+  assert len(roots) == 2
+  expected = root.to_json()
+  assert roots[0].to_json() == expected
+  assert roots[1].to_json() == expected
+
+def test_rollups(make_ministry):
+  forest = BudgetForest.from_items(make_inconsistent_ministry(make_ministry))
+  assert forest.child_counts().tolist() == [1, 1, 1, 2, 0, 0]
+  assert forest.depth_histogram().tolist() == [1, 1, 1, 1, 2]
+  assert forest.children_sums().tolist() == [300, 300, 300, 250, 0, 0]
+  assert forest.subtree_sums().tolist() == [1450, 1150, 850, 550, 250, 0]
+  assert forest.leaf_sums().tolist() == [250, 250, 250, 250, 250, 0]
+  assert forest.totals_by_type()[BudgetType.BUDGET_DETAIL] == 550
+
+def test_inconsistent_sums_same_as_check_sum(make_ministry):
+  root = make_inconsistent_ministry(make_ministry)
+  forest = BudgetForest.from_items(root)
+
+  expected = []
+  for index, node in enumerate(root.iter_preorder()):
+    try:
+      node._check_sum()
+    except ValueError:
+      expected.append(index)
+
+  assert forest.inconsistent_sums().tolist() == expected == [3]
+
+def test_inconsistent_sums_compares_satang():
+  root = BudgetItem('BUDGET_DETAIL', 'root', 0.3, 'doc.pdf', 1)
+  BudgetItem('BUDGET_DETAIL', 'a', 0.1, 'doc.pdf', 1, parent=root)
+  BudgetItem('BUDGET_DETAIL', 'b', 0.2, 'doc.pdf', 1, parent=root)
+  assert len(BudgetForest.from_items(root).inconsistent_sums()) == 0
@@ -0,0 +1,94 @@
+from thbud.model import BudgetItem, FiscalYearBudget, validate
+import pickle
+
+
+def ids(nodes):
+  return {id(node) for node in nodes}
+
+
+def ministry_with_other_unit(make_ministry):
+  root = make_ministry()
+  category = root.children[0].children[0].children[0]
+  other = BudgetItem('BUDGETARY_UNIT', 'หน่วยอื่น', 0, 'doc.pdf', 8, parent=root)
+  return root, category, other
+
+def test_initial_state(make_ministry):
+  root, category, other = ministry_with_other_unit(make_ministry)
+  validator = root.enable_tracking()
+  assert validator.is_valid
+  assert validator.dirty_count == 0
+  assert validator.subtree_amount(root) == 300
+  assert validator.issues() == validate(root) == []
+
+def test_amount_edit_marks_path_dirty(make_ministry):
+  root, category, other = ministry_with_other_unit(make_ministry)
+  validator = root.enable_tracking()
+  building = category.children[0]
+
+  building.amount = 50
+  # building, category, plan, unit and ministry
+  assert validator.dirty_count == 5
+  assert validator.error_message(category) == 'While checking sum: amount of งบลงทุน is 300 but sum of children is 150\n'
+  assert validator.error_message(root) == ''
+  assert validator.invalid_nodes() == [category]
+  assert validator.subtree_amount(root) == 150
+  assert validator.dirty_count == 0
+
+  building.amount = 200
+  assert validator.is_valid
+
+def test_children_edits(make_ministry):
+  root, category, other = ministry_with_other_unit(make_ministry)
+  validator = root.enable_tracking()
+
+  extra = BudgetItem('BUDGET_DETAIL', 'extra', 10, 'doc.pdf', 9, parent=other)
+  assert extra._tracker is validator
+  assert ids(validator.invalid_nodes()) == ids([other])
+  assert validator.subtree_amount(root) == 310
+
+  extra.parent = None
+  assert extra._tracker is None
+  assert validator.is_valid
+
+  category.children = [category.children[0]]
+  assert ids(validator.invalid_nodes()) == ids([category])
+
+def test_fiscal_year_budget_edits(make_ministry):
+  root, category, other = ministry_with_other_unit(make_ministry)
+  validator = root.enable_tracking()
+  equipment = category.children[1]
+  assert validator.fiscal_year_amount(root) == 200
+
+  equipment.fiscal_year_budget.append(FiscalYearBudget('ปี 2568', 2568, 60, 2569))
+  assert validator.dirty_count == 5
+  assert validator.fiscal_year_amount(root) == 260
+
+  equipment.fiscal_year_budget = []
+  assert validator.fiscal_year_amount(category) == 200
+
+def test_results_match_full_validation(make_ministry):
+  root, category, other = ministry_with_other_unit(make_ministry)
+  validator = root.enable_tracking()
+  category.children[1].amount = 1
+  other.amount = None
+  assert validator.issues() == validate(root)
+  assert [
+    row['error_message'] for row in root.to_rows()
+    if row['budget_type'] != 'FISCAL_YEAR_BUDGET'
+  ] == [
+    validator.error_message(node) for node in root.iter_preorder()
+  ]
+
+def test_disable_tracking(make_ministry):
+  root, category, other = ministry_with_other_unit(make_ministry)
+  root.enable_tracking()
+  root.disable_tracking()
+  assert all(node._tracker is None for node in root.iter_preorder())
+  assert type(category.children[0].fiscal_year_budget) is list
+
+def test_pickle_tracked_tree(make_ministry):
+  root, category, other = ministry_with_other_unit(make_ministry)
+  root.enable_tracking()
+  copy = pickle.loads(pickle.dumps(root))
+  assert copy._tracker is None
+  assert copy.to_json() == root.to_json()
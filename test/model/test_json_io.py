@@ -0,0 +1,73 @@
+import io
+import json
+import sys
+
+from thbud.model import BudgetItem, FiscalYearBudget, dump_json, load_json
+from thbud.model import jsonio
+import pytest
+
+
+def make_varied_tree(make_tree):
+  # strings to escape and floats of several magnitudes
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  ministry.name = 'กระทรวง "ก"'
+  unit.name = 'หน่วย\n\\'
+  unit.fiscal_year_budget.append(FiscalYearBudget('ปี 2569-2570', 2569, 1e-7, 2570))
+  building.amount = 199.5
+  equipment.amount = 100.5
+  other.amount = 123456789
+  other.document = 'เล่ม 2.pdf'
+  return root
+
+def deep_tree(depth):
+  root = node = BudgetItem('ROOT', 'ROOT', 1, '', 0)
+  for i in range(depth):
+    node = BudgetItem('BUDGET_DETAIL', f'detail {i}', 1, '', i, parent=node)
+  return root
+
+@pytest.mark.parametrize('indent', [None, 0, 4, '\t'])
+@pytest.mark.parametrize('ensure_ascii', [True, False])
+def test_dump_json_matches_json_dump(indent, ensure_ascii, make_tree):
+  root = make_varied_tree(make_tree)
+  fp = io.StringIO()
+  dump_json(root, fp, indent=indent, ensure_ascii=ensure_ascii)
+  assert fp.getvalue() == json.dumps(
+    root.to_json(), indent=indent, ensure_ascii=ensure_ascii)
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 1 << 16])
+def test_load_json(monkeypatch, chunk_size, make_tree):
+  monkeypatch.setattr(jsonio, 'CHUNK_SIZE', chunk_size)
+  root = make_varied_tree(make_tree)
+  for indent in [None, 4]:
+    text = json.dumps(root.to_json(), indent=indent, ensure_ascii=False)
+    assert load_json(io.StringIO(text)).to_json() == root.to_json()
+
+def test_load_escaped_keys():
+  text = '{"budget_type": "ROOT", "na\\u006de": "root", "amount": null, "document": "", "page": 0}'
+  root = load_json(io.StringIO(text))
+  assert root.name == 'root'
+  assert root.children == ()
+
+def test_load_invalid_json(make_tree):
+  with pytest.raises(json.JSONDecodeError):
+    load_json(io.StringIO('{"budget_type": "ROOT", "children": [}'))
+  with pytest.raises(json.JSONDecodeError):
+    load_json(io.StringIO('[]'))
+  with pytest.raises(json.JSONDecodeError):
+    load_json(io.StringIO(json.dumps(make_tree().to_json()) + ' {}'))
+
+def test_deep_tree():
+  depth = sys.getrecursionlimit() + 100
+  root = deep_tree(depth)
+
+  # comparing nested dicts recurses, so the trees are compared by rows
+  rows = root.to_rows()
+  assert rows[-1][f'name_{depth + 1}'] == f'detail {depth - 1}'
+  assert BudgetItem.from_json(root.to_json()).to_rows() == rows
+
+  fp = io.StringIO()
+  dump_json(root, fp, indent=4)
+  fp.seek(0)
+  loaded = load_json(fp)
+  assert sum(1 for _ in loaded.iter_preorder()) == depth + 1
+  assert loaded.to_rows() == rows
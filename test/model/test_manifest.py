@@ -0,0 +1,107 @@
+import json
+import os
+
+import thbud
+from thbud.manifest import (
+    BuildManifest,
+    CHANGED,
+    MISSING_OUTPUT,
+    NEW,
+    VERSION,
+    code_version,
+    file_hash,
+)
+
+
+def make_files(tmp_path):
+  input_path = str(tmp_path / 'input.xlsx')
+  output_path = str(tmp_path / 'input.json')
+  with open(input_path, 'wb') as fp:
+    fp.write(b'content')
+  with open(output_path, 'w') as fp:
+    fp.write('{}')
+  return input_path, output_path
+
+def test_stale_reasons(tmp_path):
+  input_path, output_path = make_files(tmp_path)
+  manifest_path = str(tmp_path / '_manifest.json')
+  manifest = BuildManifest(manifest_path)
+  assert manifest.version == code_version()
+  assert manifest.stale_reason(input_path, output_path) == NEW
+
+  manifest.record(input_path, output_path)
+  assert manifest.stale_reason(input_path, output_path) is None
+
+  manifest.close()
+  manifest = BuildManifest(manifest_path)
+  assert manifest.stale_reason(input_path, output_path) is None
+  assert BuildManifest(manifest_path, version='0.0.0').stale_reason(
+    input_path, output_path) == VERSION
+
+  os.remove(output_path)
+  assert manifest.stale_reason(input_path, output_path) == MISSING_OUTPUT
+
+  with open(input_path, 'wb') as fp:
+    fp.write(b'changed')
+  assert manifest.stale_reason(input_path, output_path) == CHANGED
+
+def test_touched_file_is_not_stale(tmp_path):
+  input_path, output_path = make_files(tmp_path)
+  manifest = BuildManifest(str(tmp_path / '_manifest.json'))
+  manifest.record(input_path, output_path)
+  stat = os.stat(input_path)
+  os.utime(input_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+  info = manifest.file_info(input_path)
+  assert info.hash == file_hash(input_path)
+  assert manifest.stale_reason(input_path, output_path, info) is None
+  # the new modification time is kept, so the file is not hashed again
+  manifest.close()
+  entry = BuildManifest(str(tmp_path / '_manifest.json')).entries[input_path]
+  assert entry.mtime_ns == stat.st_mtime_ns + 10 ** 9
+
+def test_unchanged_file_is_not_hashed(tmp_path):
+  input_path, output_path = make_files(tmp_path)
+  manifest_path = str(tmp_path / '_manifest.json')
+  with BuildManifest(manifest_path) as manifest:
+    manifest.record(input_path, output_path)
+  with open(manifest_path) as fp:
+    data = json.load(fp)
+  data['inputs'][input_path]['hash'] = 'recorded'
+  with open(manifest_path, 'w') as fp:
+    json.dump(data, fp)
+  assert BuildManifest(manifest_path).file_info(input_path).hash == 'recorded'
+
+def test_removed_inputs(tmp_path):
+  input_path, output_path = make_files(tmp_path)
+  manifest = BuildManifest(str(tmp_path / '_manifest.json'))
+  manifest.record(input_path, output_path)
+  assert manifest.removed_inputs([input_path]) == []
+  assert manifest.removed_inputs([]) == [input_path]
+
+def test_records_are_saved_in_batches(tmp_path):
+  input_path, output_path = make_files(tmp_path)
+  manifest_path = str(tmp_path / '_manifest.json')
+  manifest = BuildManifest(manifest_path)
+  manifest.record(input_path, output_path)
+  assert not os.path.exists(manifest_path)
+  manifest.close()
+  assert BuildManifest(manifest_path).stale_reason(input_path, output_path) is None
+
+  # saved on every record
+  manifest = BuildManifest(manifest_path, save_interval=0)
+  manifest.record(input_path, output_path, manifest.file_info(input_path))
+  os.remove(manifest_path)
+  manifest.record(input_path, output_path)
+  assert os.path.exists(manifest_path)
+
+def test_code_version(tmp_path):
+  script_path = tmp_path / 'convert.py'
+  script_path.write_text('VERSION = 1')
+  version = code_version(str(script_path))
+  assert version.startswith(thbud.__version__ + '+')
+  assert version != code_version()
+  code_version.cache_clear()
+  assert code_version(str(script_path)) == version
+  script_path.write_text('VERSION = 2')
+  code_version.cache_clear()
+  assert code_version(str(script_path)) != version
@@ -1,5 +1,5 @@
 import re
-from thbud.build_csv import extract_budget_item_name
+from thbud.build_csv import extract_budget_item_name, extract_budget_item_names
 
 
 def test_extract_name_with_bullet_and_one_amount():
@@ -65,4 +65,18 @@ def test_extract_name_with_no_amount_and_no_bullet():
     ]
 
     for line, expected in test_cases:
-        assert extract_budget_item_name(line) == expected
\ No newline at end of file
+        assert extract_budget_item_name(line) == expected
+
+
+def test_extract_names_in_batch():
+    lines = [
+        '1. งบรายจ่ายอื่น 3,469,200 บาท',
+        '(3) ค่าโทรศัพท์ 5,789,500 บาท',
+        '1. งบรายจ่ายอื่น 3,469,200 บาท',
+        '1) งบรายจ่ายอื่น - 3,469,200 บาท',
+    ]
+    assert extract_budget_item_names(lines) == [
+        extract_budget_item_name(line) for line in lines]
+    assert extract_budget_item_names(lines, double_amount=True) == [
+        extract_budget_item_name(line, double_amount=True) for line in lines]
+    assert extract_budget_item_names([]) == []
@@ -0,0 +1,53 @@
+import pandas as pd
+
+from thbud.model import BudgetItem, FiscalYearBudget, ObligationMatrix
+from thbud.build_csv import build_csv, build_csv_frame, csv_columns
+
+
+def make_obliged_ministry(make_ministry):
+  # obligations over three years, over two single years and none
+  ministry = make_ministry()
+  category = ministry.children[0].children[0].children[0]
+  building = category.children[0]
+  building.fiscal_year_budget = [FiscalYearBudget('ปี 2568-2570', 2568, 300, 2570)]
+  road = BudgetItem('BUDGET_DETAIL', 'ค่าถนน', 100, 'doc.pdf', 7, parent=category)
+  road.fiscal_year_budget.append(FiscalYearBudget('ปี 2568', 2568, 60, 2568))
+  road.fiscal_year_budget.append(FiscalYearBudget('ปี 2569', 2569, 40, 2569))
+  return ministry
+
+def test_entries(make_ministry):
+  matrix = ObligationMatrix.from_items(make_obliged_ministry(make_ministry))
+  assert len(matrix) == 5
+  assert matrix.years.tolist() == [2568, 2569, 2570]
+  assert matrix.shape == (7, 3)
+  # amount / max(1, year_end - year) as in build_csv
+  assert matrix.entry_amount.tolist() == [150, 150, 150, 60, 40]
+  assert matrix.node_entry_counts().tolist() == [0, 0, 0, 0, 3, 0, 2]
+
+def test_dense_and_totals(make_ministry):
+  matrix = ObligationMatrix.from_items(make_obliged_ministry(make_ministry))
+  dense = matrix.to_dense()
+  assert dense[4].tolist() == [150, 150, 150]
+  assert dense[6].tolist() == [60, 40, 0]
+  assert matrix.totals_by_year() == {2568: 210, 2569: 190, 2570: 150}
+  assert matrix.schedule(6) == {2568: 60, 2569: 40}
+  assert matrix.schedule(5) == {}
+  assert matrix.subtree_totals()[0].tolist() == [210, 190, 150]
+
+def test_empty_span():
+  root = BudgetItem('MINISTRY', 'กระทรวง', 100, 'doc.pdf', 1)
+  root.fiscal_year_budget.append(FiscalYearBudget('ปี', 2569, 100, 2568))
+  matrix = ObligationMatrix.from_items(root)
+  assert len(matrix) == 0
+  assert matrix.subtree_totals().shape == (1, 0)
+
+def test_build_csv_frame(make_ministry):
+  tree = make_obliged_ministry(make_ministry)
+  df = build_csv_frame(tree, category_levels=2)
+  expected = pd.DataFrame.from_records(build_csv(tree), columns=csv_columns(2))
+  assert list(df.columns) == csv_columns(2)
+  assert df['FISCAL_YEAR'].dtype == 'Int64'
+  assert df['FISCAL_YEAR'].tolist() == [2568, 2569, 2570, pd.NA, 2568, 2569]
+  assert df['AMOUNT'].tolist() == expected['AMOUNT'].tolist()
+  assert df['ITEM_DESCRIPTION'].tolist() == expected['ITEM_DESCRIPTION'].tolist()
+  assert df['OBLIGED?'].tolist() == [True] * 3 + [False] + [True] * 2
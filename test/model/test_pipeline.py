@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from thbud.pipeline import Pipeline, Stage, run_concurrently
+
+
+def test_values_go_through_every_stage():
+  pipeline = Pipeline([
+    Stage('double', lambda x: x * 2, workers=3),
+    Stage('add', lambda x: x + 1, workers=2),
+  ])
+  results = list(pipeline.run(range(100)))
+  assert sorted(result.item for result in results) == list(range(100))
+  assert all(result.ok and result.value == result.item * 2 + 1 for result in results)
+  assert all(set(result.seconds) == {'double', 'add'} for result in results)
+  stats = pipeline.stats()
+  assert [(s.name, s.processed, s.failed, s.waiting) for s in stats] == [
+    ('double', 100, 0, 0), ('add', 100, 0, 0)]
+
+def test_error_skips_remaining_stages():
+  calls = []
+
+  def check(x):
+    if x == 3:
+      raise ValueError('three')
+    return x
+
+  pipeline = Pipeline([Stage('check', check), Stage('record', calls.append)])
+  results = {result.item: result for result in pipeline.run(range(5))}
+  assert isinstance(results[3].error, ValueError)
+  assert results[3].stage == 'check'
+  assert 'ValueError: three' in results[3].traceback
+  assert results[3].value is None
+  assert sorted(calls) == [0, 1, 2, 4]
+  assert pipeline.stats()[0].failed == 1
+
+def test_queues_bound_the_values_in_flight():
+  lock = threading.Lock()
+  in_flight = [0, 0]
+
+  def start(x):
+    with lock:
+      in_flight[0] += 1
+      in_flight[1] = max(in_flight[1], in_flight[0])
+    return x
+
+  def slow_end(x):
+    time.sleep(0.001)
+    with lock:
+      in_flight[0] -= 1
+    return x
+
+  pipeline = Pipeline([Stage('start', start), Stage('end', slow_end)], queue_size=2)
+  assert len(list(pipeline.run(range(50)))) == 50
+  # one value in each worker, the queue of the slow stage and the results
+  assert in_flight[1] <= 5
+
+def test_invalid_pipelines():
+  with pytest.raises(ValueError):
+    Pipeline([])
+  with pytest.raises(ValueError):
+    Pipeline([Stage('a', str), Stage('a', str)])
+  with pytest.raises(ValueError):
+    Stage('a', str, workers=0)
+  pipeline = Pipeline([Stage('a', str)])
+  list(pipeline.run([1]))
+  with pytest.raises(RuntimeError):
+    list(pipeline.run([1]))
+
+def test_run_concurrently():
+  release = threading.Event()
+
+  def slow(x):
+    release.wait(5)
+    return x
+
+  slow_pipeline = Pipeline([Stage('slow', slow)])
+  fast_pipeline = Pipeline([Stage('fast', lambda x: x * 2, workers=2)])
+  results = run_concurrently([(slow_pipeline, [-1]), (fast_pipeline, range(10))])
+  # the fast pipeline is not held back by the slow one
+  fast = [next(results) for _ in range(10)]
+  assert sorted(result.value for result in fast) == [x * 2 for x in range(10)]
+  release.set()
+  assert [result.value for result in results] == [-1]
@@ -0,0 +1,57 @@
+import zipfile
+
+import pytest
+
+from thbud.schedule import (
+  CostModel,
+  estimate_cost,
+  lpt_makespan,
+  pack_tasks,
+  page_count,
+)
+
+
+def test_lpt_makespan():
+  assert lpt_makespan([], 2) == 0
+  assert lpt_makespan([5, 3, 3, 2], 2) == 7
+  # a large task given last finishes last
+  assert lpt_makespan([1, 1, 1, 1, 6], 2) == 8
+  assert lpt_makespan([6, 1, 1, 1, 1], 2) == 6
+
+def test_pack_tasks():
+  costs = [10, 1, 1, 1, 8, 1, 1]
+  tasks = pack_tasks(costs, workers=2, task_cost=3)
+  assert sorted(index for task in tasks for index in task) == list(range(len(costs)))
+  assert tasks[:2] == [[0], [4]]
+  # the small files share tasks of at least the task cost, except the last
+  assert [len(task) for task in tasks[2:]] == [3, 2]
+  task_costs = [sum(costs[index] for index in task) for task in tasks]
+  assert task_costs == sorted(task_costs, reverse=True)
+
+def test_cost_model_fit():
+  mb = 1 << 20
+  records = [
+    {'size': 1 * mb, 'pages': 10, 'seconds': 2 * 1 + 0.5 * 10},
+    {'size': 4 * mb, 'pages': 10, 'seconds': 2 * 4 + 0.5 * 10},
+    {'size': 2 * mb, 'pages': 30, 'seconds': 2 * 2 + 0.5 * 30},
+  ]
+  model = CostModel.fit(records)
+  assert model.seconds_per_mb == pytest.approx(2)
+  assert model.seconds_per_page == pytest.approx(0.5)
+  assert model.predict(3 * mb, 2) == pytest.approx(7)
+
+def test_cost_model_defaults_and_history():
+  model = CostModel.fit([])
+  assert model.seconds_per_mb > 0
+  assert estimate_cost(model, 100, 1, {'size': 100, 'seconds': 42}) == 42
+  assert estimate_cost(model, 200, 1, {'size': 100, 'seconds': 42}) == model.predict(200, 1)
+
+def test_page_count(tmp_path):
+  path = tmp_path / 'doc.xlsx'
+  with zipfile.ZipFile(path, 'w') as archive:
+    archive.writestr('xl/worksheets/sheet1.xml', '')
+    archive.writestr('xl/worksheets/sheet2.xml', '')
+    archive.writestr('xl/worksheets/_rels/sheet1.xml.rels', '')
+  assert page_count(str(path)) == 2
+  assert page_count('test/data/budget-1page-5nodes.pdf') == 1
+  assert page_count(str(tmp_path / 'missing.pdf')) == 0
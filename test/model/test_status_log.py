@@ -0,0 +1,29 @@
+from thbud.statuslog import CRASH, OK, SKIPPED, StatusLog, is_failure
+
+
+def test_failed_files_and_runs(tmp_path):
+  log = StatusLog(str(tmp_path / '_status.jsonl'))
+  assert log.last_run() is None
+  log.append({'run': '1', 'file': 'a.xlsx', 'status': OK})
+  log.append({'run': '1', 'file': 'b.xlsx', 'status': 'NoEntriesFoundError'})
+  log.append({'run': '1', 'file': 'c.xlsx', 'status': CRASH, 'traceback': '...'})
+  log.append({'run': '2', 'file': 'c.xlsx', 'status': OK})
+  log.append({'run': '2', 'file': 'd.xlsx', 'status': SKIPPED})
+
+  assert log.last_run() == '2'
+  assert log.files_of_run('2') == {'c.xlsx', 'd.xlsx'}
+  assert log.failed_files() == {'b.xlsx'}
+  assert all('time' in record for record in log.read())
+
+def test_line_cut_short_is_ignored(tmp_path):
+  path = tmp_path / '_status.jsonl'
+  path.write_text('{"run": "1", "file": "a.xlsx", "status": "ok"}\n{"run": "1", "fi')
+  log = StatusLog(str(path))
+  log.append({'run': '1', 'file': 'b.xlsx', 'status': CRASH})
+  assert [record['file'] for record in log.read()] == ['a.xlsx', 'b.xlsx']
+
+def test_is_failure():
+  assert not is_failure(OK)
+  assert not is_failure(SKIPPED)
+  assert is_failure(CRASH)
+  assert is_failure('CannotFindStartPageError')
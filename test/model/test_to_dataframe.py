@@ -0,0 +1,52 @@
+import pandas as pd
+
+from thbud.model import BudgetItem
+
+
+def make_invalid_ministry(make_ministry):
+  ministry = make_ministry()
+  unit, = ministry.children
+  unit.amount = 200
+  equipment = unit.children[0].children[0].children[1]
+  equipment.amount = None
+  return ministry
+
+def test_columns_and_types(make_ministry):
+  df = make_invalid_ministry(make_ministry).to_dataframe()
+  assert list(df.columns) == [
+    'error_message', 'budget_type', 'name_1', 'name_2', 'name_3', 'name_4', 'name_5',
+    'amount', 'document', 'page', 'fiscal_year', 'fiscal_year_end',
+  ]
+  assert df['amount'].dtype == 'float64'
+  assert df['page'].dtype == 'Int64'
+  assert df['fiscal_year'].dtype == 'Int64'
+  assert df['budget_type'].tolist() == [
+    'MINISTRY', 'BUDGETARY_UNIT', 'BUDGET_PLAN', 'BUDGET_DETAIL',
+    'BUDGET_DETAIL', 'FISCAL_YEAR_BUDGET', 'BUDGET_DETAIL']
+  assert df['page'].isna().tolist() == [False] * 5 + [True, False]
+  assert df['fiscal_year'].tolist()[5] == 2568
+  assert df['fiscal_year_end'].tolist()[5] == 2569
+  assert df['name_2'].notna().tolist() == [False, True] + [False] * 5
+  assert df['error_message'].tolist() == [
+    'While checking sum: amount of กระทรวง ก is 300 but sum of children is 200\n',
+    'While checking sum: amount of หน่วย is 200 but sum of children is 300\n',
+    '',
+    'While checking sum: amount of งบลงทุน is 300 but some of children is None\n',
+    '',
+    '',
+    '',
+  ]
+
+def test_same_rows_as_to_rows(make_ministry):
+  tree = make_invalid_ministry(make_ministry)
+  df = tree.to_dataframe(depth=2)
+  expected = pd.DataFrame(tree.to_rows(depth=2))[df.columns]
+  for column in df.columns:
+    assert (
+      df[column].astype(object).where(df[column].notna(), None).tolist()
+      == expected[column].astype(object).where(expected[column].notna(), None).tolist()
+    )
+
+def test_round_trip(make_ministry):
+  tree = make_invalid_ministry(make_ministry)
+  assert BudgetItem.build_tree_by_dataframe(tree.to_dataframe()).to_json() == tree.to_json()
@@ -0,0 +1,77 @@
+from thbud.model.tree import TreeNode, LoopError, TreeError
+import pytest
+
+
+def test_parent_appends_child(make_tree):
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  assert root.children == (ministry, other)
+  assert category.children == (building, equipment)
+  assert building.parent is category
+  assert root.is_root and not ministry.is_root
+  assert other.is_leaf and not ministry.is_leaf
+  assert building.root is root
+  assert building.depth == 5
+  assert building.path == (root, ministry, unit, plan, category, building)
+
+def test_children_are_read_only(make_tree):
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  children = root.children
+  with pytest.raises(AttributeError):
+    children.append(TreeNode())
+  with pytest.raises(TypeError):
+    children[0] = TreeNode()
+  assert children == (ministry, other) and children == [ministry, other]
+  assert list(reversed(children)) == [other, ministry]
+  assert len(children) == 2 and ministry in children and unit not in children
+  # a view, not a copy
+  building.parent = root
+  assert children == (ministry, other, building)
+
+def test_move_node(make_tree):
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  building.parent = other
+  assert category.children == (equipment,)
+  assert other.children == (building,)
+  building.parent = None
+  assert other.children == ()
+  assert building.parent is None
+
+def test_set_children(make_tree):
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  other.children = [equipment, building]
+  assert category.children == ()
+  assert other.children == (equipment, building)
+  assert equipment.parent is other
+  del other.children
+  assert other.children == ()
+  assert building.parent is None
+
+def test_loops_are_rejected(make_tree):
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  with pytest.raises(LoopError):
+    ministry.parent = building
+  with pytest.raises(LoopError):
+    ministry.parent = ministry
+  with pytest.raises(LoopError):
+    building.children = [root]
+  with pytest.raises(TreeError):
+    other.children = [building, building]
+  with pytest.raises(TreeError):
+    other.parent = 'a'
+  assert ministry.parent is root
+
+def test_iteration_order(make_tree):
+  root, ministry, unit, plan, category, building, equipment, other = nodes = list(make_tree().iter_preorder())
+  assert list(root.iter_preorder()) == nodes
+  assert list(root.iter_postorder()) == [
+    building, equipment, category, plan, unit, ministry, other, root]
+  assert list(other.iter_postorder()) == [other]
+
+def test_deep_tree_iteration():
+  root = node = TreeNode()
+  for _ in range(5000):
+    child = TreeNode()
+    child.parent = node
+    node = child
+  assert sum(1 for _ in root.iter_preorder()) == 5001
+  assert next(root.iter_postorder()) is node
@@ -0,0 +1,99 @@
+from thbud.model import BudgetItem, BudgetType, TreeIndex
+import pytest
+
+
+CATEGORY_PATH = ('ROOT', 'กระทรวง ก', 'หน่วย', 'แผนงานบูรณาการ ก', 'งบลงทุน')
+
+def test_ids_and_paths(make_tree):
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  equipment.name = building.name
+  index = TreeIndex(root)
+  assert len(index) == 8
+  assert index.node_id(category) == 4
+  assert index[4] is category
+  assert index.get(CATEGORY_PATH) is category
+  assert index.path(equipment) == CATEGORY_PATH + ('ค่าก่อสร้าง',)
+  assert index.find(CATEGORY_PATH + ('ค่าก่อสร้าง',)) == [building, equipment]
+  assert index.find(['ROOT', 'missing', 'หน่วย']) == []
+  with pytest.raises(KeyError):
+    index.get(CATEGORY_PATH + ('ค่าก่อสร้าง',))
+  with pytest.raises(KeyError):
+    index.node_id(BudgetItem('OUTPUT', 'output', 0, '', 0))
+
+def test_by_type(make_tree):
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  index = TreeIndex(root)
+  assert index.of_type(BudgetType.MINISTRY) == [ministry, other]
+  assert index.of_type('BUDGET_DETAIL') == [category, building, equipment]
+  assert index.of_type('PROJECT') == []
+
+def test_intervals(make_tree):
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  index = TreeIndex(root)
+  assert index.interval(ministry) == (1, 6)
+  assert index.interval(other) == (7, 7)
+  assert index.is_ancestor(ministry, equipment)
+  assert index.is_ancestor(root, other)
+  assert not index.is_ancestor(other, equipment)
+  assert not index.is_ancestor(category, category)
+  assert index.descendants(plan) == [category, building, equipment]
+
+def test_index_is_patched_after_mutation(make_tree):
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  index = TreeIndex(root)
+  ministry_id, unit_id, category_id = map(index.node_id, (ministry, unit, category))
+
+  category.parent = other
+  assert not index.is_stale
+  assert index.node_id(category) == category_id
+  assert index.path(building) == ('ROOT', 'กระทรวง ข', 'งบลงทุน', 'ค่าก่อสร้าง')
+  assert index.get(['ROOT', 'กระทรวง ข', 'งบลงทุน']) is category
+  assert index.find(CATEGORY_PATH) == []
+  assert not index.is_ancestor(ministry, building)
+  assert index.is_ancestor(other, building)
+  assert index.interval(other) == (4, 7)
+
+  other.name = 'renamed'
+  assert index.get(['ROOT', 'renamed', 'งบลงทุน']) is category
+  equipment.name = 'first'
+  building.name = 'first'
+  assert index.find(['ROOT', 'renamed', 'งบลงทุน', 'first']) == [building, equipment]
+  building.budget_type = BudgetType.PROJECT
+  assert index.of_type('PROJECT') == [building]
+  assert index.of_type('BUDGET_DETAIL') == [category, equipment]
+
+  # new nodes get new ids, removed nodes leave theirs unused
+  project = BudgetItem('PROJECT', 'project', 0, 'doc.pdf', 8, parent=unit)
+  assert index.node_id(project) == 8
+  assert index.descendants(ministry) == [unit, plan, project]
+  unit.parent = None
+  assert len(index) == 6
+  with pytest.raises(KeyError):
+    index.node_id(project)
+  unit.parent = ministry
+  assert index.node_id(unit) == unit_id
+  assert index.node_id(project) == 8
+  assert index.node_id(ministry) == ministry_id
+  assert not index.is_stale
+
+def test_other_trees_do_not_touch_the_index(make_tree):
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  index = TreeIndex(root)
+  tables = index._by_name
+  nodes = list(make_tree().iter_preorder())
+  nodes[1].name = 'renamed'
+  BudgetItem('BUDGET_DETAIL', 'ค่าก่อสร้าง', 1, 'doc.pdf', 1, parent=nodes[4])
+  assert index.get(CATEGORY_PATH) is category
+  assert index._by_name is tables
+  assert not index.is_stale
+
+def test_other_index_takes_over(make_tree):
+  root, ministry, unit, plan, category, building, equipment, other = make_tree().iter_preorder()
+  index = TreeIndex(root)
+  ids = [index.node_id(node) for node in root.iter_preorder()]
+  unit_index = TreeIndex(unit)
+  assert index.is_stale
+  assert [index.node_id(node) for node in root.iter_preorder()] == ids
+  assert not index.is_stale
+  assert unit_index.is_stale
+  assert unit_index.get(['หน่วย', 'แผนงานบูรณาการ ก']) is plan
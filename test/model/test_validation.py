@@ -0,0 +1,89 @@
+from thbud.model import BudgetItem, validate, validate_many, ValidationIssue
+from thbud.model.validation import SUM_MISMATCH, CHILD_AMOUNT_NONE, NONE_AMOUNT_WITH_CHILD_AMOUNT
+import pickle
+
+
+def ministry_with_building_amount(make_ministry, amount):
+  ministry = make_ministry()
+  building = ministry.children[0].children[0].children[0].children[0]
+  building.amount = amount
+  return ministry
+
+def test_valid_tree(make_ministry):
+  assert validate(make_ministry()) == []
+
+def test_sum_mismatch(make_ministry):
+  issues = validate(ministry_with_building_amount(make_ministry, 150))
+  assert issues == [
+    ValidationIssue(
+      index=3,
+      path=('กระทรวง ก', 'หน่วย', 'แผนงานบูรณาการ ก', 'งบลงทุน'),
+      rule=SUM_MISMATCH,
+      expected=300,
+      actual=250,
+      message='amount of งบลงทุน is 300 but sum of children is 250',
+    ),
+  ]
+  # equal issues are equal keys
+  assert set(issues) == set(validate(ministry_with_building_amount(make_ministry, 150)))
+
+def test_none_amounts(make_ministry):
+  ministry = ministry_with_building_amount(make_ministry, None)
+  ministry.amount = None
+  issues = validate(ministry)
+  assert [(issue.index, issue.rule) for issue in issues] == [
+    (0, NONE_AMOUNT_WITH_CHILD_AMOUNT),
+    (3, CHILD_AMOUNT_NONE),
+  ]
+
+def test_amounts_are_compared_in_satang():
+  root = BudgetItem('BUDGET_DETAIL', 'root', 0.3, 'doc.pdf', 1)
+  BudgetItem('BUDGET_DETAIL', 'a', 0.1, 'doc.pdf', 1, parent=root)
+  BudgetItem('BUDGET_DETAIL', 'b', 0.2, 'doc.pdf', 1, parent=root)
+  assert validate(root) == []
+  root._check_sum()
+
+def test_pickle_subtree_without_parent(make_tree):
+  ministry = make_tree().children[0]
+
+  copy = pickle.loads(pickle.dumps(ministry))
+  assert copy.parent is None
+  assert copy.to_json() == ministry.to_json()
+  assert all(child.parent is copy for child in copy.children)
+
+def test_validate_many(make_tree):
+  ministries = list(make_tree().children)
+  building = ministries[0].children[0].children[0].children[0].children[0]
+  building.amount = 1
+
+  expected = [validate(ministry) for ministry in ministries]
+  assert validate_many(ministries, max_workers=2) == expected
+  assert validate_many(ministries, max_workers=1) == expected
+  assert [len(issues) for issues in expected] == [1, 0]
+
+def test_not_finite_amounts():
+  # missing amounts of rows read with pandas are NaN
+  nan = float('nan')
+  rows = [
+    {'budget_type': 'MINISTRY', 'name_1': 'm', 'amount': nan, 'document': 'doc.pdf', 'page': 1},
+    {'budget_type': 'BUDGETARY_UNIT', 'name_2': 'u', 'amount': 1.0, 'document': 'doc.pdf', 'page': 1},
+    {'budget_type': 'BUDGET_PLAN', 'name_3': 'p', 'amount': nan, 'document': 'doc.pdf', 'page': 1},
+  ]
+  root = BudgetItem.build_tree_by_rows(rows)
+  issues = validate(root)
+  assert [(issue.index, issue.rule) for issue in issues] == [
+    (0, SUM_MISMATCH),
+    (1, SUM_MISMATCH),
+  ]
+  assert issues[0].message == 'amount of m is nan but sum of children is 1.0'
+  assert issues[1].message == 'amount of u is 1.0 but sum of children is nan'
+  assert root.to_rows()[0]['error_message'] == \
+    'While checking sum: amount of m is nan but sum of children is 1.0\n'
+  assert len(root.to_dataframe()) == 3
+
+  root.amount = float('inf')
+  root.children[0].amount = float('inf')
+  root.children[0].children[0].amount = float('inf')
+  assert validate(root) == []
+  root.children[0].children[0].amount = 1.0
+  assert [issue.rule for issue in validate(root)] == [SUM_MISMATCH]
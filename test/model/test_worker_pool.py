@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from thbud.workerpool import (
+  CRASH,
+  RSS,
+  TASKS,
+  RecyclingPool,
+  WorkerCrashedError,
+  WorkerError,
+  rss_bytes,
+)
+
+
+def pid_of_task(value):
+  if value == 'raise':
+    raise KeyError('missing')
+  if value == 'exit':
+    os._exit(3)
+  return os.getpid()
+
+
+def test_workers_are_replaced_after_max_tasks():
+  with RecyclingPool(pid_of_task, workers=1, max_tasks=2) as pool:
+    pids = [pool.run(index) for index in range(5)]
+    assert pids[0] == pids[1] != pids[2] == pids[3] != pids[4]
+    assert pool.replaced[TASKS] == 2
+
+def test_workers_are_replaced_over_max_rss():
+  with RecyclingPool(pid_of_task, workers=1, max_rss=1) as pool:
+    assert pool.run(0) != pool.run(1)
+    assert pool.replaced[RSS] == 2
+
+def test_errors_and_crashes():
+  with RecyclingPool(pid_of_task, workers=1) as pool:
+    with pytest.raises(WorkerError) as info:
+      pool.run('raise')
+    assert info.value.type_name == 'KeyError'
+    assert 'KeyError' in info.value.traceback
+
+    with pytest.raises(WorkerCrashedError, match='code 3'):
+      pool.run('exit')
+    assert pool.replaced[CRASH] == 1
+    assert isinstance(pool.run(0), int)
+
+def test_rss_bytes():
+  assert rss_bytes() > 0
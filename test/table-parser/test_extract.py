@@ -1,4 +1,9 @@
 from thbud.tableparser import extract_tables, is_on_line, dfs
+from thbud.tableparser.extract import (
+  get_connected_lines, connected_components, are_on_lines, remove_contained_rects, cluster_positions, Table,
+)
+import pytest
+import numpy as np
 import fitz
 
 # is_on_line tests
@@ -9,6 +14,23 @@ def test_is_on_line():
   assert is_on_line((1, 1), (0, 0), (4, 4)) == True
   assert is_on_line((5, 5), (0, 0), (4, 4)) == False
 
+def test_are_on_lines_same_as_is_on_line():
+  points = np.array([(0, 0), (1, 1), (0, 1), (5, 5), (2, 2.00001), (-1, -1)])
+  starts = np.array([(0, 0), (0, 0), (0, 0), (0, 0), (0, 0), (3, 3)])
+  ends = np.array([(1, 1), (1, 1), (1, 1), (4, 4), (4, 4), (3, 3)])
+
+  assert are_on_lines(points, starts, ends).tolist() == [
+    is_on_line(p, s, e) for p, s, e in zip(points, starts, ends)
+  ]
+
+  # every point against every line
+  matrix = are_on_lines(points[:, None], starts[None, :], ends[None, :], tolerance=0.5)
+  assert matrix.shape == (6, 6)
+  assert matrix.tolist() == [
+    [is_on_line(p, s, e, 0.5) for s, e in zip(starts, ends)]
+    for p in points
+  ]
+
 def test_dfs():
   assert dfs(list(), {
       0: [],
@@ -54,3 +76,96 @@ def test_extract_2_tables():
 def test_extract_0_table():
   extract_tables_test("test/table-parser/pdf/pdf-0table-contain-outside-page-table.pdf", 0)
 
+
+def naive_connected_lines(rects, tolerance=10):
+  connected_lines = {}
+  for rect in rects:
+    connected_lines[rect] = [
+      line for line in rects
+      if line is not rect and (
+        is_on_line(line.top_left, rect.top_left, rect.bottom_right, tolerance)
+        or is_on_line(line.bottom_right, rect.top_left, rect.bottom_right, tolerance)
+      )
+    ]
+  return connected_lines
+
+def test_get_connected_lines_same_as_pairwise_scan():
+  for filename in [
+    "test/table-parser/pdf/pdf-1table.pdf",
+    "test/table-parser/pdf/pdf-2table.pdf",
+    "test/table-parser/pdf/pdf-0table-contain-outside-page-table.pdf",
+  ]:
+    page = fitz.open(filename)[0]
+    rects = [d['rect'] for d in page.get_drawings()]
+    assert get_connected_lines(rects) == naive_connected_lines(rects)
+
+def test_get_connected_lines_grid_of_rulings():
+  rects = []
+  for i in range(6):
+    rects.append(fitz.Rect(0, i * 20, 100, i * 20 + 0.5))
+    rects.append(fitz.Rect(i * 20, 0, i * 20 + 0.5, 100))
+  assert get_connected_lines(rects) == naive_connected_lines(rects)
+  assert get_connected_lines(rects, tolerance=1) == naive_connected_lines(rects, tolerance=1)
+
+def test_connected_components():
+  rects = [fitz.Rect(i, i, i + 1, i + 1) for i in range(5)]
+  graph = {
+    rects[0]: [rects[1]],
+    rects[1]: [],
+    rects[2]: [],
+    rects[3]: [rects[4], rects[1]],
+    rects[4]: [],
+  }
+  assert connected_components(rects, graph) == [
+    [rects[0], rects[1], rects[3], rects[4]],
+    [rects[2]],
+  ]
+
+def test_remove_contained_rects():
+  outer = fitz.Rect(0, 0, 100, 100)
+  inner = fitz.Rect(10, 10, 20, 20)
+  other = fitz.Rect(200, 0, 300, 100)
+  assert remove_contained_rects([inner, other, outer]) == [other, outer]
+
+def test_extract_long_chain_of_lines():
+  # a single connected component deeper than the recursion limit
+  rects = [fitz.Rect(i * 10, 0, i * 10 + 10, 0.5) for i in range(2000)]
+  tables = extract_tables(rects)
+  assert len(tables) == 1
+  assert len(tables[0].rects) == 2000
+
+def test_cluster_positions():
+  assert cluster_positions([10, 0, 3, 12, 20.5, 4.9]) == [0, 10, 20.5]
+  assert cluster_positions([]) == []
+
+def test_table_add_words_same_as_cell_scan():
+  page = fitz.open("test/table-parser/pdf/pdf-1table.pdf")[0]
+  table = extract_tables([d['rect'] for d in page.get_drawings()])[0]
+  words = page.get_text_words()
+
+  expected = {}
+  for i, j, cell, _ in table.table_cells:
+    for x0, y0, x1, y1, text in (w[:5] for w in words):
+      if cell.contains(((x0 + x1) / 2, (y0 + y1) / 2)):
+        expected.setdefault((i, j), []).append(text)
+
+  not_added = table.add_words([w[4] for w in words], [w[:4] for w in words])
+
+  assert len(not_added) == len(words) - sum(len(v) for v in expected.values())
+  assert {
+    (i, j): cwords for i, j, _, cwords in table.table_cells if cwords
+  } == expected
+
+def test_table_add_word():
+  rects = [fitz.Rect(0, y, 100, y + 0.5) for y in (0, 20, 40)]
+  rects += [fitz.Rect(x, 0, x + 0.5, 40) for x in (0, 50, 100)]
+  table = Table(rects)
+  assert (table.num_rows, table.num_columns) == (2, 2)
+  assert table.find_cell(60, 30) == (1, 1)
+  assert table.find_cell(50, 20) == (1, 1)
+  assert table.find_cell(120, 30) is None
+
+  table.add_word('a', 55, 25, 65, 35)
+  assert table.table_cells[3][3] == ['a']
+  with pytest.raises(Exception):
+    table.add_word('b', 110, 25, 120, 35)
@@ -13,3 +13,51 @@ def test_simple():
     assert isinstance(pages, list)
     assert len(pages) == 1  # 1 page
     assert len(pages[0].lines) == 3  # 3 lines
+
+
+def test_tables_are_not_parsed_by_default():
+    text = DocumentText('test/table-parser/pdf/pdf-1table.pdf')
+    assert text.pages[0].tables == []
+
+
+def test_parse_tables():
+    text = DocumentText('test/table-parser/pdf/pdf-1table.pdf', parse_tables=True)
+    page = text.pages[0]
+    assert len(page.tables) == 1
+
+    rows = page.get_table_rows()[0]
+    assert len(rows) == 9
+    assert all(len(row) == 7 for row in rows)
+    assert rows[2][1:] == ['ล้านบาท', '273.1663', '222.8746', '36.8813', '36.8813', '36.8813']
+
+
+def test_parse_tables_without_rulings():
+    text = DocumentText('test/text-extract/data/simple-thai-1page.pdf', parse_tables=True)
+    assert text.pages[0].tables == []
+
+
+def test_close():
+    with DocumentText('test/data/budget-1page-5nodes.pdf', lazy=True) as text:
+        assert text.doc is not None
+    assert text.doc is None
+    with pytest.raises(ValueError):
+        text.get_page(0)
+    text.close()  # closing twice is fine
+
+
+def test_pages_stay_after_close():
+    text = DocumentText('test/text-extract/data/simple-thai-1page.pdf')
+    text.close()
+    assert len(text.get_page(0).lines) == 3
+
+
+def test_xlsx_close(tmp_path):
+    import openpyxl
+    from thbud.textextract import XLSXDocumentText
+
+    wb = openpyxl.Workbook()
+    wb.active['A1'] = 'งบประมาณ'
+    wb.save(tmp_path / 'doc.xlsx')
+    with XLSXDocumentText(str(tmp_path / 'doc.xlsx')) as text:
+        assert len(text.pages) == 1
+    assert str(text.get_lines_in_page()[0]) == 'งบประมาณ'
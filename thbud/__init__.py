@@ -1 +1,4 @@
-from .build_csv import build_csv
\ No newline at end of file
+__version__ = '0.1.0'
+
+from .build_csv import build_csv, build_csv_frame, iter_csv_rows, write_csv, write_parquet
+from .export import export_directory
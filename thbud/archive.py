@@ -0,0 +1,165 @@
+"""
+Documents inside zip archives, such as the zip exports of Google Drive,
+read without extracting them to disk.
+
+A document in an archive has the path of the archive joined with its name
+in the archive, e.g. `exports/กระทรวง.zip/กระทรวง/AO11000.xlsx`, so it can
+be listed, logged and converted like a file on disk.
+"""
+import functools
+import io
+import os
+import weakref
+import zipfile
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+# the flag of zip entries whose names are UTF-8
+UTF8_FLAG = 0x800
+# archives that are kept open with their member names decoded
+ARCHIVE_CACHE_SIZE = 64
+
+# every archive opened by `_open_archive` and not yet garbage collected,
+# including those evicted from its cache
+_open_archives = weakref.WeakSet()
+
+
+def decode_member_name(info: zipfile.ZipInfo) -> str:
+    """
+    Returns the name of a zip entry. Names without the UTF-8 flag are
+    decoded by `zipfile` as cp437, but tools that do not set the flag
+    usually write UTF-8 or, on Thai Windows, cp874, so the original bytes
+    are decoded as UTF-8 and then cp874 before cp437 is kept.
+    """
+    if info.flag_bits & UTF8_FLAG:
+        return info.filename
+    try:
+        raw = info.filename.encode('cp437')
+    except UnicodeEncodeError:
+        # decoded with the metadata_encoding of the archive
+        return info.filename
+    for encoding in ('utf-8', 'cp874'):
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return info.filename
+
+
+def split_archive_path(path: str) -> Optional[Tuple[str, str]]:
+    """
+    Returns the path of the archive and the name in the archive of a
+    document in a zip archive, or None if `path` is not in an archive.
+    """
+    head, name = os.path.split(path)
+    names = [name]
+    while head and name:
+        if head.lower().endswith('.zip') and os.path.isfile(head):
+            # names in zip files are separated by '/' on every platform
+            return head, '/'.join(reversed(names))
+        head, name = os.path.split(head)
+        names.append(name)
+    return None
+
+
+@functools.lru_cache(maxsize=ARCHIVE_CACHE_SIZE)
+def _open_archive(
+    archive_path: str,
+    mtime_ns: int,
+    size: int,
+    pid: int,
+) -> Tuple[zipfile.ZipFile, Dict[str, zipfile.ZipInfo]]:
+    archive = zipfile.ZipFile(archive_path)
+    _open_archives.add(archive)
+    return archive, {decode_member_name(info): info for info in archive.infolist()}
+
+
+def _archive(archive_path: str) -> Tuple[zipfile.ZipFile, Dict[str, zipfile.ZipInfo]]:
+    # the open file is not shared with forked processes, which would move
+    # its offset under each other
+    stat = os.stat(archive_path)
+    return _open_archive(archive_path, stat.st_mtime_ns, stat.st_size, os.getpid())
+
+
+def close_archives():
+    """
+    Closes the archives that are kept open to read their documents, e.g.
+    at the end of a run. An archive is opened again when it is next read.
+    Documents opened from a closed archive can no longer be read.
+    """
+    _open_archive.cache_clear()
+    for archive in list(_open_archives):
+        archive.close()
+    _open_archives.clear()
+
+
+def archive_members(archive_path: str) -> Dict[str, zipfile.ZipInfo]:
+    """
+    Returns the entries of an archive by their decoded names. An archive is
+    opened and its central directory read once, and again only if it
+    changes size or modification time. The result must not be modified.
+    """
+    return _archive(archive_path)[1]
+
+
+def _find_member(archive_path: str, name: str) -> zipfile.ZipInfo:
+    try:
+        return archive_members(archive_path)[name]
+    except KeyError:
+        raise FileNotFoundError(f'{name} not found in {archive_path}') from None
+
+
+def iter_archive_documents(
+    archive_path: str,
+    extensions: Tuple[str, ...] = ('.pdf', '.xlsx'),
+) -> Iterator[str]:
+    """
+    Yields the paths of the documents in an archive with one of
+    `extensions`, without the temporary files of Excel (`~$`).
+    """
+    for name, info in archive_members(archive_path).items():
+        if info.is_dir():
+            continue
+        if (name.lower().endswith(extensions)
+                and not os.path.basename(name).startswith('~$')):
+            yield os.path.join(archive_path, name)
+
+
+def open_document(path: str) -> BinaryIO:
+    """
+    Opens a document on disk or in an archive for reading bytes. A
+    document in an archive is decompressed as it is read, and can seek,
+    though seeking backwards decompresses it again from the start.
+    """
+    member = split_archive_path(path)
+    if member is None:
+        return open(path, 'rb')
+    archive_path, name = member
+    archive, members = _archive(archive_path)
+    try:
+        info = members[name]
+    except KeyError:
+        raise FileNotFoundError(f'{name} not found in {archive_path}') from None
+    # members of an open archive can be read by several threads at once
+    return archive.open(info)
+
+
+def read_document(path: str) -> io.BytesIO:
+    """
+    Returns the bytes of a document on disk or in an archive, in memory.
+    """
+    with open_document(path) as fp:
+        return io.BytesIO(fp.read())
+
+
+def stat_document(path: str) -> Tuple[int, int]:
+    """
+    Returns the size in bytes and the modification time in nanoseconds of
+    a document on disk, or of the archive of a document in an archive.
+    """
+    member = split_archive_path(path)
+    if member is None:
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+    archive_path, name = member
+    info = _find_member(archive_path, name)
+    return info.file_size, os.stat(archive_path).st_mtime_ns
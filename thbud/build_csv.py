@@ -1,91 +1,307 @@
-from .model import BudgetItem, BudgetType
-from anytree import PreOrderIter
+from typing import Iterable, Iterator, List, TextIO, Tuple, Union
+from .model import BudgetItem, BudgetType, expand_fiscal_years
+import csv
+import functools
 import re
 
+import numpy as np
+import pandas as pd
+
+# columns of the CSV, with CATEGORY_LV1 to CATEGORY_LV{n} after PROJECT
+HEAD_COLUMNS = [
+    'REF_DOC',
+    'REF_PAGE_NO',
+    'MINISTRY',
+    'BUDGETARY_UNIT',
+    'CROSS_FUNC?',
+    'BUDGET_PLAN',
+    'OUTPUT',
+    'PROJECT',
+]
+TAIL_COLUMNS = [
+    'ITEM_DESCRIPTION',
+    'FISCAL_YEAR',
+    'AMOUNT',
+    'OBLIGED?',
+]
+CATEGORY_LEVELS = 8
+
+
+def csv_columns(category_levels: int = CATEGORY_LEVELS) -> List[str]:
+    return HEAD_COLUMNS + [
+        f'CATEGORY_LV{level}' for level in range(1, category_levels + 1)
+    ] + TAIL_COLUMNS
+
+
+_TYPE_COLUMNS = {
+    BudgetType.MINISTRY: 'MINISTRY',
+    BudgetType.BUDGETARY_UNIT: 'BUDGETARY_UNIT',
+    BudgetType.BUDGET_PLAN: 'BUDGET_PLAN',
+    BudgetType.PROJECT: 'PROJECT',
+    BudgetType.OUTPUT: 'OUTPUT',
+}
+
+
+def _context_of_children(node: BudgetItem, fields: dict, categories: tuple):
+    """
+    Returns the fields and categories that the children of `node` inherit.
+    Fields already set by an ancestor are kept, as the farthest ancestor of
+    a type wins.
+    """
+    budget_type = node.budget_type
+    if budget_type == BudgetType.BUDGET_DETAIL:
+        return fields, categories + (node.name,)
+
+    column = _TYPE_COLUMNS.get(budget_type)
+    if column is None or column in fields:
+        return fields, categories
+
+    fields = dict(fields)
+    fields[column] = node.name
+    if budget_type == BudgetType.BUDGET_PLAN:
+        fields['CROSS_FUNC?'] = node.name.startswith('แผนงานบูรณาการ')
+    return fields, categories
+
+
+def _iter_leaf_rows(root: BudgetItem) -> Iterator[Tuple[BudgetItem, dict]]:
+    """
+    Yields every leaf with its row, before the fiscal years are expanded.
+    The names of the ancestors are carried down during a single pre-order
+    traversal instead of being collected from every leaf up to the root.
+    """
+    stack = [(root, {}, ())]
+    while stack:
+        node, fields, categories = stack.pop()
+        if node.child_count:
+            fields, categories = _context_of_children(node, fields, categories)
+            stack.extend(
+                (child, fields, categories)
+                for child in node.iter_children(reverse=True))
+            continue
+
+        row = dict(
+            REF_DOC=node.document,
+            REF_PAGE_NO=node.page,
+            ITEM_DESCRIPTION=node.name,
+            AMOUNT=node.amount,
+            OUTPUT='',
+            PROJECT='',
+            FISCAL_YEAR=None,
+        )
+        row['OBLIGED?'] = len(node.fiscal_year_budget) > 0
+        row.update(fields)
+        for i, category in enumerate(categories):
+            row[f'CATEGORY_LV{i+1}'] = category
+        yield node, row
+
+
+def iter_csv_rows(root: BudgetItem) -> Iterator[dict]:
+    """
+    Yields the rows of `build_csv` one at a time.
+    """
+    for node, row in _iter_leaf_rows(root):
+        if len(node.fiscal_year_budget) > 0:
+            for fy_node in node.fiscal_year_budget:
+                total_year = fy_node.year_end - fy_node.year
+                for year in range(fy_node.year, fy_node.year_end+1):
+                    copy_row = row.copy()
+                    copy_row['FISCAL_YEAR'] = year
+                    copy_row['AMOUNT'] = fy_node.amount / max(1, total_year)
+                    yield copy_row
+        else:
+            yield row
+
+
+def build_csv_frame(
+    root: BudgetItem,
+    category_levels: int = CATEGORY_LEVELS,
+) -> pd.DataFrame:
+    """
+    Returns the rows of `build_csv` as a DataFrame with the columns of
+    `csv_columns(category_levels)`.
+
+    One row is built per leaf, and the rows of obligated leaves are
+    repeated for their fiscal years with `expand_fiscal_years`, without
+    copying a dict per year.
+
+    Raises:
+        ValueError: If a row has more category levels than the columns.
+    """
+    rows = []
+    fy_rows, fy_years, fy_year_ends, fy_amounts = [], [], [], []
+    for node, row in _iter_leaf_rows(root):
+        _check_category_levels(row, category_levels)
+        for fyb in node.fiscal_year_budget:
+            fy_rows.append(len(rows))
+            fy_years.append(fyb.year)
+            fy_year_ends.append(fyb.year_end)
+            fy_amounts.append(fyb.amount)
+        rows.append(row)
+    df = pd.DataFrame.from_records(rows, columns=csv_columns(category_levels))
+
+    budgets, years, amounts = expand_fiscal_years(
+        np.array(fy_years, dtype=np.int64),
+        np.array(fy_year_ends, dtype=np.int64),
+        np.array(fy_amounts, dtype=np.float64),
+    )
+    entry_rows = np.array(fy_rows, dtype=np.int64)[budgets]
+    # a leaf without fiscal year budgets keeps its row, an obligated leaf
+    # gets one row per year, or none if its budgets span no year
+    obliged = df['OBLIGED?'].to_numpy(dtype=bool)
+    repeats = np.where(obliged, np.bincount(entry_rows, minlength=len(df)), 1)
+    df = df.iloc[np.repeat(np.arange(len(df)), repeats)].reset_index(drop=True)
+
+    row_obliged = np.repeat(obliged, repeats)
+    fiscal_year = np.zeros(len(df), dtype=np.int64)
+    fiscal_year[row_obliged] = years
+    df['FISCAL_YEAR'] = pd.arrays.IntegerArray(fiscal_year, ~row_obliged)
+    amount = np.array(df['AMOUNT'], dtype=np.float64)
+    amount[row_obliged] = amounts
+    df['AMOUNT'] = amount
+    return df
+
+
 def build_csv(root: BudgetItem):
     """
     Build a list of dictionaries from a BudgetItem tree. Only leaf nodes are
     included in the result.
     """
-    result = []
+    return list(iter_csv_rows(root))
 
-    for node in PreOrderIter(root):
-        if node.is_leaf:
-            row = dict(
-                REF_DOC=node.document,
-                REF_PAGE_NO=node.page,
-                ITEM_DESCRIPTION=node.name,
-                AMOUNT=node.amount,
-                OUTPUT='',
-                PROJECT='',
-                FISCAL_YEAR=None,
-            )
-
-            row['OBLIGED?'] = len(node.fiscal_year_budget) > 0
-
-            curr = node.parent
-            categories = []
-            while curr is not None:
-                if curr.budget_type == BudgetType.MINISTRY:
-                    row['MINISTRY'] = curr.name
-
-                if curr.budget_type == BudgetType.BUDGETARY_UNIT:
-                    row['BUDGETARY_UNIT'] = curr.name
-
-                if curr.budget_type == BudgetType.BUDGET_PLAN:
-                    row['BUDGET_PLAN'] = curr.name
-                    row['CROSS_FUNC?'] = curr.name.startswith('แผนงานบูรณาการ')
-
-                if curr.budget_type == BudgetType.PROJECT:
-                    row['PROJECT'] = curr.name
-
-                if curr.budget_type == BudgetType.OUTPUT:
-                    row['OUTPUT'] = curr.name
-
-                if curr.budget_type == BudgetType.BUDGET_DETAIL:
-                    categories.append(curr.name)
-
-                curr = curr.parent
-
-            for i, category in enumerate(reversed(categories)):
-                row[f'CATEGORY_LV{i+1}'] = category
-
-            if len(node.fiscal_year_budget) > 0:
-                for fy_node in node.fiscal_year_budget:
-                    total_year = fy_node.year_end - fy_node.year
-                    for year in range(fy_node.year, fy_node.year_end+1):
-                        copy_row = row.copy()
-                        copy_row['FISCAL_YEAR'] = year
-                        copy_row['AMOUNT'] = fy_node.amount / max(1, total_year)
-                        result.append(copy_row)
-            else:
-                result.append(row)
 
-    return result
+def _check_category_levels(row: dict, category_levels: int):
+    if f'CATEGORY_LV{category_levels + 1}' in row:
+        raise ValueError(
+            f'{row["ITEM_DESCRIPTION"]} has more than {category_levels} '
+            'category levels, increase category_levels')
+
+
+def write_csv(
+    rows: Iterable[dict],
+    file: Union[str, TextIO],
+    category_levels: int = CATEGORY_LEVELS,
+):
+    """
+    Writes rows of `iter_csv_rows` to a CSV file as they are generated, with
+    the columns of `csv_columns(category_levels)`.
+
+    Raises:
+        ValueError: If a row has more category levels than the columns.
+    """
+    columns = csv_columns(category_levels)
+    if isinstance(file, str):
+        with open(file, 'w', newline='', encoding='utf-8') as fp:
+            return write_csv(rows, fp, category_levels)
+
+    writer = csv.writer(file)
+    writer.writerow(columns)
+    for row in rows:
+        _check_category_levels(row, category_levels)
+        writer.writerow([row.get(column, '') for column in columns])
 
+
+def parquet_schema(category_levels: int = CATEGORY_LEVELS):
+    import pyarrow as pa
+
+    types = {
+        'REF_PAGE_NO': pa.int64(),
+        'CROSS_FUNC?': pa.bool_(),
+        'FISCAL_YEAR': pa.int64(),
+        'AMOUNT': pa.float64(),
+        'OBLIGED?': pa.bool_(),
+    }
+    return pa.schema([
+        (column, types.get(column, pa.string()))
+        for column in csv_columns(category_levels)
+    ])
+
+
+def write_parquet(
+    rows: Iterable[dict],
+    path: str,
+    category_levels: int = CATEGORY_LEVELS,
+    batch_size: int = 100_000,
+):
+    """
+    Writes rows of `iter_csv_rows` to a Parquet file in batches of
+    `batch_size` rows, with the schema of `parquet_schema(category_levels)`.
+    Needs pyarrow.
+
+    Raises:
+        ValueError: If a row has more category levels than the columns.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError('Writing Parquet needs pyarrow, pip install pyarrow') from e
+
+    schema = parquet_schema(category_levels)
+    with pq.ParquetWriter(path, schema) as writer:
+        batch = []
+        for row in rows:
+            _check_category_levels(row, category_levels)
+            batch.append(row)
+            if len(batch) >= batch_size:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                batch = []
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+
+
+_OUTPUT_PREFIX = re.compile(r'([0-9\.]+\s+)?ผลผลิต(ที่)?\s+(\d+\s+)?:')
+_PROJECT_PREFIX = re.compile(r'([0-9\.]+\s+)?โครงการ(ที่)?\s+(\d+\s+)?:')
+_BULLET = re.compile(r'^[\d\s\(\)\. ]+')
+_AMOUNT = re.compile(r' ([\d,]+|-) บาท( บาท)*')
+_DOUBLE_AMOUNT = re.compile(r' ?([\d,]+|-)?' + _AMOUNT.pattern)
+_LEADING_PUNCTUATION = re.compile(r'^[\*\-\.:\)\s]+')
+_TRAILING_PUNCTUATION = re.compile(r'[\*\-\.:\(\s]$')
+
+NAME_CACHE_SIZE = 1 << 16
+
+
+@functools.lru_cache(maxsize=NAME_CACHE_SIZE)
 def extract_budget_item_name(line_string: str, double_amount: bool = False):
     if line_string.startswith('ผลผลิต :'):
         line_string = line_string[9:]
 
-    line_string = re.sub(r'([0-9\.]+\s+)?ผลผลิต(ที่)?\s+(\d+\s+)?:', '', line_string)
+    line_string = _OUTPUT_PREFIX.sub('', line_string)
 
     if line_string.startswith('โครงการ :'):
         line_string = line_string[9:]
 
-    line_string = re.sub(r'([0-9\.]+\s+)?โครงการ(ที่)?\s+(\d+\s+)?:', '', line_string)
+    line_string = _PROJECT_PREFIX.sub('', line_string)
 
     # remove bullet
-    regex_bullet = r'^[\d\s\(\)\. ]+'
-    if re.match(regex_bullet, line_string):
-        line_string = re.sub(regex_bullet, '', line_string)
+    line_string = _BULLET.sub('', line_string)
 
     # remove amount
     line_string = line_string.rsplit('$', 1)[0].strip()
-    regex_amount = r' ([\d,]+|-) บาท( บาท)*'
-    if double_amount:
-        regex_amount = r' ?([\d,]+|-)?' + regex_amount
-    line_string = re.sub(regex_amount, '', line_string)
-
-    line_string = re.sub(r'^[\*\-\.:\)\s]+', '', line_string)
-    line_string = re.sub(r'[\*\-\.:\(\s]$', '', line_string)
-    return line_string.strip()
\ No newline at end of file
+    regex_amount = _DOUBLE_AMOUNT if double_amount else _AMOUNT
+    line_string = regex_amount.sub('', line_string)
+
+    line_string = _LEADING_PUNCTUATION.sub('', line_string)
+    line_string = _TRAILING_PUNCTUATION.sub('', line_string)
+    return line_string.strip()
+
+
+def extract_budget_item_names(
+    line_strings: Iterable[str],
+    double_amount: bool = False,
+) -> List[str]:
+    """
+    Cleans many names with `extract_budget_item_name`, e.g. a column of a
+    DataFrame. Each distinct name is cleaned once.
+
+    Returns:
+        The cleaned names in the order of `line_strings`.
+    """
+    names = {}
+    result = []
+    for line_string in line_strings:
+        name = names.get(line_string)
+        if name is None:
+            name = extract_budget_item_name(line_string, double_amount)
+            names[line_string] = name
+        result.append(name)
+    return result
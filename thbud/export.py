@@ -0,0 +1,311 @@
+"""
+Export of converted JSON trees, such as `output/2568/*.json`, to one CSV or
+Parquet dataset of `build_csv` rows partitioned by ministry and fiscal year.
+
+Each tree is exported by a worker process, which streams its rows into part
+files under `<output>/_parts/<partition>/`. Once every tree is exported, the
+parts of each partition are merged into `<output>/<partition>/part-0.csv` (or
+`.parquet`), and the part files are removed. A partition is a directory
+`ministry=<MINISTRY>/fiscal_year=<FISCAL_YEAR>`, and every file of the
+dataset has the columns of `csv_columns(category_levels)`.
+"""
+import concurrent.futures
+import csv
+import json
+import os
+import shutil
+from typing import Dict, List, Optional
+
+from .build_csv import (
+    CATEGORY_LEVELS,
+    _check_category_levels,
+    csv_columns,
+    iter_csv_rows,
+    parquet_schema,
+)
+from .model import BudgetItem
+
+FORMATS = ('csv', 'parquet')
+PARTS_DIRECTORY = '_parts'
+# the name of the partition of null values, as in Hive and pyarrow
+DEFAULT_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+BATCH_SIZE = 100_000
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError('Writing Parquet needs pyarrow, pip install pyarrow') from e
+    return pa, pq
+
+
+def _partition_value(value) -> str:
+    if value is None or value == '':
+        return DEFAULT_PARTITION
+    # names must not create directories
+    return str(value).replace('%', '%25').replace('/', '%2F')
+
+
+def partition_path(ministry: Optional[str], fiscal_year: Optional[int]) -> str:
+    """
+    Returns the directory of a partition, relative to the dataset.
+    """
+    return os.path.join(
+        f'ministry={_partition_value(ministry)}',
+        f'fiscal_year={_partition_value(fiscal_year)}',
+    )
+
+
+def fiscal_year_of_directory(directory: str) -> Optional[int]:
+    """
+    Returns the fiscal year of a directory of JSON trees named after the
+    year, such as `output/2568`, or None.
+    """
+    name = os.path.basename(os.path.normpath(directory))
+    return int(name) if name.isdigit() else None
+
+
+class _CsvPart:
+    def __init__(self, path: str, columns: List[str]):
+        self.columns = columns
+        self.fp = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.fp)
+        self.writer.writerow(columns)
+
+    def write(self, row: dict):
+        self.writer.writerow([row.get(column, '') for column in self.columns])
+
+    def close(self):
+        self.fp.close()
+
+
+class _ParquetPart:
+    def __init__(self, path: str, category_levels: int):
+        pa, pq = _import_pyarrow()
+        self.record_batch = pa.RecordBatch.from_pylist
+        self.schema = parquet_schema(category_levels)
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.batch = []
+
+    def write(self, row: dict):
+        self.batch.append(row)
+        if len(self.batch) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.writer.write_batch(self.record_batch(self.batch, schema=self.schema))
+            self.batch = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def export_json_file(
+    json_path: str,
+    parts_directory: str,
+    fmt: str = 'csv',
+    category_levels: int = CATEGORY_LEVELS,
+    fiscal_year: Optional[int] = None,
+) -> int:
+    """
+    Streams the `build_csv` rows of a JSON tree into one part file per
+    partition, named after the JSON file. Rows without `FISCAL_YEAR` go to
+    the partition of `fiscal_year`, the year of the budget act.
+
+    If the export fails, the part files of the tree are removed.
+
+    Returns:
+        The number of rows.
+
+    Raises:
+        ValueError: If a row has more category levels than the columns.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown format {fmt}, expected one of {FORMATS}')
+
+    # a converted file is one budgetary unit, so it is loaded at once,
+    # which is faster than streaming it with `load_json`
+    with open(json_path, encoding='utf-8') as fp:
+        tree = BudgetItem.from_json(json.load(fp))
+
+    part_name = os.path.splitext(os.path.basename(json_path))[0] + '.' + fmt
+    columns = csv_columns(category_levels)
+    parts = {}
+    paths = []
+    row_count = 0
+    try:
+        for row in iter_csv_rows(tree):
+            _check_category_levels(row, category_levels)
+            row_year = row['FISCAL_YEAR']
+            key = (row.get('MINISTRY'), fiscal_year if row_year is None else row_year)
+            part = parts.get(key)
+            if part is None:
+                directory = os.path.join(parts_directory, partition_path(*key))
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, part_name)
+                if fmt == 'csv':
+                    part = _CsvPart(path, columns)
+                else:
+                    part = _ParquetPart(path, category_levels)
+                # only files that were created are removed if the export fails
+                paths.append(path)
+                parts[key] = part
+            part.write(row)
+            row_count += 1
+    except BaseException:
+        for part in parts.values():
+            part.close()
+        for path in paths:
+            os.remove(path)
+        raise
+
+    for part in parts.values():
+        part.close()
+    return row_count
+
+
+def _merge_csv(paths: List[str], output_path: str):
+    with open(output_path, 'w', newline='', encoding='utf-8') as output:
+        for index, path in enumerate(paths):
+            with open(path, newline='', encoding='utf-8') as fp:
+                header = fp.readline()
+                if index == 0:
+                    output.write(header)
+                shutil.copyfileobj(fp, output)
+
+
+def _merge_parquet(paths: List[str], output_path: str, category_levels: int):
+    _, pq = _import_pyarrow()
+    schema = parquet_schema(category_levels)
+    with pq.ParquetWriter(output_path, schema) as writer:
+        for path in paths:
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=BATCH_SIZE):
+                writer.write_batch(batch)
+
+
+def consolidate_parts(
+    parts_directory: str,
+    output_directory: str,
+    fmt: str = 'csv',
+    category_levels: int = CATEGORY_LEVELS,
+) -> List[str]:
+    """
+    Merges the part files of every partition into one file, in the order of
+    their names, and removes the part files.
+
+    Returns:
+        The partitions, relative to `output_directory`.
+    """
+    partitions = []
+    for directory, _, files in os.walk(parts_directory):
+        paths = sorted(
+            os.path.join(directory, name) for name in files if name.endswith('.' + fmt))
+        if not paths:
+            continue
+        partition = os.path.relpath(directory, parts_directory)
+        os.makedirs(os.path.join(output_directory, partition), exist_ok=True)
+        output_path = os.path.join(output_directory, partition, 'part-0.' + fmt)
+        if fmt == 'csv':
+            _merge_csv(paths, output_path)
+        else:
+            _merge_parquet(paths, output_path, category_levels)
+        partitions.append(partition)
+
+    shutil.rmtree(parts_directory)
+    return sorted(partitions)
+
+
+class ExportResult:
+    """
+    Result of exporting a directory of JSON trees.
+
+    :param rows: the number of rows of every exported JSON file
+    :param errors: the error of every JSON file that could not be exported
+    :param partitions: the partitions of the dataset
+    """
+
+    def __init__(
+        self,
+        rows: Dict[str, int],
+        errors: Dict[str, str],
+        partitions: List[str],
+    ):
+        self.rows = rows
+        self.errors = errors
+        self.partitions = partitions
+
+    def __repr__(self):
+        return (
+            f'ExportResult(files={len(self.rows)}, rows={sum(self.rows.values())}, '
+            f'errors={len(self.errors)}, partitions={len(self.partitions)})'
+        )
+
+
+def list_json_files(directory: str) -> List[str]:
+    """
+    Returns the JSON trees in a directory, without files such as the
+    `_manifest.json` of the conversion whose names start with `_` or `.`.
+    """
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith('.json') and not name.startswith(('_', '.'))
+    )
+
+
+def export_directory(
+    input_directory: str,
+    output_directory: str,
+    fmt: str = 'csv',
+    category_levels: int = CATEGORY_LEVELS,
+    fiscal_year: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> ExportResult:
+    """
+    Exports every JSON tree in `input_directory` to a dataset in
+    `output_directory`, with the trees exported in parallel by a pool of
+    `max_workers` processes. A tree that fails is reported in the result
+    and left out of the dataset.
+
+    `fiscal_year` defaults to the name of `input_directory` if it is a
+    year, such as `output/2568`.
+
+    Raises:
+        ValueError: If `fmt` is not one of `FORMATS`.
+        FileExistsError: If `output_directory` is not empty.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown format {fmt}, expected one of {FORMATS}')
+    if fmt == 'parquet':
+        _import_pyarrow()
+    if os.path.isdir(output_directory) and os.listdir(output_directory):
+        raise FileExistsError(f'{output_directory} is not empty')
+    if fiscal_year is None:
+        fiscal_year = fiscal_year_of_directory(input_directory)
+
+    parts_directory = os.path.join(output_directory, PARTS_DIRECTORY)
+    os.makedirs(parts_directory, exist_ok=True)
+
+    rows, errors = {}, {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        futures = {
+            executor.submit(
+                export_json_file, path, parts_directory, fmt,
+                category_levels, fiscal_year,
+            ): path
+            for path in list_json_files(input_directory)
+        }
+        for future in concurrent.futures.as_completed(futures):
+            path = futures[future]
+            try:
+                rows[path] = future.result()
+            except Exception as e:
+                errors[path] = f'{type(e).__name__}: {e}'
+
+    partitions = consolidate_parts(
+        parts_directory, output_directory, fmt, category_levels)
+    return ExportResult(rows, errors, partitions)
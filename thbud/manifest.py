@@ -0,0 +1,258 @@
+"""
+Manifest of the inputs of a batch conversion, so that a run reconverts only
+the inputs that are new, changed or converted by another version of the
+conversion code.
+"""
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from . import __version__
+from .archive import open_document, stat_document
+
+HASH_CHUNK_SIZE = 1 << 20
+# seconds between two saves of the manifest while inputs are recorded
+SAVE_INTERVAL = 60
+
+# reasons an input is stale
+NEW = 'new'
+CHANGED = 'changed'
+VERSION = 'version'
+MISSING_OUTPUT = 'missing output'
+
+
+def file_hash(path: str) -> str:
+    """
+    Returns the BLAKE2b hash of the content of a file, or of a file in a
+    zip archive, as hex.
+    """
+    digest = hashlib.blake2b()
+    with open_document(path) as fp:
+        while True:
+            chunk = fp.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def code_version(*paths: str) -> str:
+    """
+    Returns the version of the conversion code: `thbud.__version__` and a
+    hash of the source files of thbud and of `paths`, e.g. the script that
+    converts, so that any change of the code makes the outputs stale.
+    """
+    package_directory = os.path.dirname(os.path.abspath(__file__))
+    names = []
+    for directory, directories, file_names in os.walk(package_directory):
+        directories[:] = [name for name in directories if name != '__pycache__']
+        names.extend(
+            os.path.relpath(os.path.join(directory, name), package_directory)
+            for name in file_names if name.endswith('.py')
+        )
+    # the names are hashed with the content, relative to the package or
+    # without their directory, so the location of the checkout does not count
+    sources = sorted(
+        (name.replace(os.sep, '/'), os.path.join(package_directory, name))
+        for name in names
+    )
+    sources.extend((os.path.basename(path), path) for path in paths)
+    digest = hashlib.blake2b(digest_size=8)
+    for name, source in sources:
+        digest.update(name.encode('utf-8') + b'\0')
+        with open(source, 'rb') as fp:
+            digest.update(hashlib.blake2b(fp.read()).digest())
+    return f'{__version__}+{digest.hexdigest()}'
+
+
+class ManifestEntry:
+    """
+    An input of the conversion and the output it was converted to.
+
+    :param output: path of the output
+    :param hash: hash of the content of the input, see `file_hash`
+    :param size: size of the input in bytes
+    :param mtime_ns: modification time of the input in nanoseconds
+    :param version: version of the code that converted the input, see
+        `code_version`
+    """
+
+    def __init__(
+        self,
+        output: Optional[str],
+        hash: str,
+        size: int,
+        mtime_ns: int,
+        version: Optional[str] = None,
+    ):
+        self.output = output
+        self.hash = hash
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.version = version
+
+    def to_json(self):
+        return {
+            'output': self.output,
+            'hash': self.hash,
+            'size': self.size,
+            'mtime_ns': self.mtime_ns,
+            'version': self.version,
+        }
+
+    @classmethod
+    def from_json(cls, json_obj: dict) -> 'ManifestEntry':
+        return cls(
+            output=json_obj['output'],
+            hash=json_obj['hash'],
+            size=json_obj['size'],
+            mtime_ns=json_obj['mtime_ns'],
+            version=json_obj['version'],
+        )
+
+
+class BuildManifest:
+    """
+    Content hash, size, modification time and code version of every
+    converted input, stored as JSON at `path`.
+
+    An input is hashed only if its size or modification time differ from
+    the manifest, so a run over unchanged inputs reads only their metadata.
+    The manifest can be shared by threads. Recorded inputs are saved at
+    most every `save_interval` seconds and by `close`, so a run that is
+    stopped keeps most of what it converted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        version: Optional[str] = None,
+        save_interval: float = SAVE_INTERVAL,
+    ):
+        if version is None:
+            version = code_version()
+        self.path = path
+        self.version = version
+        self.save_interval = save_interval
+        self.entries: Dict[str, ManifestEntry] = {}
+        self._lock = threading.Lock()
+        self._changed = False
+        self._saved_at = time.monotonic()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as fp:
+                self.entries = {
+                    input_path: ManifestEntry.from_json(entry)
+                    for input_path, entry in json.load(fp)['inputs'].items()
+                }
+
+    def file_info(self, input_path: str) -> ManifestEntry:
+        """
+        Returns the current hash, size and modification time of an input.
+        The hash in the manifest is reused if the size and modification
+        time are the same. An input in a zip archive has the modification
+        time of the archive, see `thbud.archive.stat_document`.
+        """
+        size, mtime_ns = stat_document(input_path)
+        entry = self.entries.get(input_path)
+        if entry is not None and entry.size == size and entry.mtime_ns == mtime_ns:
+            content_hash = entry.hash
+        else:
+            content_hash = file_hash(input_path)
+        return ManifestEntry(None, content_hash, size, mtime_ns)
+
+    def stale_reason(
+        self,
+        input_path: str,
+        output_path: str,
+        info: Optional[ManifestEntry] = None,
+    ) -> Optional[str]:
+        """
+        Returns why an input must be converted, `NEW`, `CHANGED`, `VERSION`
+        or `MISSING_OUTPUT`, or None if its output is up to date. An input
+        with the same content but another size or modification time, e.g.
+        a touched file, gets them updated so that it is not hashed again.
+        """
+        if info is None:
+            info = self.file_info(input_path)
+        entry = self.entries.get(input_path)
+        if entry is None:
+            return NEW
+        if entry.hash != info.hash:
+            return CHANGED
+        if entry.size != info.size or entry.mtime_ns != info.mtime_ns:
+            with self._lock:
+                entry.size = info.size
+                entry.mtime_ns = info.mtime_ns
+                self._changed = True
+        if entry.version != self.version:
+            return VERSION
+        if entry.output != output_path or not os.path.exists(output_path):
+            return MISSING_OUTPUT
+        return None
+
+    def record(
+        self,
+        input_path: str,
+        output_path: str,
+        info: Optional[ManifestEntry] = None,
+    ):
+        """
+        Records that an input was converted to `output_path` by this
+        version. The manifest is saved if it was last saved more than
+        `save_interval` seconds ago.
+        """
+        if info is None:
+            info = self.file_info(input_path)
+        entry = ManifestEntry(
+            output_path, info.hash, info.size, info.mtime_ns, self.version)
+        with self._lock:
+            self.entries[input_path] = entry
+            self._changed = True
+            if time.monotonic() - self._saved_at >= self.save_interval:
+                self._save()
+
+    def removed_inputs(self, input_paths: List[str]) -> List[str]:
+        """
+        Returns the inputs in the manifest that are not in `input_paths`.
+        """
+        input_paths = set(input_paths)
+        return sorted(path for path in self.entries if path not in input_paths)
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def close(self):
+        """
+        Saves the changes that are not saved yet.
+        """
+        with self._lock:
+            if self._changed:
+                self._save()
+
+    def __enter__(self) -> 'BuildManifest':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as fp:
+            json.dump({
+                'inputs': {
+                    input_path: entry.to_json()
+                    for input_path, entry in sorted(self.entries.items())
+                },
+            }, fp, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self._changed = False
+        self._saved_at = time.monotonic()
@@ -1 +1,9 @@
-from .budget import BudgetItem, BudgetType, FiscalYearBudget
\ No newline at end of file
+from .budget import BudgetItem, BudgetType, FiscalYearBudget
+from .forest import BudgetForest
+from .validation import validate, validate_many, ValidationIssue
+from .index import TreeIndex
+from .diff import diff_trees, subtree_hash, TreeChange
+from .binary import dump_binary, load_binary, dumps_binary, loads_binary, BinaryFormatError
+from .jsonio import dump_json, load_json
+from .dataframe import build_tree_from_dataframe, read_tree_csv, tree_to_dataframe
+from .obligation import ObligationMatrix, expand_fiscal_years
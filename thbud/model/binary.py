@@ -0,0 +1,302 @@
+"""
+Compact binary format for BudgetItem trees.
+
+A file starts with `MAGIC` and a format version byte, followed by records.
+Each record starts with a one byte kind:
+
+- `STRING`: uint32 length and UTF-8 bytes. Strings get consecutive indices
+  in the order they are defined, and every string is defined once before
+  the first record that refers to it, so the string table is written and
+  read along with the nodes.
+- `NODE`: budget type code, name index, document index, page, number of
+  children, number of fiscal year budgets and the amount, as a number tag
+  and 8 bytes, then the fiscal year budgets (line index, year, year end and
+  amount as tagged numbers).
+
+Nodes are written in pre-order, and the number of children is enough to
+rebuild the tree. Numbers are tagged as None, int or float, so amounts
+read back exactly as they were written.
+"""
+import io
+import struct
+from typing import BinaryIO, Optional
+
+from .budget import BudgetItem, FiscalYearBudget
+from .forest import BUDGET_TYPES, BUDGET_TYPE_CODES
+
+MAGIC = b'THBT'
+VERSION = 1
+
+# record kinds
+STRING = 1
+NODE = 2
+
+# number tags
+NONE = 0
+INT = 1
+FLOAT = 2
+
+_HEADER = struct.Struct('<4sB')
+_STRING = struct.Struct('<BI')
+# kind, budget type, name, document, page, children, fiscal year budgets,
+# amount tag and amount
+_NODE_INT = struct.Struct('<BBIIiIIBq')
+_NODE_FLOAT = struct.Struct('<BBIIiIIBd')
+_NODE_TAG_OFFSET = _NODE_INT.size - 9
+_INDEX = struct.Struct('<I')
+_TAG = struct.Struct('<B')
+_INT64 = struct.Struct('<q')
+_FLOAT64 = struct.Struct('<d')
+_INT = struct.Struct('<Bq')
+_FLOAT = struct.Struct('<Bd')
+
+_INT_MIN = -2 ** 63
+_INT_MAX = 2 ** 63 - 1
+
+BUFFER_SIZE = 1 << 20
+
+
+class BinaryFormatError(ValueError):
+    """
+    Exception when a file is not a valid binary budget tree
+    """
+
+
+class _Writer:
+    def __init__(self, fp: BinaryIO):
+        self.fp = fp
+        self.buffer = bytearray()
+        self.strings = {}
+
+    def string(self, string: str) -> int:
+        index = self.strings.get(string)
+        if index is None:
+            index = len(self.strings)
+            self.strings[string] = index
+            data = string.encode('utf-8')
+            self.buffer += _STRING.pack(STRING, len(data))
+            self.buffer += data
+        return index
+
+    def number(self, value):
+        if value is None:
+            self.buffer += _TAG.pack(NONE)
+        elif isinstance(value, float):
+            self.buffer += _FLOAT.pack(FLOAT, value)
+        elif isinstance(value, int) and _INT_MIN <= value <= _INT_MAX:
+            self.buffer += _INT.pack(INT, value)
+        else:
+            raise BinaryFormatError(f'Cannot write number {value!r}')
+
+    def node(self, node: BudgetItem):
+        name = self.string(node.name)
+        document = self.string(node.document)
+        fiscal_year_budget = node.fiscal_year_budget
+        lines = [self.string(fyb.line) for fyb in fiscal_year_budget]
+
+        amount = node.amount
+        if amount is None:
+            node_struct, tag, amount = _NODE_INT, NONE, 0
+        elif isinstance(amount, float):
+            node_struct, tag = _NODE_FLOAT, FLOAT
+        elif isinstance(amount, int) and _INT_MIN <= amount <= _INT_MAX:
+            node_struct, tag = _NODE_INT, INT
+        else:
+            raise BinaryFormatError(f'Cannot write number {amount!r}')
+        self.buffer += node_struct.pack(
+            NODE,
+            BUDGET_TYPE_CODES[node.budget_type],
+            name,
+            document,
+            node.page,
+            node.child_count,
+            len(fiscal_year_budget),
+            tag,
+            amount,
+        )
+        for line, fyb in zip(lines, fiscal_year_budget):
+            self.buffer += _INDEX.pack(line)
+            self.number(fyb.year)
+            self.number(fyb.year_end)
+            self.number(fyb.amount)
+
+        if len(self.buffer) >= BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        self.fp.write(self.buffer)
+        self.buffer.clear()
+
+
+class _Reader:
+    def __init__(self, fp: BinaryIO):
+        self.fp = fp
+        self.buffer = b''
+        self.pos = 0
+        self.strings = []
+
+    def _ensure(self, size: int) -> bool:
+        """
+        Makes sure that `size` bytes are buffered. Returns False at the end
+        of the file if no bytes are left, and raises if only some are.
+        """
+        if self.pos + size <= len(self.buffer):
+            return True
+        data = self.fp.read(max(BUFFER_SIZE, size))
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        if len(self.buffer) >= size:
+            return True
+        if not self.buffer:
+            return False
+        raise BinaryFormatError('Unexpected end of file')
+
+    def unpack(self, fmt: struct.Struct):
+        if not self._ensure(fmt.size):
+            raise BinaryFormatError('Unexpected end of file')
+        values = fmt.unpack_from(self.buffer, self.pos)
+        self.pos += fmt.size
+        return values
+
+    def number(self):
+        tag, = self.unpack(_TAG)
+        if tag == NONE:
+            return None
+        if tag == INT:
+            value, = self.unpack(_INT64)
+            return value
+        if tag == FLOAT:
+            value, = self.unpack(_FLOAT64)
+            return value
+        raise BinaryFormatError(f'Unknown number tag {tag}')
+
+    def node(self) -> Optional[tuple]:
+        """
+        Reads the strings before the next node and the node. Returns None at
+        the end of the file.
+        """
+        while True:
+            if not self._ensure(1):
+                return None
+            kind = self.buffer[self.pos]
+            if kind == STRING:
+                _, length = self.unpack(_STRING)
+                if not self._ensure(length):
+                    raise BinaryFormatError('Unexpected end of file')
+                self.strings.append(
+                    self.buffer[self.pos:self.pos + length].decode('utf-8'))
+                self.pos += length
+            elif kind == NODE:
+                break
+            else:
+                raise BinaryFormatError(f'Unknown record kind {kind}')
+
+        if not self._ensure(_NODE_INT.size):
+            raise BinaryFormatError('Unexpected end of file')
+        tag = self.buffer[self.pos + _NODE_TAG_OFFSET]
+        if tag == FLOAT:
+            node_struct = _NODE_FLOAT
+        elif tag in (INT, NONE):
+            node_struct = _NODE_INT
+        else:
+            raise BinaryFormatError(f'Unknown number tag {tag}')
+        (_, budget_type, name, document, page, child_count, fyb_count,
+         _, amount) = node_struct.unpack_from(self.buffer, self.pos)
+        self.pos += node_struct.size
+        if tag == NONE:
+            amount = None
+
+        strings = self.strings
+        fiscal_year_budget = []
+        for _ in range(fyb_count):
+            line, = self.unpack(_INDEX)
+            year = self.number()
+            year_end = self.number()
+            fiscal_year_budget.append(FiscalYearBudget(
+                line=strings[line],
+                year=year,
+                year_end=year_end,
+                amount=self.number(),
+            ))
+        return (
+            BUDGET_TYPES[budget_type],
+            strings[name],
+            amount,
+            strings[document],
+            page,
+            fiscal_year_budget,
+            child_count,
+        )
+
+
+def dump_binary(root: BudgetItem, fp: BinaryIO):
+    """
+    Writes a tree to a binary file object, node by node.
+    """
+    writer = _Writer(fp)
+    writer.buffer += _HEADER.pack(MAGIC, VERSION)
+    for node in root.iter_preorder():
+        writer.node(node)
+    writer.flush()
+
+
+def load_binary(fp: BinaryIO, cls=BudgetItem) -> BudgetItem:
+    """
+    Reads a tree written by `dump_binary` from a binary file object.
+
+    Raises:
+        BinaryFormatError: If the file is not a valid binary budget tree.
+    """
+    reader = _Reader(fp)
+    magic, version = reader.unpack(_HEADER)
+    if magic != MAGIC:
+        raise BinaryFormatError('Not a binary budget tree')
+    if version != VERSION:
+        raise BinaryFormatError(f'Unsupported format version {version}')
+
+    root = None
+    # nodes that still expect children, with the number of children left
+    stack = []
+    while True:
+        record = reader.node()
+        if record is None:
+            break
+        budget_type, name, amount, document, page, fiscal_year_budget, child_count = record
+        if root is not None and not stack:
+            raise BinaryFormatError('Unexpected node after the end of the tree')
+
+        parent = None
+        if stack:
+            parent = stack[-1][0]
+            stack[-1][1] -= 1
+            if stack[-1][1] == 0:
+                stack.pop()
+        node = cls(
+            budget_type=budget_type,
+            name=name,
+            amount=amount,
+            document=document,
+            page=page,
+            parent=parent,
+            fiscal_year_budget=fiscal_year_budget,
+        )
+        if root is None:
+            root = node
+        if child_count:
+            stack.append([node, child_count])
+
+    if root is None:
+        raise BinaryFormatError('The file contains no tree')
+    if stack:
+        raise BinaryFormatError('Unexpected end of file')
+    return root
+
+
+def dumps_binary(root: BudgetItem) -> bytes:
+    fp = io.BytesIO()
+    dump_binary(root, fp)
+    return fp.getvalue()
+
+
+def loads_binary(data: bytes, cls=BudgetItem) -> BudgetItem:
+    return load_binary(io.BytesIO(data), cls)
@@ -1,6 +1,12 @@
 from enum import Enum
 from typing import List, Optional
-from anytree import NodeMixin
+from .tree import TreeNode
+from .validation import (
+    check_node,
+    error_messages,
+    IncrementalValidator,
+    TrackedList,
+)
 
 
 class BudgetType(Enum):
@@ -24,7 +30,22 @@ def get_level_from_columns(columns):
             return int(column.split('_')[1])
     raise ValueError(f'Cannot find level in {columns}')
 
-class BudgetItem(NodeMixin):
+class BudgetItem(TreeNode):
+    __slots__ = (
+        '_budget_type',
+        '_name',
+        '_amount',
+        'document',
+        'page',
+        '_fiscal_year_budget',
+        '_tracker',
+        '_index',
+        '_index_id',
+        '_subtree_hash',
+    )
+
+    _transient_slots = ('_parent', '_tracker', '_index', '_index_id', '_subtree_hash')
+
     def __init__(
         self,
         budget_type: str,
@@ -37,6 +58,12 @@ class BudgetItem(NodeMixin):
         fiscal_year_budget: List['FiscalYearBudget'] = None,
     ):
         super().__init__()
+        self._tracker = None
+        # the TreeIndex that is patched when this node changes, see index.py
+        self._index = None
+        self._index_id = None
+        # the content hash of the subtree, see diff.subtree_hash
+        self._subtree_hash = None
         if isinstance(budget_type, BudgetType):
             self.budget_type = budget_type
         elif isinstance(budget_type, str):
@@ -72,28 +99,113 @@ class BudgetItem(NodeMixin):
         if children:
             self.children = children
     
+    @property
+    def budget_type(self) -> BudgetType:
+        return self._budget_type
+
+    @budget_type.setter
+    def budget_type(self, value: BudgetType):
+        index = self._index
+        old_value = self._budget_type if index is not None else None
+        self._budget_type = value
+        if index is not None:
+            index._retyped(self, old_value)
+        if self._subtree_hash is not None:
+            self._clear_subtree_hash()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, value: str):
+        index = self._index
+        old_value = self._name if index is not None else None
+        self._name = value
+        if index is not None:
+            index._renamed(self, old_value)
+        if self._tracker is not None:
+            self._tracker.mark_dirty(self)
+        if self._subtree_hash is not None:
+            self._clear_subtree_hash()
+
+    @property
+    def amount(self) -> Optional[float]:
+        return self._amount
+
+    @amount.setter
+    def amount(self, value: Optional[float]):
+        self._amount = value
+        if self._tracker is not None:
+            self._tracker.mark_dirty(self)
+        if self._subtree_hash is not None:
+            self._clear_subtree_hash()
+
+    @property
+    def fiscal_year_budget(self) -> List['FiscalYearBudget']:
+        return self._fiscal_year_budget
+
+    @fiscal_year_budget.setter
+    def fiscal_year_budget(self, value: List['FiscalYearBudget']):
+        if self._tracker is not None:
+            value = TrackedList(value, self._fiscal_year_budget_changed)
+        self._fiscal_year_budget = value
+        if self._tracker is not None:
+            self._tracker.mark_dirty(self)
+        if self._subtree_hash is not None:
+            self._clear_subtree_hash()
+
+    def _fiscal_year_budget_changed(self):
+        if self._tracker is not None:
+            self._tracker.mark_dirty(self)
+        if self._subtree_hash is not None:
+            self._clear_subtree_hash()
+
+    def _clear_subtree_hash(self):
+        # a node is hashed after its children, so the ancestors of a node
+        # without a hash have none either
+        node = self
+        while node is not None and node._subtree_hash is not None:
+            node._subtree_hash = None
+            node = node._parent
+
+    def _child_attached(self, child):
+        if self._tracker is not None:
+            self._tracker.attach(child)
+        if self._index is not None:
+            self._index._attached(self, child)
+        if self._subtree_hash is not None:
+            self._clear_subtree_hash()
+
+    def _child_detached(self, child):
+        if self._tracker is not None:
+            self._tracker.detach(self, child)
+        if self._index is not None:
+            self._index._detached(self, child)
+        if self._subtree_hash is not None:
+            self._clear_subtree_hash()
+
+    def enable_tracking(self) -> 'IncrementalValidator':
+        """
+        Starts tracking the mutations of this tree. Changing an amount or
+        fiscal year budgets, or adding or removing children marks only the
+        path to the root dirty, and the returned validator rechecks only
+        dirty nodes.
+        """
+        return IncrementalValidator(self)
+
+    def disable_tracking(self):
+        """
+        Stops tracking the mutations of this tree.
+        """
+        if self._tracker is not None:
+            self._tracker.close()
+
     def _check_sum(self):
-        if self.amount is None:
-            if any([
-                child.amount is not None
-                for child in self.children
-            ]):
-                raise ValueError(f'amount of {self.name} is None but some of children is not None')
-            
-            return
-        if self.children:
-            if any([
-                child.amount is None
-                for child in self.children
-            ]):
-                raise ValueError(f'amount of {self.name} is {self.amount} but some of children is None')
-            
-            sum_amount = sum([
-                child.amount
-                for child in self.children
-            ])
-            if self.amount != sum_amount:
-                raise ValueError(f'amount of {self.name} is {self.amount} but sum of children is {sum_amount}')
+        issue = check_node(self)
+        if issue is not None:
+            rule, expected, actual, message = issue
+            raise ValueError(message)
 
     def __str__(self):
         return self.name
@@ -103,6 +215,26 @@ class BudgetItem(NodeMixin):
     
     @classmethod
     def from_json(cls, json_obj):
+        # children are built before their parents with an explicit stack, so
+        # that deep trees do not hit the recursion limit
+        built = [[]]
+        stack = [(json_obj, False)]
+        while stack:
+            obj, visited = stack.pop()
+            if visited:
+                children = built.pop()
+                built[-1].append(cls._from_json_fields(obj, children))
+                continue
+            built.append([])
+            stack.append((obj, True))
+            stack.extend(
+                (child, False)
+                for child in reversed(obj.get('children', list()))
+            )
+        return built[0][0]
+
+    @classmethod
+    def _from_json_fields(cls, json_obj, children):
         return cls(
             budget_type=BudgetType(json_obj['budget_type']),
             name=json_obj.get('name'),
@@ -113,10 +245,7 @@ class BudgetItem(NodeMixin):
                 FiscalYearBudget.from_json(fyb)
                 for fyb in json_obj.get('fiscal_year_budget', list())
             ],
-            children=[
-                cls.from_json(child)
-                for child in json_obj.get('children', list())
-            ]
+            children=children,
         )
     
     @classmethod
@@ -192,23 +321,49 @@ class BudgetItem(NodeMixin):
         
         return root
     
+    @classmethod
+    def build_tree_by_dataframe(cls, data) -> 'BudgetItem':
+        """
+        Builds a tree from a DataFrame in the format of `to_rows`, or from an
+        iterable of DataFrames such as a chunked `pd.read_csv` reader. See
+        `thbud.model.dataframe.build_tree_from_dataframe`.
+        """
+        from .dataframe import build_tree_from_dataframe
+        return build_tree_from_dataframe(data, cls)
+
     def to_json(self):
-        return {
-            'budget_type': self.budget_type.name,
-            'name': self.name,
-            'amount': self.amount,
-            'document': self.document,
-            'page': self.page,
-            'fiscal_year_budget': [
-                fyb.to_json()
-                for fyb in self.fiscal_year_budget
-            ],
-            'children': [
-                child.to_json()
-                for child in self.children
-            ]
-        }
+        json_obj = None
+        stack = [(self, None)]
+        while stack:
+            node, siblings = stack.pop()
+            obj = {
+                'budget_type': node.budget_type.name,
+                'name': node.name,
+                'amount': node.amount,
+                'document': node.document,
+                'page': node.page,
+                'fiscal_year_budget': [
+                    fyb.to_json()
+                    for fyb in node.fiscal_year_budget
+                ],
+                'children': [],
+            }
+            if siblings is None:
+                json_obj = obj
+            else:
+                siblings.append(obj)
+            stack.extend(
+                (child, obj['children']) for child in node.iter_children(reverse=True))
+        return json_obj
     
+    def to_dataframe(self, depth=1):
+        """
+        Returns the rows of `to_rows` as a DataFrame with typed columns, in
+        the column order of the validation CSV.
+        """
+        from .dataframe import tree_to_dataframe
+        return tree_to_dataframe(self, depth)
+
     def _get_error_message(self):
         error_message = ''
 
@@ -220,21 +375,28 @@ class BudgetItem(NodeMixin):
         return error_message
     
     def to_rows(self, depth=1):
-        rows = [{
-            'error_message': self._get_error_message(),
-            'budget_type': self.budget_type.name,
-            f'name_{depth}': self.name,
-            'amount': self.amount,
-            'document': self.document,
-            'page': self.page,
-        }]
-
-        for fyb in self.fiscal_year_budget:
-            rows.append(fyb.to_row(depth))
+        # validate the whole tree once instead of every node on its own
+        messages = error_messages(self)
+        rows = []
+        index = 0
+        stack = [(self, depth)]
+        while stack:
+            node, node_depth = stack.pop()
+            rows.append({
+                'error_message': messages.get(index, ''),
+                'budget_type': node.budget_type.name,
+                f'name_{node_depth}': node.name,
+                'amount': node.amount,
+                'document': node.document,
+                'page': node.page,
+            })
+            index += 1
 
-        for child in self.children:
-            rows.extend(child.to_rows(depth=depth+1))
+            for fyb in node.fiscal_year_budget:
+                rows.append(fyb.to_row(node_depth))
 
+            stack.extend(
+                (child, node_depth + 1) for child in node.iter_children(reverse=True))
         return rows
 
 class FiscalYearBudget:
@@ -0,0 +1,274 @@
+"""
+Conversion between BudgetItem trees and DataFrames in the format of the
+validation CSV (see README).
+"""
+import collections
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .budget import BudgetItem, BudgetType, FiscalYearBudget
+from .validation import error_messages
+
+FISCAL_YEAR_BUDGET = 'FISCAL_YEAR_BUDGET'
+
+# columns of the validation CSV that are not strings
+NUMERIC_COLUMNS = ('amount', 'page', 'fiscal_year', 'fiscal_year_end')
+
+
+def name_columns(columns: Iterable[str]) -> List[str]:
+    """
+    Returns the `name_N` columns ordered by level.
+    """
+    return sorted(
+        (column for column in columns if column.startswith('name_')),
+        key=lambda column: int(column.split('_')[1]),
+    )
+
+
+def _values_or_none(series: pd.Series) -> list:
+    values = series.tolist()
+    for index in np.flatnonzero(series.isna().to_numpy()):
+        values[index] = None
+    return values
+
+
+def _ints_or_none(series: pd.Series) -> list:
+    # CSV columns with missing values are read as floats
+    is_na = series.isna().to_numpy()
+    ints = np.zeros(len(series), dtype=np.int64)
+    ints[~is_na] = series.to_numpy()[~is_na].astype(np.int64)
+    values = ints.tolist()
+    for index in np.flatnonzero(is_na):
+        values[index] = None
+    return values
+
+
+class _TreeBuilder:
+    """
+    Builds a tree from rows of the validation CSV, one DataFrame at a time,
+    the same way as `BudgetItem.build_tree_by_rows`.
+    """
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.nodes = [cls(
+            budget_type='ROOT',
+            name='ROOT',
+            amount=None,
+            document='',
+            page=0,
+        )]
+        self.levels = [0]
+        self.row_count = 0
+
+    def add(self, df: pd.DataFrame):
+        if len(df) == 0:
+            return
+        self.row_count += len(df)
+
+        columns = name_columns(df.columns)
+        if not columns:
+            raise ValueError(f'Cannot find level in {list(df.columns)}')
+        column_levels = np.array([int(column.split('_')[1]) for column in columns])
+
+        # the level of a row is the level of its first name that is not null
+        names = df[columns].to_numpy(dtype=object)
+        has_name = df[columns].notna().to_numpy()
+        missing = ~has_name.any(axis=1)
+        if missing.any():
+            raise ValueError(f'Cannot find level in row {df.index[np.argmax(missing)]}')
+        first = has_name.argmax(axis=1)
+        levels = column_levels[first].tolist()
+        names = names[np.arange(len(df)), first].tolist()
+
+        # converted once per distinct type rather than once per row; invalid
+        # types are left as strings for the constructor to reject
+        type_values = {budget_type.value: budget_type for budget_type in BudgetType}
+        budget_types = [
+            type_values.get(budget_type, budget_type)
+            for budget_type in df['budget_type'].tolist()
+        ]
+        amounts = _values_or_none(df['amount']) if 'amount' in df else [None] * len(df)
+        documents = (
+            df['document'].fillna('').tolist() if 'document' in df else [None] * len(df))
+        pages = _ints_or_none(df['page']) if 'page' in df else [None] * len(df)
+
+        is_fiscal_year = df['budget_type'].to_numpy() == FISCAL_YEAR_BUDGET
+        if is_fiscal_year.any():
+            for column in ('fiscal_year', 'fiscal_year_end'):
+                if column not in df:
+                    raise ValueError(
+                        f'row {df.index[np.argmax(is_fiscal_year)]} does not contain {column}')
+            years = _ints_or_none(df['fiscal_year'])
+            year_ends = _ints_or_none(df['fiscal_year_end'])
+        is_fiscal_year = is_fiscal_year.tolist()
+
+        cls = self.cls
+        nodes = self.nodes
+        stack_levels = self.levels
+        for index, level in enumerate(levels):
+            if is_fiscal_year[index]:
+                if not stack_levels or stack_levels[-1] < 1:
+                    raise ValueError('FISCAL_YEAR_BUDGET must have parent')
+                nodes[-1].fiscal_year_budget.append(FiscalYearBudget(
+                    line=names[index],
+                    year=years[index],
+                    year_end=year_ends[index],
+                    amount=amounts[index],
+                ))
+                continue
+
+            while stack_levels and stack_levels[-1] >= level:
+                nodes.pop()
+                stack_levels.pop()
+
+            try:
+                node = cls(
+                    budget_type=budget_types[index],
+                    name=names[index],
+                    amount=amounts[index],
+                    document=documents[index],
+                    page=pages[index],
+                    parent=nodes[-1] if nodes else None,
+                )
+            except ValueError as e:
+                raise ValueError(
+                    f'Error while creating node from row {df.index[index]}') from e
+
+            nodes.append(node)
+            stack_levels.append(level)
+
+    def result(self) -> Optional[BudgetItem]:
+        if self.row_count == 0:
+            return None
+        # a ROOT row of level 0 replaces the root created by the builder
+        root = self.nodes[0]
+        if root.budget_type.name != 'ROOT':
+            raise ValueError('First row must be ROOT')
+        if len(root.children) == 1:
+            return root.children[0]  # if there is only one child, return it
+        return root
+
+
+def build_tree_from_dataframe(
+    data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    cls=BudgetItem,
+) -> Optional[BudgetItem]:
+    """
+    Builds a tree from a DataFrame in the format of the validation CSV, or
+    from an iterable of DataFrames such as a chunked `pd.read_csv` reader.
+
+    The level of every row is found from its first `name_N` column that is
+    not null. A missing `document` is read as ''.
+
+    Returns:
+        The root, the only child of the root if there is one, or None if
+        there are no rows.
+    """
+    if isinstance(data, pd.DataFrame):
+        data = [data]
+    builder = _TreeBuilder(cls)
+    for df in data:
+        builder.add(df)
+    return builder.result()
+
+
+def read_tree_csv(
+    filepath_or_buffer,
+    chunksize: int = 100_000,
+    cls=BudgetItem,
+    **kwargs,
+) -> Optional[BudgetItem]:
+    """
+    Builds a tree from a validation CSV, reading `chunksize` rows at a time.
+    Names are read as strings even if they look like numbers. Other keyword
+    arguments are passed to `pd.read_csv`.
+    """
+    kwargs.setdefault('dtype', collections.defaultdict(
+        lambda: str, {column: 'float64' for column in NUMERIC_COLUMNS}))
+    with pd.read_csv(filepath_or_buffer, chunksize=chunksize, **kwargs) as reader:
+        return build_tree_from_dataframe(reader, cls)
+
+
+def tree_to_dataframe(root: BudgetItem, depth: int = 1) -> pd.DataFrame:
+    """
+    Returns the rows of `BudgetItem.to_rows` as a DataFrame with the columns
+    in the order of the validation CSV. The columns are filled from one
+    pre-order traversal, without a dict per row.
+
+    `amount` is float64, and `page`, `fiscal_year` and `fiscal_year_end` are
+    nullable Int64.
+    """
+    nodes, depths = [], []
+    stack = [(root, depth)]
+    while stack:
+        node, node_depth = stack.pop()
+        nodes.append(node)
+        depths.append(node_depth)
+        stack.extend(
+            (child, node_depth + 1) for child in node.iter_children(reverse=True))
+
+    # every node row is followed by the rows of its fiscal year budgets
+    fy_counts = np.array([len(node.fiscal_year_budget) for node in nodes], dtype=np.int64)
+    node_rows = np.arange(len(nodes)) + np.cumsum(fy_counts) - fy_counts
+    row_count = len(nodes) + int(fy_counts.sum())
+    fy_nodes, fy_rows, fiscal_year_budgets = [], [], []
+    for index in np.flatnonzero(fy_counts).tolist():
+        for offset, fyb in enumerate(nodes[index].fiscal_year_budget, 1):
+            fy_nodes.append(index)
+            fy_rows.append(node_rows[index] + offset)
+            fiscal_year_budgets.append(fyb)
+    fy_rows = np.array(fy_rows, dtype=np.int64)
+
+    def column(node_values, fy_values, fill, dtype=object):
+        values = np.full(row_count, fill, dtype=dtype)
+        values[node_rows] = node_values
+        if len(fy_rows):
+            values[fy_rows] = fy_values
+        return values
+
+    def nullable_ints(node_values, fy_values):
+        is_na = column(
+            [value is None for value in node_values],
+            [value is None for value in fy_values],
+            True, bool,
+        )
+        values = column(node_values, fy_values, 0)
+        values[is_na] = 0
+        return pd.arrays.IntegerArray(values.astype(np.int64), is_na)
+
+    type_names = {budget_type: budget_type.name for budget_type in BudgetType}
+    error_message = np.full(row_count, '', dtype=object)
+    for index, message in error_messages(root).items():
+        error_message[node_rows[index]] = message
+
+    levels = column(depths, [depths[index] for index in fy_nodes], 0, np.int64)
+    names = column(
+        [node.name for node in nodes],
+        [fyb.line for fyb in fiscal_year_budgets],
+        None,
+    )
+    columns = {
+        'error_message': error_message,
+        'budget_type': column(
+            [type_names[node.budget_type] for node in nodes],
+            FISCAL_YEAR_BUDGET,
+            FISCAL_YEAR_BUDGET,
+        ),
+    }
+    for level in range(depth, int(levels.max()) + 1):
+        columns[f'name_{level}'] = np.where(levels == level, names, None)
+    columns['amount'] = column(
+        [node.amount for node in nodes],
+        [fyb.amount for fyb in fiscal_year_budgets],
+        None,
+    ).astype(np.float64)
+    columns['document'] = column([node.document for node in nodes], None, None)
+    columns['page'] = nullable_ints([node.page for node in nodes], [None] * len(fy_rows))
+    columns['fiscal_year'] = nullable_ints(
+        [None] * len(nodes), [fyb.year for fyb in fiscal_year_budgets])
+    columns['fiscal_year_end'] = nullable_ints(
+        [None] * len(nodes), [fyb.year_end for fyb in fiscal_year_budgets])
+    return pd.DataFrame(columns)
@@ -0,0 +1,227 @@
+import hashlib
+from typing import List, Optional, Tuple
+
+from .budget import BudgetItem
+
+# kinds of changes
+ADDED = 'ADDED'
+REMOVED = 'REMOVED'
+MOVED = 'MOVED'
+CHANGED = 'CHANGED'
+
+HASH_SIZE = 16
+
+
+def _amount_key(amount: Optional[float]) -> str:
+    # 100 and 100.0 are the same amount
+    return 'None' if amount is None else repr(float(amount))
+
+
+def _content(node: BudgetItem) -> bytes:
+    content = (
+        f'{node.budget_type.value}\x1f{node.name}\x1f'
+        f'{_amount_key(node.amount)}\x1f{node.child_count}'
+    )
+    for fyb in node.fiscal_year_budget:
+        content += (
+            f'\x1e{fyb.line}\x1f{fyb.year}\x1f{fyb.year_end}\x1f'
+            f'{_amount_key(fyb.amount)}'
+        )
+    return content.encode('utf-8')
+
+
+def subtree_hash(root: BudgetItem) -> bytes:
+    """
+    Returns the content hash of a subtree, computed in one post-order pass.
+
+    The hash of a node covers its budget type, name, amount, fiscal year
+    budgets and the hashes of its children in order, so two subtrees have
+    the same hash only if they are equal. `document` and `page` are not
+    part of the hash.
+
+    The hash of every node is kept on the node, and changing the type,
+    name, amount or fiscal year budgets of a node, or adding or removing
+    children, clears the hashes from the node up to the root. So only the
+    nodes on the changed paths are hashed again. Editing the fiscal year
+    budgets of an untracked node in place, or a `FiscalYearBudget`, is not
+    reported; assign `fiscal_year_budget` again after such edits.
+    """
+    if root._subtree_hash is not None:
+        return root._subtree_hash
+    stack = [(root, False)]
+    while stack:
+        node, visited = stack.pop()
+        if visited:
+            digest = hashlib.blake2b(_content(node), digest_size=HASH_SIZE)
+            for child in node.iter_children():
+                digest.update(child._subtree_hash)
+            node._subtree_hash = digest.digest()
+            continue
+        stack.append((node, True))
+        # a hashed subtree is hashed down to its leaves
+        stack.extend(
+            (child, False)
+            for child in node.iter_children(reverse=True)
+            if child._subtree_hash is None
+        )
+    return root._subtree_hash
+
+
+class TreeChange:
+    """
+    A difference between two budget trees.
+
+    :param kind: `ADDED`, `REMOVED`, `MOVED` or `CHANGED`
+    :param old_path: names from the old root to the node, None if added
+    :param new_path: names from the new root to the node, None if removed
+    :param old: the node in the old tree, None if added
+    :param new: the node in the new tree, None if removed
+    :param fields: the fields of a changed node that differ
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        old_path: Optional[Tuple[str, ...]],
+        new_path: Optional[Tuple[str, ...]],
+        old: Optional[BudgetItem],
+        new: Optional[BudgetItem],
+        fields: Tuple[str, ...] = (),
+    ):
+        self.kind = kind
+        self.old_path = old_path
+        self.new_path = new_path
+        self.old = old
+        self.new = new
+        self.fields = fields
+
+    def __repr__(self):
+        path = self.new_path if self.old_path is None else self.old_path
+        if self.kind == MOVED:
+            return f'TreeChange({self.kind}, {" > ".join(self.old_path)} -> {" > ".join(self.new_path)})'
+        if self.kind == CHANGED:
+            return f'TreeChange({self.kind}, {" > ".join(path)}, {", ".join(self.fields)})'
+        return f'TreeChange({self.kind}, {" > ".join(path)})'
+
+    def to_json(self):
+        return {
+            'kind': self.kind,
+            'old_path': None if self.old_path is None else list(self.old_path),
+            'new_path': None if self.new_path is None else list(self.new_path),
+            'fields': list(self.fields),
+        }
+
+
+def _changed_fields(old: BudgetItem, new: BudgetItem) -> Tuple[str, ...]:
+    fields = []
+    if old.budget_type != new.budget_type:
+        fields.append('budget_type')
+    if old.name != new.name:
+        fields.append('name')
+    if _amount_key(old.amount) != _amount_key(new.amount):
+        fields.append('amount')
+    if [
+        (fyb.line, fyb.year, fyb.year_end, _amount_key(fyb.amount))
+        for fyb in old.fiscal_year_budget
+    ] != [
+        (fyb.line, fyb.year, fyb.year_end, _amount_key(fyb.amount))
+        for fyb in new.fiscal_year_budget
+    ]:
+        fields.append('fiscal_year_budget')
+    return tuple(fields)
+
+
+def diff_trees(old: BudgetItem, new: BudgetItem) -> List[TreeChange]:
+    """
+    Compares two budget trees, e.g. the trees of two fiscal years.
+
+    The roots are compared with each other, and children are matched with
+    the children of the same budget type and name, in order. Only pairs of
+    subtrees with different hashes are descended into, so once the hashes
+    are computed, the cost is proportional to the changes. The hashes are
+    kept on the nodes, see `subtree_hash`, so diffing a tree again after a
+    few edits hashes only the edited paths.
+
+    A removed subtree equal to an added subtree elsewhere is reported as
+    moved. Renaming a node reports it as removed and added.
+
+    Returns:
+        The changed nodes in pre-order of the old tree, then the moved,
+        removed and added subtrees. Changed nodes whose children are only
+        reordered have the field `order`.
+    """
+    subtree_hash(old)
+    subtree_hash(new)
+
+    changes = []
+    removed = []
+    added = []
+
+    stack = [(old, new, (old.name,), (new.name,))]
+    while stack:
+        old_node, new_node, old_path, new_path = stack.pop()
+        if old_node._subtree_hash == new_node._subtree_hash:
+            continue
+
+        new_by_key = {}
+        for child in new_node.children:
+            new_by_key.setdefault(
+                (child.budget_type, child.name), []).append(child)
+        for candidates in new_by_key.values():
+            candidates.reverse()
+
+        pairs = []
+        for child in old_node.children:
+            candidates = new_by_key.get((child.budget_type, child.name))
+            if candidates:
+                pairs.append((child, candidates.pop()))
+            else:
+                removed.append((old_path + (child.name,), child))
+
+        matched = {id(new_child) for _, new_child in pairs}
+        for child in new_node.children:
+            if id(child) not in matched:
+                added.append((new_path + (child.name,), child))
+
+        fields = _changed_fields(old_node, new_node)
+        new_order = [child for child in new_node.children if id(child) in matched]
+        if any(
+            new_child is not other
+            for (_, new_child), other in zip(pairs, new_order)
+        ):
+            fields += ('order',)
+        if fields:
+            changes.append(TreeChange(
+                CHANGED, old_path, new_path, old_node, new_node, fields))
+
+        stack.extend(
+            (old_child, new_child,
+             old_path + (old_child.name,), new_path + (new_child.name,))
+            for old_child, new_child in reversed(pairs)
+        )
+
+    added_by_hash = {}
+    for path, node in reversed(added):
+        added_by_hash.setdefault(node._subtree_hash, []).append((path, node))
+
+    moved_ids = set()
+    for old_path, old_node in removed:
+        candidates = added_by_hash.get(old_node._subtree_hash)
+        if candidates:
+            new_path, new_node = candidates.pop()
+            moved_ids.add(id(old_node))
+            moved_ids.add(id(new_node))
+            changes.append(TreeChange(
+                MOVED, old_path, new_path, old_node, new_node))
+
+    changes.extend(
+        TreeChange(REMOVED, path, None, node, None)
+        for path, node in removed
+        if id(node) not in moved_ids
+    )
+    changes.extend(
+        TreeChange(ADDED, None, path, None, node)
+        for path, node in added
+        if id(node) not in moved_ids
+    )
+    return changes
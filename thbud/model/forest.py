@@ -0,0 +1,296 @@
+from typing import Dict, List, Union
+
+import numpy as np
+
+from .budget import BudgetItem, BudgetType, FiscalYearBudget
+
+BUDGET_TYPES = list(BudgetType)
+BUDGET_TYPE_CODES = {
+    budget_type: code for code, budget_type in enumerate(BUDGET_TYPES)
+}
+
+
+class StringTable:
+    """
+    Interned strings, each stored once and referred to by its index.
+    """
+
+    def __init__(self, strings: List[str] = None):
+        self.strings = []
+        self._index = {}
+        for string in strings or []:
+            self.intern(string)
+
+    def intern(self, string: str) -> int:
+        index = self._index.get(string)
+        if index is None:
+            index = len(self.strings)
+            self._index[string] = index
+            self.strings.append(string)
+        return index
+
+    def __getitem__(self, index: int) -> str:
+        return self.strings[index]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class BudgetForest:
+    """
+    Column representation of one or more budget trees.
+
+    Nodes are numbered in pre-order, so every parent comes before its
+    children. Each attribute of the nodes is an array indexed by node:
+
+    - `parent`: index of the parent, -1 for roots
+    - `depth`: 0 for roots
+    - `budget_type`: index of the type in `BUDGET_TYPES`
+    - `amount`: NaN when the amount is None
+    - `page`
+    - `document_id`: index in the `documents` string table
+    - `name_id`: index in the `names` string table
+
+    The fiscal year budgets are stored as a second table with one row per
+    `FiscalYearBudget` in `fy_node`, `fy_year`, `fy_year_end`, `fy_amount`
+    and `fy_line_id` (index in `names`).
+    """
+
+    def __init__(
+        self,
+        parent: np.ndarray,
+        depth: np.ndarray,
+        budget_type: np.ndarray,
+        amount: np.ndarray,
+        page: np.ndarray,
+        document_id: np.ndarray,
+        name_id: np.ndarray,
+        names: StringTable,
+        documents: StringTable,
+        fy_node: np.ndarray = None,
+        fy_year: np.ndarray = None,
+        fy_year_end: np.ndarray = None,
+        fy_amount: np.ndarray = None,
+        fy_line_id: np.ndarray = None,
+    ):
+        self.parent = parent
+        self.depth = depth
+        self.budget_type = budget_type
+        self.amount = amount
+        self.page = page
+        self.document_id = document_id
+        self.name_id = name_id
+        self.names = names
+        self.documents = documents
+
+        empty_int = np.zeros(0, dtype=np.int64)
+        self.fy_node = empty_int if fy_node is None else fy_node
+        self.fy_year = empty_int if fy_year is None else fy_year
+        self.fy_year_end = empty_int if fy_year_end is None else fy_year_end
+        self.fy_amount = (
+            np.zeros(0, dtype=np.float64) if fy_amount is None else fy_amount)
+        self.fy_line_id = empty_int if fy_line_id is None else fy_line_id
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def __repr__(self) -> str:
+        return f'BudgetForest(nodes={len(self)}, roots={len(self.roots)})'
+
+    @classmethod
+    def from_items(cls, roots: Union[BudgetItem, List[BudgetItem]]) -> 'BudgetForest':
+        """
+        Builds a forest from one tree or a list of trees.
+        """
+        if isinstance(roots, BudgetItem):
+            roots = [roots]
+
+        names = StringTable()
+        documents = StringTable()
+        parent, depth, budget_type, amount = [], [], [], []
+        page, document_id, name_id = [], [], []
+        fy_node, fy_year, fy_year_end, fy_amount, fy_line_id = [], [], [], [], []
+
+        stack = [(root, -1, 0) for root in reversed(roots)]
+        while stack:
+            node, parent_index, node_depth = stack.pop()
+            index = len(parent)
+
+            parent.append(parent_index)
+            depth.append(node_depth)
+            budget_type.append(BUDGET_TYPE_CODES[node.budget_type])
+            amount.append(np.nan if node.amount is None else node.amount)
+            page.append(node.page)
+            document_id.append(documents.intern(node.document))
+            name_id.append(names.intern(node.name))
+
+            for fyb in node.fiscal_year_budget:
+                fy_node.append(index)
+                fy_year.append(fyb.year)
+                fy_year_end.append(fyb.year_end)
+                fy_amount.append(fyb.amount)
+                fy_line_id.append(names.intern(fyb.line))
+
+            stack.extend(
+                (child, index, node_depth + 1)
+                for child in node.iter_children(reverse=True)
+            )
+
+        return cls(
+            parent=np.array(parent, dtype=np.int64),
+            depth=np.array(depth, dtype=np.int32),
+            budget_type=np.array(budget_type, dtype=np.int8),
+            amount=np.array(amount, dtype=np.float64),
+            page=np.array(page, dtype=np.int32),
+            document_id=np.array(document_id, dtype=np.int32),
+            name_id=np.array(name_id, dtype=np.int32),
+            names=names,
+            documents=documents,
+            fy_node=np.array(fy_node, dtype=np.int64),
+            fy_year=np.array(fy_year, dtype=np.int64),
+            fy_year_end=np.array(fy_year_end, dtype=np.int64),
+            fy_amount=np.array(fy_amount, dtype=np.float64),
+            fy_line_id=np.array(fy_line_id, dtype=np.int64),
+        )
+
+    def to_items(self) -> List[BudgetItem]:
+        """
+        Builds the BudgetItem trees of the forest and returns their roots.
+        Amounts are returned as floats.
+        """
+        fiscal_year_budgets = [[] for _ in range(len(self))]
+        for node, year, year_end, amount, line_id in zip(
+            self.fy_node.tolist(),
+            self.fy_year.tolist(),
+            self.fy_year_end.tolist(),
+            self.fy_amount.tolist(),
+            self.fy_line_id.tolist(),
+        ):
+            fiscal_year_budgets[node].append(FiscalYearBudget(
+                line=self.names[line_id],
+                year=year,
+                year_end=year_end,
+                amount=amount,
+            ))
+
+        items = []
+        roots = []
+        for index, (parent, budget_type, amount, page, document_id, name_id) in enumerate(zip(
+            self.parent.tolist(),
+            self.budget_type.tolist(),
+            self.amount.tolist(),
+            self.page.tolist(),
+            self.document_id.tolist(),
+            self.name_id.tolist(),
+        )):
+            item = BudgetItem(
+                budget_type=BUDGET_TYPES[budget_type],
+                name=self.names[name_id],
+                amount=None if amount != amount else amount,
+                document=self.documents[document_id],
+                page=page,
+                parent=items[parent] if parent >= 0 else None,
+                fiscal_year_budget=fiscal_year_budgets[index],
+            )
+            items.append(item)
+            if parent < 0:
+                roots.append(item)
+        return roots
+
+    @property
+    def roots(self) -> np.ndarray:
+        return np.flatnonzero(self.parent < 0)
+
+    def name(self, index: int) -> str:
+        return self.names[self.name_id[index]]
+
+    def child_counts(self) -> np.ndarray:
+        """
+        Returns the number of children of every node.
+        """
+        has_parent = self.parent >= 0
+        return np.bincount(self.parent[has_parent], minlength=len(self))
+
+    def depth_histogram(self) -> np.ndarray:
+        """
+        Returns the number of nodes at every depth.
+        """
+        return np.bincount(self.depth)
+
+    def children_sums(self, values: np.ndarray = None) -> np.ndarray:
+        """
+        Returns the sum of `values` (the amounts by default) over the
+        children of every node. None amounts count as 0.
+        """
+        if values is None:
+            values = np.nan_to_num(self.amount)
+        has_parent = self.parent >= 0
+        return np.bincount(
+            self.parent[has_parent],
+            weights=values[has_parent],
+            minlength=len(self),
+        )
+
+    def subtree_sums(self, values: np.ndarray = None) -> np.ndarray:
+        """
+        Returns the sum of `values` over the subtree of every node, the node
+        included. Values are accumulated bottom-up one depth at a time.
+        None amounts count as 0.
+        """
+        if values is None:
+            values = np.nan_to_num(self.amount)
+        sums = np.array(values, dtype=np.float64)
+
+        order = np.argsort(self.depth, kind='stable')
+        bounds = np.searchsorted(
+            self.depth[order], np.arange(self.depth.max(initial=0) + 2))
+        for depth in range(len(bounds) - 2, 0, -1):
+            nodes = order[bounds[depth]:bounds[depth + 1]]
+            sums += np.bincount(
+                self.parent[nodes], weights=sums[nodes], minlength=len(self))
+        return sums
+
+    def leaf_sums(self) -> np.ndarray:
+        """
+        Returns the sum of the amounts of the leaves under every node.
+        """
+        is_leaf = self.child_counts() == 0
+        return self.subtree_sums(np.where(is_leaf, np.nan_to_num(self.amount), 0))
+
+    def inconsistent_sums(self) -> np.ndarray:
+        """
+        Returns the indices of the nodes whose amount is inconsistent with
+        their children, following the rules of `BudgetItem._check_sum`:
+        a None amount with a child amount that is not None, an amount with
+        a None child amount, or an amount different from the sum of the
+        children. Amounts are compared in satang.
+        """
+        is_none = np.isnan(self.amount)
+        satang = np.rint(np.nan_to_num(self.amount) * 100)
+
+        child_counts = self.child_counts()
+        none_children = np.rint(self.children_sums(is_none.astype(np.float64)))
+        children_satang = self.children_sums(satang)
+
+        has_children = child_counts > 0
+        inconsistent = (
+            (is_none & (none_children < child_counts))
+            | (~is_none & has_children & (none_children > 0))
+            | (~is_none & has_children & (none_children == 0)
+               & (children_satang != satang))
+        )
+        return np.flatnonzero(inconsistent)
+
+    def totals_by_type(self) -> Dict[BudgetType, float]:
+        """
+        Returns the sum of the amounts of the nodes of each budget type.
+        """
+        totals = np.bincount(
+            self.budget_type,
+            weights=np.nan_to_num(self.amount),
+            minlength=len(BUDGET_TYPES),
+        )
+        return {
+            budget_type: float(total)
+            for budget_type, total in zip(BUDGET_TYPES, totals)
+        }
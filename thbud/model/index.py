@@ -0,0 +1,276 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from .budget import BudgetItem, BudgetType
+
+
+class TreeIndex:
+    """
+    Lookup tables over a BudgetItem tree.
+
+    Every node gets an id when it is added to the index. Ids are given in
+    increasing order and are never reused for another node, so they stay
+    stable while the tree is edited. Nodes can be found by id, by the names
+    from the root down to them, or by budget type. The pre-order position
+    and the last descendant of every node are recorded too, so a subtree is
+    a range of positions and ancestor tests are O(1).
+
+    The nodes of the tree report to the index when they are attached,
+    detached, renamed or change type, and the index patches its tables in
+    place. Only the pre-order positions are recomputed, on the next lookup
+    that needs them after a node of this tree is attached or detached.
+
+    A node is patched for one index at a time. Building another index over
+    any node of the tree makes this one stale, and it is rebuilt, with the
+    same ids, on its next lookup.
+    """
+
+    def __init__(self, root: BudgetItem):
+        self.root = root
+        self._next_id = 0
+        self._build()
+
+    def _build(self):
+        # a rebuild keeps the ids of the nodes that were indexed
+        previous_ids = {
+            id(node): node_id for node_id, node in getattr(self, 'nodes', {}).items()
+        }
+        self.nodes: Dict[int, BudgetItem] = {}
+        self._parents: Dict[int, int] = {}
+        # (parent id, name) -> ids of the children with that name, in order
+        self._by_name: Dict[Tuple[int, str], List[int]] = {}
+        self._by_type: Dict[BudgetType, Dict[int, None]] = {
+            budget_type: {} for budget_type in BudgetType
+        }
+        self._stale = False
+        self._add(self.root, -1, previous_ids)
+
+    def _contains(self, node: BudgetItem) -> bool:
+        return node._index is self and self.nodes.get(node._index_id) is node
+
+    def _add(
+        self,
+        top: BudgetItem,
+        parent_id: int,
+        previous_ids: Optional[Dict[int, int]] = None,
+    ):
+        stack = [(top, parent_id)]
+        while stack:
+            node, parent_id = stack.pop()
+            other = node._index
+            if other is not self and other is not None and other._contains(node):
+                other._stale = True
+            # a node that was detached from this tree keeps its id
+            if previous_ids is not None:
+                node_id = previous_ids.get(id(node))
+            elif other is self:
+                node_id = node._index_id
+            else:
+                node_id = None
+            if node_id is None or node_id in self.nodes:
+                node_id = self._next_id
+                self._next_id += 1
+            node._index = self
+            node._index_id = node_id
+
+            self.nodes[node_id] = node
+            self._parents[node_id] = parent_id
+            self._by_name.setdefault((parent_id, node.name), []).append(node_id)
+            self._by_type[node.budget_type][node_id] = None
+
+            stack.extend((child, node_id) for child in node.iter_children(reverse=True))
+        self._order = None
+
+    def _remove_name(self, parent_id: int, name: str, node_id: int):
+        key = (parent_id, name)
+        node_ids = self._by_name[key]
+        node_ids.remove(node_id)
+        if not node_ids:
+            del self._by_name[key]
+
+    def _attached(self, parent: BudgetItem, child: BudgetItem):
+        if self._contains(parent):
+            self._add(child, parent._index_id)
+
+    def _detached(self, parent: BudgetItem, child: BudgetItem):
+        if not self._contains(parent):
+            return
+        for node in child.iter_preorder():
+            if not self._contains(node):
+                continue
+            node_id = node._index_id
+            del self.nodes[node_id]
+            self._remove_name(self._parents.pop(node_id), node.name, node_id)
+            del self._by_type[node.budget_type][node_id]
+        self._order = None
+
+    def _renamed(self, node: BudgetItem, old_name: str):
+        if not self._contains(node):
+            return
+        node_id = node._index_id
+        parent_id = self._parents[node_id]
+        self._remove_name(parent_id, old_name, node_id)
+        node_ids = self._by_name.setdefault((parent_id, node.name), [])
+        node_ids.append(node_id)
+        if len(node_ids) > 1:
+            # keep the order of the siblings
+            siblings = {
+                id(sibling): position
+                for position, sibling in enumerate(node.parent.children)
+            }
+            node_ids.sort(key=lambda sibling_id: siblings[id(self.nodes[sibling_id])])
+
+    def _retyped(self, node: BudgetItem, old_type: BudgetType):
+        if not self._contains(node):
+            return
+        node_id = node._index_id
+        del self._by_type[old_type][node_id]
+        self._by_type[node.budget_type][node_id] = None
+
+    def _build_order(self):
+        # ids in pre-order, and the pre-order position of every id
+        order: List[int] = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            order.append(node._index_id)
+            stack.extend(node.iter_children(reverse=True))
+        positions = {node_id: position for position, node_id in enumerate(order)}
+
+        # in pre-order, the last descendant of a node is the last descendant
+        # of its last child, so a reverse pass propagates it upwards
+        last_descendants = list(range(len(order)))
+        parents = self._parents
+        for position in range(len(order) - 1, 0, -1):
+            parent_position = positions[parents[order[position]]]
+            if last_descendants[parent_position] < last_descendants[position]:
+                last_descendants[parent_position] = last_descendants[position]
+
+        self._order = order
+        self._positions = positions
+        self._last_descendants = last_descendants
+
+    @property
+    def is_stale(self) -> bool:
+        """
+        True if another index took over nodes of the tree.
+        """
+        return self._stale
+
+    def refresh(self):
+        """
+        Rebuilds the index if another index took over nodes of the tree.
+        """
+        if self._stale:
+            self._build()
+
+    def _refresh_order(self):
+        self.refresh()
+        if self._order is None:
+            self._build_order()
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self.nodes)
+
+    def __getitem__(self, node_id: int) -> BudgetItem:
+        self.refresh()
+        return self.nodes[node_id]
+
+    def node_id(self, node: BudgetItem) -> int:
+        """
+        Returns the id of a node of the tree.
+
+        Raises:
+            KeyError: If the node is not in the tree.
+        """
+        self.refresh()
+        if not self._contains(node):
+            raise KeyError(f'{node!r} is not in the tree')
+        return node._index_id
+
+    def find(self, path: Sequence[str]) -> List[BudgetItem]:
+        """
+        Returns the nodes whose names from the root down to them are `path`.
+        The first name is the name of the root.
+        """
+        self.refresh()
+        node_ids = [-1]
+        for name in path:
+            node_ids = [
+                child_id
+                for node_id in node_ids
+                for child_id in self._by_name.get((node_id, name), ())
+            ]
+            if not node_ids:
+                break
+        return [self.nodes[node_id] for node_id in node_ids]
+
+    def get(self, path: Sequence[str]) -> BudgetItem:
+        """
+        Returns the only node with the given name path.
+
+        Raises:
+            KeyError: If no node or more than one node has the path.
+        """
+        nodes = self.find(path)
+        if len(nodes) != 1:
+            raise KeyError(
+                f'{len(nodes)} nodes found with path {" > ".join(path)}')
+        return nodes[0]
+
+    def path(self, node: BudgetItem) -> Tuple[str, ...]:
+        """
+        Returns the names from the root down to a node.
+        """
+        node_id = self.node_id(node)
+        names = []
+        while node_id >= 0:
+            names.append(self.nodes[node_id].name)
+            node_id = self._parents[node_id]
+        return tuple(reversed(names))
+
+    def of_type(self, budget_type: Union[BudgetType, str]) -> List[BudgetItem]:
+        """
+        Returns the nodes of a budget type in pre-order.
+        """
+        self._refresh_order()
+        if isinstance(budget_type, str):
+            budget_type = BudgetType(budget_type)
+        node_ids = sorted(self._by_type[budget_type], key=self._positions.__getitem__)
+        return [self.nodes[node_id] for node_id in node_ids]
+
+    def interval(self, node: BudgetItem) -> Tuple[int, int]:
+        """
+        Returns the pre-order positions of a node and of its last
+        descendant. The subtree of the node is every position in between,
+        both included.
+        """
+        node_id = self.node_id(node)
+        self._refresh_order()
+        position = self._positions[node_id]
+        return position, self._last_descendants[position]
+
+    def is_ancestor(self, ancestor: BudgetItem, node: BudgetItem) -> bool:
+        """
+        Returns True if `ancestor` is a proper ancestor of `node`. Until
+        the pre-order positions are recomputed after an edit, the parents
+        of `node` are walked instead, which is O(depth).
+        """
+        ancestor_id = self.node_id(ancestor)
+        node_id = self.node_id(node)
+        if self._order is None:
+            node_id = self._parents[node_id]
+            while node_id >= 0:
+                if node_id == ancestor_id:
+                    return True
+                node_id = self._parents[node_id]
+            return False
+        position = self._positions[ancestor_id]
+        return position < self._positions[node_id] <= self._last_descendants[position]
+
+    def descendants(self, node: BudgetItem) -> List[BudgetItem]:
+        """
+        Returns the descendants of a node in pre-order.
+        """
+        first, last = self.interval(node)
+        return [self.nodes[node_id] for node_id in self._order[first + 1:last + 1]]
@@ -0,0 +1,314 @@
+"""
+Streaming JSON output and input of BudgetItem trees.
+
+`dump_json` writes the same text as `json.dump(root.to_json(), fp, ...)`
+without building the nested dicts, and `load_json` builds the same tree as
+`BudgetItem.from_json(json.load(fp))` without holding the parsed document.
+Neither recurses, so deep trees do not hit the recursion limit.
+"""
+import json
+import re
+from json.decoder import JSONDecodeError, scanstring
+from typing import List, Optional, TextIO, Union
+
+from .budget import BudgetItem
+
+CHUNK_SIZE = 1 << 16
+
+_DELIMITER = re.compile(r'[,}\]\s]')
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_FIRST_KEY = re.compile(r'[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*:')
+_NEXT_KEY = re.compile(r'[ \t\n\r]*,[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*:')
+_MAX_KEY_LENGTH = 256
+
+
+def _float_repr(value: float) -> str:
+    # same as the json module
+    if value != value:
+        return 'NaN'
+    if value == float('inf'):
+        return 'Infinity'
+    if value == -float('inf'):
+        return '-Infinity'
+    return float.__repr__(value)
+
+
+class _Encoder:
+    def __init__(self, indent: Optional[Union[int, str]], ensure_ascii: bool):
+        if indent is not None and not isinstance(indent, str):
+            indent = ' ' * indent
+        self.indent = indent
+        self.item_separator = ', ' if indent is None else ','
+        if ensure_ascii:
+            self.string = json.encoder.encode_basestring_ascii
+        else:
+            self.string = json.encoder.encode_basestring
+
+    def newline(self, level: int) -> str:
+        if self.indent is None:
+            return ''
+        return '\n' + self.indent * level
+
+    def value(self, value) -> str:
+        if value is None:
+            return 'null'
+        if value is True:
+            return 'true'
+        if value is False:
+            return 'false'
+        if isinstance(value, str):
+            return self.string(value)
+        if isinstance(value, int):
+            return int.__repr__(value)
+        if isinstance(value, float):
+            return _float_repr(value)
+        return json.dumps(value)
+
+    def dict(self, items, level: int) -> str:
+        inner = self.newline(level + 1)
+        return '{' + inner + (self.item_separator + inner).join(
+            self.string(key) + ': ' + value for key, value in items
+        ) + self.newline(level) + '}'
+
+    def list(self, values: List[str], level: int) -> str:
+        if not values:
+            return '[]'
+        inner = self.newline(level + 1)
+        return '[' + inner + (self.item_separator + inner).join(values) \
+            + self.newline(level) + ']'
+
+    def fiscal_year_budget(self, fyb, level: int) -> str:
+        return self.dict([
+            ('line', self.value(fyb.line)),
+            ('year', self.value(fyb.year)),
+            ('year_end', self.value(fyb.year_end)),
+            ('amount', self.value(fyb.amount)),
+        ], level)
+
+    def node_head(self, node: BudgetItem, level: int) -> str:
+        """
+        Returns the text of a node up to the value of `children`.
+        """
+        inner = self.newline(level + 1)
+        separator = self.item_separator + inner
+        fiscal_year_budget = self.list([
+            self.fiscal_year_budget(fyb, level + 2)
+            for fyb in node.fiscal_year_budget
+        ], level + 1)
+        return (
+            '{' + inner
+            + '"budget_type": ' + self.string(node.budget_type.name) + separator
+            + '"name": ' + self.value(node.name) + separator
+            + '"amount": ' + self.value(node.amount) + separator
+            + '"document": ' + self.value(node.document) + separator
+            + '"page": ' + self.value(node.page) + separator
+            + '"fiscal_year_budget": ' + fiscal_year_budget + separator
+            + '"children": '
+        )
+
+
+def dump_json(
+    root: BudgetItem,
+    fp: TextIO,
+    indent: Optional[Union[int, str]] = None,
+    ensure_ascii: bool = True,
+):
+    """
+    Writes a tree as JSON to a text file object, node by node. The text is
+    the same as `json.dump(root.to_json(), fp, indent=indent,
+    ensure_ascii=ensure_ascii)`.
+    """
+    encoder = _Encoder(indent, ensure_ascii)
+    chunks = []
+    size = 0
+    # nodes to write, and the text that closes the lists and dicts of nodes
+    stack = [(root, 0)]
+    while stack:
+        node, level = stack.pop()
+        if isinstance(node, str):
+            chunk = node
+        elif not node.child_count:
+            chunk = encoder.node_head(node, level) + '[]' + encoder.newline(level) + '}'
+        else:
+            children = node.children
+            child_level = level + 2
+            chunk = encoder.node_head(node, level) + '[' + encoder.newline(child_level)
+            stack.append((
+                encoder.newline(level + 1) + ']' + encoder.newline(level) + '}',
+                None,
+            ))
+            separator = encoder.item_separator + encoder.newline(child_level)
+            for index in range(len(children) - 1, -1, -1):
+                stack.append((children[index], child_level))
+                if index:
+                    stack.append((separator, None))
+
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= CHUNK_SIZE:
+            fp.write(''.join(chunks))
+            chunks.clear()
+            size = 0
+    fp.write(''.join(chunks))
+
+
+class _Scanner:
+    """
+    Reads a JSON text from a file object in chunks. Values other than the
+    nodes and their `children` lists are decoded with the json module.
+    """
+
+    def __init__(self, fp: TextIO):
+        self.fp = fp
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        data = self.fp.read(CHUNK_SIZE)
+        if isinstance(data, bytes):
+            raise TypeError('load_json needs a file object opened in text mode')
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Skips whitespace and returns the next character, '' at the end.
+        """
+        while True:
+            pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            self.pos = pos
+            if pos < len(self.buffer):
+                return self.buffer[pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            self.error(f'Expecting {char!r}')
+        self.pos += 1
+
+    def error(self, message: str):
+        raise JSONDecodeError(message, self.buffer, self.pos)
+
+    def string(self) -> str:
+        self.expect('"')
+        while True:
+            try:
+                value, end = scanstring(self.buffer, self.pos)
+            except JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            self.pos = end
+            return value
+
+    def key(self, first: bool) -> str:
+        """
+        Reads the key of an object member, with the comma before it unless
+        it is the first member, and the colon after it.
+        """
+        pattern = _FIRST_KEY if first else _NEXT_KEY
+        while True:
+            match = pattern.match(self.buffer, self.pos)
+            if match is not None:
+                self.pos = match.end()
+                return match.group(1)
+            # keys are short, so more text helps only at the end of the buffer
+            if len(self.buffer) - self.pos > _MAX_KEY_LENGTH or not self._fill():
+                break
+
+        # keys with escapes, or invalid text
+        if not first:
+            self.expect(',')
+        key = self.string()
+        self.expect(':')
+        return key
+
+    def value(self):
+        if self.peek() not in '"[{':
+            # a number or literal is complete once a delimiter follows it
+            while not _DELIMITER.search(self.buffer, self.pos) and self._fill():
+                pass
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            self.pos = end
+            return value
+
+
+def load_json(fp: TextIO, cls=BudgetItem) -> BudgetItem:
+    """
+    Reads a tree from a JSON text file object, as written by `dump_json` or
+    `json.dump(root.to_json(), fp)`. Every node is built as soon as it is
+    read, so only the nodes on the path to the current node are held as
+    parsed fields.
+
+    Raises:
+        json.JSONDecodeError: If the text is not valid JSON.
+    """
+    scanner = _Scanner(fp)
+    root = None
+    # fields, children and state of the nodes being read, from the root down
+    stack = []
+
+    scanner.expect('{')
+    stack.append(_Frame())
+    while stack:
+        frame = stack[-1]
+        char = scanner.peek()
+
+        if frame.in_children:
+            if char == ']':
+                scanner.pos += 1
+                frame.in_children = False
+                continue
+            if frame.children:
+                scanner.expect(',')
+            scanner.expect('{')
+            stack.append(_Frame())
+            continue
+
+        if char == '}':
+            scanner.pos += 1
+            stack.pop()
+            node = cls._from_json_fields(frame.fields, frame.children)
+            if stack:
+                stack[-1].children.append(node)
+            else:
+                root = node
+            continue
+
+        key = scanner.key(first=not frame.members)
+        frame.members += 1
+        if key == 'children':
+            scanner.expect('[')
+            frame.in_children = True
+        else:
+            frame.fields[key] = scanner.value()
+
+    if scanner.peek():
+        scanner.error('Extra data')
+    return root
+
+
+class _Frame:
+    __slots__ = ('fields', 'children', 'members', 'in_children')
+
+    def __init__(self):
+        self.fields = {}
+        self.children = []
+        self.members = 0
+        self.in_children = False
@@ -0,0 +1,116 @@
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+from .budget import BudgetItem
+from .forest import BudgetForest
+
+
+def expand_fiscal_years(
+    year: np.ndarray,
+    year_end: np.ndarray,
+    amount: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Spreads fiscal year budgets over the years they span, with
+    `amount / max(1, year_end - year)` in each year. A budget whose
+    `year_end` is before its `year` spans no year.
+
+    Returns:
+        The index of the budget, the year and the amount of every entry, in
+        the order of the budgets and years.
+    """
+    spans = np.maximum(year_end - year + 1, 0)
+    per_year = amount / np.maximum(year_end - year, 1)
+
+    budget = np.repeat(np.arange(len(spans)), spans)
+    # position of every entry within the span of its budget
+    starts = np.cumsum(spans) - spans
+    offsets = np.arange(len(budget)) - np.repeat(starts, spans)
+    return budget, year[budget] + offsets, per_year[budget]
+
+
+class ObligationMatrix:
+    """
+    Sparse node by fiscal year matrix of the fiscal year budgets of a forest.
+
+    The fiscal year budgets are expanded with `expand_fiscal_years`, the
+    same way as in `build_csv`, and the entries are stored as coordinate
+    arrays in the order of the fiscal year budgets:
+
+    - `entry_node`: index of the node in the forest
+    - `entry_budget`: index of the fiscal year budget in the `fy_*` arrays of
+      the forest
+    - `entry_year`: the fiscal year
+    - `entry_amount`: the amount in that year
+
+    `years` holds the distinct years, the columns of the matrix.
+    """
+
+    def __init__(self, forest: BudgetForest):
+        self.forest = forest
+
+        self.entry_budget, self.entry_year, self.entry_amount = expand_fiscal_years(
+            forest.fy_year, forest.fy_year_end, forest.fy_amount)
+        self.entry_node = forest.fy_node[self.entry_budget]
+
+        self.years, self.entry_column = np.unique(
+            self.entry_year, return_inverse=True)
+        self.entry_column = self.entry_column.reshape(-1)
+
+    @classmethod
+    def from_items(cls, roots: Union[BudgetItem, List[BudgetItem]]) -> 'ObligationMatrix':
+        return cls(BudgetForest.from_items(roots))
+
+    def __len__(self) -> int:
+        return len(self.entry_node)
+
+    @property
+    def shape(self):
+        return len(self.forest), len(self.years)
+
+    def to_dense(self) -> np.ndarray:
+        """
+        Returns the matrix as an array of nodes by `years`.
+        """
+        dense = np.zeros(self.shape, dtype=np.float64)
+        np.add.at(dense, (self.entry_node, self.entry_column), self.entry_amount)
+        return dense
+
+    def node_entry_counts(self) -> np.ndarray:
+        """
+        Returns the number of expanded entries of every node.
+        """
+        return np.bincount(self.entry_node, minlength=len(self.forest))
+
+    def totals_by_year(self) -> Dict[int, float]:
+        """
+        Returns the sum of the obligations of every year.
+        """
+        totals = np.bincount(
+            self.entry_column, weights=self.entry_amount, minlength=len(self.years))
+        return dict(zip(self.years.tolist(), totals.tolist()))
+
+    def schedule(self, node: int) -> Dict[int, float]:
+        """
+        Returns the obligations of a node by year.
+        """
+        entries = self.entry_node == node
+        totals = np.bincount(
+            self.entry_column[entries],
+            weights=self.entry_amount[entries],
+            minlength=len(self.years),
+        )
+        has_entries = np.bincount(
+            self.entry_column[entries], minlength=len(self.years)) > 0
+        return dict(zip(self.years[has_entries].tolist(), totals[has_entries].tolist()))
+
+    def subtree_totals(self) -> np.ndarray:
+        """
+        Returns the obligations of the subtree of every node by year, as an
+        array of nodes by `years`.
+        """
+        dense = self.to_dense()
+        for column in range(len(self.years)):
+            dense[:, column] = self.forest.subtree_sums(dense[:, column])
+        return dense
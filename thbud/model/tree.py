@@ -0,0 +1,258 @@
+from collections.abc import Sequence
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+class TreeError(RuntimeError):
+    """
+    Exception when a tree operation would make an invalid tree
+    """
+
+
+class LoopError(TreeError):
+    """
+    Exception when a node would become its own ancestor
+    """
+
+
+class ChildrenView(Sequence):
+    """
+    Read-only view of the children of a node. It is not a copy, so it
+    follows later changes of the children. It compares equal to a list or
+    tuple of the same nodes.
+    """
+
+    __slots__ = ('_items',)
+
+    def __init__(self, items: List['TreeNode']):
+        self._items = items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self._items[index])
+        return self._items[index]
+
+    def __iter__(self) -> Iterator['TreeNode']:
+        return iter(self._items)
+
+    def __reversed__(self) -> Iterator['TreeNode']:
+        return reversed(self._items)
+
+    def __contains__(self, node) -> bool:
+        return any(child is node for child in self._items)
+
+    def __bool__(self) -> bool:
+        return bool(self._items)
+
+    def __eq__(self, other):
+        if isinstance(other, ChildrenView):
+            other = other._items
+        elif not isinstance(other, (list, tuple)):
+            return NotImplemented
+        return len(self._items) == len(other) and all(
+            child is other_child for child, other_child in zip(self._items, other))
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'ChildrenView({self._items!r})'
+
+
+class TreeNode:
+    """
+    Minimal tree node with a parent link and an ordered list of children.
+
+    Attaching a node to a parent appends it to the parent's children in
+    O(1). `children` returns a read-only view of the children that is
+    not copied on access, so the children can only be changed by
+    assigning `parent` or `children`, which keep the parent links and the
+    hooks of subclasses in sync.
+    """
+
+    __slots__ = ('_parent', '_children')
+
+    # slots that are not pickled, reset to None when unpickled
+    _transient_slots = ('_parent',)
+
+    def __init__(self):
+        self._parent = None
+        self._children = []
+
+    @property
+    def parent(self) -> Optional['TreeNode']:
+        return self._parent
+
+    @parent.setter
+    def parent(self, value: Optional['TreeNode']):
+        if value is not None and not isinstance(value, TreeNode):
+            raise TreeError(
+                f'Parent node {value!r} is not of type TreeNode.')
+
+        if value is self._parent:
+            return
+
+        # A leaf cannot be an ancestor of anything, so only nodes with
+        # children need to be checked for loops.
+        if value is self or (
+            value is not None and self._children and self._is_ancestor_of(value)
+        ):
+            raise LoopError(
+                f'Cannot set parent. {self!r} cannot be parent of itself.')
+
+        self._detach()
+        if value is not None:
+            self._parent = value
+            value._children.append(self)
+            value._child_attached(self)
+
+    @property
+    def children(self) -> ChildrenView:
+        return ChildrenView(self._children)
+
+    @property
+    def child_count(self) -> int:
+        return len(self._children)
+
+    def iter_children(self, reverse: bool = False) -> Iterator['TreeNode']:
+        """
+        Iterates over the children, last first if `reverse`. Cheaper than
+        `children` in traversals of every node.
+        """
+        return reversed(self._children) if reverse else iter(self._children)
+
+    @children.setter
+    def children(self, children: Iterable['TreeNode']):
+        children = list(children)
+        seen = set()
+        for child in children:
+            if not isinstance(child, TreeNode):
+                raise TreeError(
+                    f'Cannot add non-node object {child!r}. It is not a subclass of TreeNode.')
+            if id(child) in seen:
+                raise TreeError(
+                    f'Cannot add node {child!r} multiple times as child.')
+            seen.add(id(child))
+            if child is self or (child._children and child._is_ancestor_of(self)):
+                raise LoopError(
+                    f'Cannot set children. {child!r} cannot be child of itself.')
+
+        old_children = self._children
+        self._children = []
+        for child in old_children:
+            child._parent = None
+            self._child_detached(child)
+
+        for child in children:
+            child._detach()
+            child._parent = self
+            self._children.append(child)
+            self._child_attached(child)
+
+    @children.deleter
+    def children(self):
+        self.children = []
+
+    def _detach(self):
+        parent = self._parent
+        if parent is None:
+            return
+        parent._children.remove(self)
+        self._parent = None
+        parent._child_detached(self)
+
+    def _child_attached(self, child: 'TreeNode'):
+        """
+        Called after `child` is appended to the children of this node.
+        """
+
+    def _child_detached(self, child: 'TreeNode'):
+        """
+        Called after `child` is removed from the children of this node.
+        """
+
+    def _is_ancestor_of(self, node: 'TreeNode') -> bool:
+        curr = node._parent
+        while curr is not None:
+            if curr is self:
+                return True
+            curr = curr._parent
+        return False
+
+    def __getstate__(self):
+        # Pickle the subtree only. The parent links of the children are
+        # restored by __setstate__, and the node itself comes back as a root.
+        state = {}
+        for cls in type(self).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                if slot not in self._transient_slots and hasattr(self, slot):
+                    state[slot] = getattr(self, slot)
+        return state
+
+    def __setstate__(self, state):
+        for slot in self._transient_slots:
+            object.__setattr__(self, slot, None)
+        for slot, value in state.items():
+            object.__setattr__(self, slot, value)
+        for child in self._children:
+            child._parent = self
+
+    @property
+    def is_leaf(self) -> bool:
+        return not self._children
+
+    @property
+    def is_root(self) -> bool:
+        return self._parent is None
+
+    @property
+    def root(self) -> 'TreeNode':
+        node = self
+        while node._parent is not None:
+            node = node._parent
+        return node
+
+    @property
+    def depth(self) -> int:
+        depth = 0
+        node = self._parent
+        while node is not None:
+            depth += 1
+            node = node._parent
+        return depth
+
+    @property
+    def path(self) -> Tuple['TreeNode', ...]:
+        """
+        The nodes from the root down to this node.
+        """
+        nodes = []
+        node = self
+        while node is not None:
+            nodes.append(node)
+            node = node._parent
+        return tuple(reversed(nodes))
+
+    def iter_preorder(self) -> Iterator['TreeNode']:
+        """
+        Iterates over this node and its descendants, parents before children.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node._children))
+
+    def iter_postorder(self) -> Iterator['TreeNode']:
+        """
+        Iterates over this node and its descendants, children before parents.
+        """
+        stack = [(self, False)]
+        while stack:
+            node, visited = stack.pop()
+            if visited or not node._children:
+                yield node
+                continue
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node._children))
@@ -0,0 +1,402 @@
+import concurrent.futures
+import math
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from .budget import BudgetItem
+
+
+class TrackedList(list):
+    """
+    List that calls `on_change` after every in-place modification.
+    Pickled as a plain list.
+    """
+
+    def __init__(self, iterable, on_change):
+        super().__init__(iterable)
+        self.on_change = on_change
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+
+def _tracked(method_name):
+    method = getattr(list, method_name)
+
+    def tracked_method(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.on_change()
+        return result
+
+    tracked_method.__name__ = method_name
+    return tracked_method
+
+
+for _method_name in (
+    'append', 'extend', 'insert', 'remove', 'pop', 'clear', 'sort',
+    'reverse', '__setitem__', '__delitem__', '__iadd__', '__imul__',
+):
+    setattr(TrackedList, _method_name, _tracked(_method_name))
+
+# validation rules
+NONE_AMOUNT_WITH_CHILD_AMOUNT = 'NONE_AMOUNT_WITH_CHILD_AMOUNT'
+CHILD_AMOUNT_NONE = 'CHILD_AMOUNT_NONE'
+SUM_MISMATCH = 'SUM_MISMATCH'
+
+
+def to_satang(amount: float) -> int:
+    """
+    Converts an amount in baht to an integer number of satang.
+    """
+    return round(amount * 100)
+
+
+def _to_satang_or_zero(amount: Optional[float]) -> int:
+    if amount is None or not math.isfinite(amount):
+        return 0
+    return to_satang(amount)
+
+
+class ValidationIssue:
+    """
+    ปัญหาที่พบจากการตรวจสอบยอดรวม
+
+    :param index: ลำดับของโหนดเมื่อไล่แบบ pre-order จากรากที่ตรวจสอบ
+    :param path: ชื่อของโหนดตั้งแต่รากจนถึงโหนดที่มีปัญหา
+    :param rule: กฎที่ไม่ผ่าน
+    :param expected: จำนวนงบของโหนด
+    :param actual: ผลรวมจำนวนงบของโหนดลูก
+    :param message: ข้อความอธิบายปัญหา
+    """
+
+    def __init__(
+        self,
+        index: int,
+        path: Tuple[str, ...],
+        rule: str,
+        expected: Optional[float],
+        actual: Optional[float],
+        message: str,
+    ):
+        self.index = index
+        self.path = path
+        self.rule = rule
+        self.expected = expected
+        self.actual = actual
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f'ValidationIssue({self.rule}, {" > ".join(self.path)}, {self.expected}, {self.actual})'
+
+    def __eq__(self, other):
+        if not isinstance(other, ValidationIssue):
+            return NotImplemented
+        return self.to_json() == other.to_json()
+
+    def __hash__(self):
+        return hash((
+            self.index, tuple(self.path), self.rule,
+            self.expected, self.actual, self.message,
+        ))
+
+    def to_json(self):
+        return {
+            'index': self.index,
+            'path': list(self.path),
+            'rule': self.rule,
+            'expected': self.expected,
+            'actual': self.actual,
+            'message': self.message,
+        }
+
+
+def check_node(node: 'BudgetItem') -> Optional[Tuple[str, Optional[float], Optional[float], str]]:
+    """
+    Checks the amount of a node against the amounts of its children.
+
+    Returns:
+        None if the node is consistent, otherwise a tuple of
+        (rule, expected, actual, message).
+    """
+    # a leaf is consistent whatever its amount
+    if not node.child_count:
+        return None
+    children = node.children
+    if node.amount is None:
+        if any(child.amount is not None for child in children):
+            return (
+                NONE_AMOUNT_WITH_CHILD_AMOUNT,
+                None,
+                None,
+                f'amount of {node.name} is None but some of children is not None',
+            )
+        return None
+
+    # NaN and infinite amounts have no satang value, so a node with one is
+    # compared as floats, where NaN never matches
+    finite = math.isfinite(node.amount)
+    sum_satang = 0
+    for child in children:
+        if child.amount is None:
+            return (
+                CHILD_AMOUNT_NONE,
+                node.amount,
+                None,
+                f'amount of {node.name} is {node.amount} but some of children is None',
+            )
+        if finite and math.isfinite(child.amount):
+            sum_satang += to_satang(child.amount)
+        else:
+            finite = False
+
+    if finite:
+        mismatch = to_satang(node.amount) != sum_satang
+    else:
+        mismatch = node.amount != sum([child.amount for child in children])
+    if mismatch:
+        sum_amount = sum([child.amount for child in children])
+        return (
+            SUM_MISMATCH,
+            node.amount,
+            sum_amount,
+            f'amount of {node.name} is {node.amount} but sum of children is {sum_amount}',
+        )
+    return None
+
+
+def validate(root: 'BudgetItem') -> List[ValidationIssue]:
+    """
+    Validates every node of a tree in a single pass. Each node is compared
+    with the sum of its children, in satang. If the tree is tracked by an
+    `IncrementalValidator`, its cached results are used instead.
+
+    Returns:
+        The issues in pre-order. `index` is the pre-order position of the
+        node under `root` and `path` the names from `root` to the node.
+    """
+    check = check_node
+    if getattr(root, '_tracker', None) is not None:
+        check = root._tracker.check
+
+    issues = []
+    for index, node in enumerate(root.iter_preorder()):
+        issue = check(node)
+        if issue is not None:
+            issues.append(ValidationIssue(index, _name_path(root, node), *issue))
+    return issues
+
+
+def _name_path(root: 'BudgetItem', node: 'BudgetItem') -> Tuple[str, ...]:
+    names = [node.name]
+    while node is not root:
+        node = node.parent
+        names.append(node.name)
+    return tuple(reversed(names))
+
+
+def validate_many(
+    roots: Sequence['BudgetItem'],
+    max_workers: Optional[int] = None,
+) -> List[List[ValidationIssue]]:
+    """
+    Validates many trees, e.g. every ministry of a national tree, in a
+    process pool. Each tree is pickled to the workers without its parent.
+
+    Args:
+        roots: The roots of the trees to validate.
+        max_workers: The number of processes. Validates in this process if 1.
+
+    Returns:
+        The issues of each tree, in the order of `roots`.
+    """
+    if max_workers == 1 or len(roots) <= 1:
+        return [validate(root) for root in roots]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(validate, roots))
+
+
+def error_messages(root: 'BudgetItem') -> Dict[int, str]:
+    """
+    Returns the error message of every invalid node, by pre-order index,
+    in the format of the `error_message` column.
+    """
+    return {
+        issue.index: f'While checking sum: {issue.message}\n'
+        for issue in validate(root)
+    }
+
+
+class IncrementalValidator:
+    """
+    Keeps the validation results of a tree up to date while it is edited.
+
+    While tracked, the nodes of the tree report changes of `name`, `amount`
+    and `fiscal_year_budget` and added or removed children. A change marks the
+    node and its ancestors dirty, and only dirty nodes are checked again,
+    deepest first, the next time a result is read. Editing a
+    `FiscalYearBudget` in place is not reported; call `mark_dirty` for the
+    node after such edits.
+
+    Besides the check of every node, the validator caches the sum of the
+    leaf amounts and the sum of the fiscal year budgets of every subtree.
+    """
+
+    def __init__(self, root: 'BudgetItem'):
+        self.root = root
+        self._checks = {}
+        self._invalid = {}
+        self._subtree_satang = {}
+        self._fiscal_year_satang = {}
+        self._dirty = {}
+
+        for node in root.iter_preorder():
+            self._track(node)
+        for node in root.iter_postorder():
+            self._recompute(node)
+
+    def _track(self, node: 'BudgetItem'):
+        if node._tracker is not None and node._tracker is not self:
+            node._tracker._untrack(node)
+        node._tracker = self
+        # wraps the list so that in-place edits are reported
+        node._fiscal_year_budget = TrackedList(
+            node._fiscal_year_budget, node._fiscal_year_budget_changed)
+
+    def _untrack(self, node: 'BudgetItem'):
+        node._tracker = None
+        node._fiscal_year_budget = list(node._fiscal_year_budget)
+        key = id(node)
+        self._checks.pop(key, None)
+        self._invalid.pop(key, None)
+        self._subtree_satang.pop(key, None)
+        self._fiscal_year_satang.pop(key, None)
+        self._dirty.pop(key, None)
+
+    def mark_dirty(self, node: 'BudgetItem'):
+        """
+        Marks a node and its ancestors for revalidation.
+        """
+        # the ancestors of a dirty node are already dirty
+        while (
+            node is not None
+            and node._tracker is self
+            and id(node) not in self._dirty
+        ):
+            self._dirty[id(node)] = node
+            node = node.parent
+
+    def attach(self, child: 'BudgetItem'):
+        """
+        Starts tracking a subtree that was added to a tracked node.
+        """
+        for node in child.iter_preorder():
+            self._track(node)
+            self._dirty[id(node)] = node
+        self.mark_dirty(child.parent)
+
+    def detach(self, parent: 'BudgetItem', child: 'BudgetItem'):
+        """
+        Stops tracking a subtree that was removed from a tracked node.
+        """
+        for node in child.iter_preorder():
+            if node._tracker is self:
+                self._untrack(node)
+        self.mark_dirty(parent)
+
+    def close(self):
+        """
+        Stops tracking the tree.
+        """
+        for node in self.root.iter_preorder():
+            if node._tracker is self:
+                self._untrack(node)
+
+    def _recompute(self, node: 'BudgetItem'):
+        key = id(node)
+        check = check_node(node)
+        self._checks[key] = check
+        if check is None:
+            self._invalid.pop(key, None)
+        else:
+            self._invalid[key] = node
+
+        children = node.children
+        if node.child_count:
+            self._subtree_satang[key] = sum(
+                self._subtree_satang[id(child)] for child in children)
+        else:
+            self._subtree_satang[key] = _to_satang_or_zero(node.amount)
+
+        self._fiscal_year_satang[key] = sum(
+            _to_satang_or_zero(fyb.amount) for fyb in node.fiscal_year_budget
+        ) + sum(self._fiscal_year_satang[id(child)] for child in children)
+
+    def flush(self):
+        """
+        Revalidates the dirty nodes, children before parents.
+        """
+        if not self._dirty:
+            return
+        nodes = list(self._dirty.values())
+        self._dirty.clear()
+        nodes.sort(key=lambda node: node.depth, reverse=True)
+        for node in nodes:
+            self._recompute(node)
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    def check(self, node: 'BudgetItem') -> Optional[Tuple[str, Optional[float], Optional[float], str]]:
+        """
+        Returns the cached result of `check_node` for a tracked node.
+        """
+        self.flush()
+        return self._checks[id(node)]
+
+    def error_message(self, node: 'BudgetItem') -> str:
+        """
+        Returns the error message of a tracked node in the format of the
+        `error_message` column.
+        """
+        check = self.check(node)
+        if check is None:
+            return ''
+        return f'While checking sum: {check[3]}\n'
+
+    def subtree_amount(self, node: 'BudgetItem') -> float:
+        """
+        Returns the sum of the amounts of the leaves under a tracked node.
+        """
+        self.flush()
+        return self._subtree_satang[id(node)] / 100
+
+    def fiscal_year_amount(self, node: 'BudgetItem') -> float:
+        """
+        Returns the sum of the fiscal year budgets in the subtree of a
+        tracked node.
+        """
+        self.flush()
+        return self._fiscal_year_satang[id(node)] / 100
+
+    def invalid_nodes(self) -> List['BudgetItem']:
+        """
+        Returns the tracked nodes that fail validation, in no particular order.
+        """
+        self.flush()
+        return list(self._invalid.values())
+
+    @property
+    def is_valid(self) -> bool:
+        self.flush()
+        return not self._invalid
+
+    def issues(self) -> List[ValidationIssue]:
+        """
+        Returns the issues of the whole tree, as `validate` does.
+        """
+        return validate(self.root)
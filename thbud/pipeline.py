@@ -0,0 +1,261 @@
+"""
+Pipelines of named stages connected by bounded queues.
+
+Every stage has its own worker threads, so a slow stage such as parsing
+documents can have more workers than a cheap one, and the bounded queues
+keep a fast stage from running ahead of a slow one and filling memory.
+"""
+import queue
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+_DONE = object()
+
+
+class Stage:
+    """
+    A step of a pipeline.
+
+    :param name: name of the stage, used in the statistics and errors
+    :param fn: function applied to every value
+    :param workers: number of threads running the stage
+    :param queue_size: number of values waiting for the stage, the queue
+        size of the pipeline if None
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Any],
+        workers: int = 1,
+        queue_size: Optional[int] = None,
+    ):
+        if workers < 1:
+            raise ValueError(f'Stage {name} needs at least one worker')
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+
+
+class StageStats:
+    """
+    Throughput counters of a stage.
+
+    :param name: name of the stage
+    :param processed: number of values the stage returned
+    :param failed: number of values the stage raised on
+    :param busy_seconds: time spent in the stage, summed over its workers
+    :param waiting: number of values in the queue of the stage
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.waiting = 0
+
+    @property
+    def items_per_second(self) -> float:
+        """
+        Values handled per second of work of one worker.
+        """
+        total = self.processed + self.failed
+        return total / self.busy_seconds if self.busy_seconds else 0.0
+
+    def to_json(self):
+        return {
+            'name': self.name,
+            'processed': self.processed,
+            'failed': self.failed,
+            'busy_seconds': self.busy_seconds,
+            'waiting': self.waiting,
+            'items_per_second': self.items_per_second,
+        }
+
+    def __repr__(self):
+        return (
+            f'StageStats({self.name}, processed={self.processed}, '
+            f'failed={self.failed}, busy={self.busy_seconds:.3f}s)'
+        )
+
+
+class PipelineResult:
+    """
+    The outcome of an item that went through a pipeline.
+
+    :param item: the item given to the pipeline
+    :param value: the value returned by the last stage, None if failed
+    :param error: the exception that failed the item, or None
+    :param stage: name of the stage that failed the item, or None
+    :param traceback: the formatted traceback of `error`, or None
+    :param seconds: time spent by every stage on the item
+    """
+
+    def __init__(self, item):
+        self.item = item
+        self.value = item
+        self.error: Optional[BaseException] = None
+        self.stage: Optional[str] = None
+        self.traceback: Optional[str] = None
+        self.seconds: Dict[str, float] = {}
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class Pipeline:
+    """
+    Runs items through stages in order. Stage `i` takes the values returned
+    by stage `i - 1`, the first stage takes the items. An exception in a
+    stage fails the item, which skips the remaining stages and is returned
+    with the error.
+
+    Results are returned in the order they finish, not in the order of the
+    items. A pipeline can be run once.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 4):
+        if not stages:
+            raise ValueError('A pipeline needs at least one stage')
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError(f'Stage names must be unique, got {names}')
+        self.stages = stages
+        self.queues = [
+            queue.Queue(queue_size if stage.queue_size is None else stage.queue_size)
+            for stage in stages
+        ]
+        # results are taken by the caller as soon as they are ready
+        self.queues.append(queue.Queue())
+        self._stats = [StageStats(stage.name) for stage in stages]
+        self._running = [stage.workers for stage in stages]
+        self._lock = threading.Lock()
+        self._started = False
+
+    def stats(self) -> List[StageStats]:
+        """
+        Returns the counters of every stage so far. They can be read while
+        the pipeline runs.
+        """
+        with self._lock:
+            for stats, stage_queue in zip(self._stats, self.queues):
+                stats.waiting = stage_queue.qsize()
+            return list(self._stats)
+
+    def _feed(self, items: Iterable):
+        first = self.queues[0]
+        try:
+            for item in items:
+                first.put(PipelineResult(item))
+        finally:
+            for _ in range(self.stages[0].workers):
+                first.put(_DONE)
+
+    def _work(self, index: int):
+        stage = self.stages[index]
+        stats = self._stats[index]
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1]
+        while True:
+            result = inbox.get()
+            if result is _DONE:
+                break
+            if result.error is None:
+                start = time.perf_counter()
+                try:
+                    result.value = stage.fn(result.value)
+                    failed = False
+                except Exception as e:
+                    result.value = None
+                    result.error = e
+                    result.stage = stage.name
+                    result.traceback = traceback.format_exc()
+                    failed = True
+                seconds = time.perf_counter() - start
+                result.seconds[stage.name] = seconds
+                with self._lock:
+                    stats.busy_seconds += seconds
+                    if failed:
+                        stats.failed += 1
+                    else:
+                        stats.processed += 1
+            outbox.put(result)
+
+        # the last worker of a stage ends the next stage
+        with self._lock:
+            self._running[index] -= 1
+            last = self._running[index] == 0
+        if last:
+            next_workers = 1 if index + 1 == len(self.stages) else self.stages[index + 1].workers
+            for _ in range(next_workers):
+                outbox.put(_DONE)
+
+    def run(self, items: Iterable) -> Iterator[PipelineResult]:
+        """
+        Runs the items through the stages, and yields their results as they
+        finish.
+        """
+        if self._started:
+            raise RuntimeError('A pipeline can be run once')
+        self._started = True
+
+        threads = [threading.Thread(target=self._feed, args=(items,), daemon=True)]
+        for index, stage in enumerate(self.stages):
+            threads.extend(
+                threading.Thread(
+                    target=self._work, args=(index,),
+                    name=f'{stage.name}-{worker}', daemon=True,
+                )
+                for worker in range(stage.workers)
+            )
+        for thread in threads:
+            thread.start()
+
+        results = self.queues[-1]
+        while True:
+            result = results.get()
+            if result is _DONE:
+                break
+            yield result
+        for thread in threads:
+            thread.join()
+
+
+def run_concurrently(
+    runs: Sequence[Tuple[Pipeline, Iterable]],
+) -> Iterator[PipelineResult]:
+    """
+    Runs pipelines side by side, each on its own items, e.g. one pipeline
+    per lane of workers, and yields the results of all of them as they
+    finish.
+    """
+    results = queue.Queue()
+
+    def forward(pipeline, items):
+        try:
+            for result in pipeline.run(items):
+                results.put(result)
+        finally:
+            results.put(_DONE)
+
+    threads = [
+        threading.Thread(target=forward, args=run, daemon=True)
+        for run in runs
+    ]
+    for thread in threads:
+        thread.start()
+
+    running = len(threads)
+    while running:
+        result = results.get()
+        if result is _DONE:
+            running -= 1
+            continue
+        yield result
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,155 @@
+"""
+Scheduling of batch conversions by their estimated cost.
+
+The cost of a file is estimated from its size and number of pages, or
+sheets, with rates fitted on the timings of earlier runs, and from the
+earlier time of the file itself when it has not changed size. Files are
+dispatched largest first (longest processing time first), and small files
+are packed into shared tasks so that they do not each pay the overhead of
+a task.
+"""
+import heapq
+import zipfile
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .archive import open_document, read_document, split_archive_path
+
+# rates used until there are timings of earlier runs
+DEFAULT_SECONDS_PER_MB = 2.0
+DEFAULT_SECONDS_PER_PAGE = 0.05
+# tasks per worker that packing small files aims for
+TASKS_PER_WORKER = 16
+
+
+def page_count(path: str) -> int:
+    """
+    Returns the number of sheets of an XLSX file or pages of a PDF, read
+    from the file index only, or 0 if it cannot be read. The index of an
+    XLSX file in a zip archive is read from the member as it is
+    decompressed, and a PDF in a zip archive is read into memory.
+    """
+    try:
+        if path.lower().endswith('.xlsx'):
+            with open_document(path) as fp, zipfile.ZipFile(fp) as archive:
+                return sum(
+                    1 for name in archive.namelist()
+                    if name.startswith('xl/worksheets/') and name.endswith('.xml')
+                )
+        import fitz
+        if split_archive_path(path) is None:
+            doc = fitz.open(path)
+        else:
+            doc = fitz.open(stream=read_document(path).getvalue(), filetype='pdf')
+        with doc:
+            return doc.page_count
+    except Exception:
+        return 0
+
+
+class CostModel:
+    """
+    Estimates the seconds to convert a file as
+    `seconds_per_mb * size + seconds_per_page * pages`.
+    """
+
+    def __init__(
+        self,
+        seconds_per_mb: float = DEFAULT_SECONDS_PER_MB,
+        seconds_per_page: float = DEFAULT_SECONDS_PER_PAGE,
+    ):
+        self.seconds_per_mb = seconds_per_mb
+        self.seconds_per_page = seconds_per_page
+
+    @classmethod
+    def fit(cls, records: Iterable[dict]) -> 'CostModel':
+        """
+        Fits the rates to the `size`, `pages` and `seconds` of status
+        records of converted files, see `thbud.statuslog`. Returns the
+        default rates if there are too few records.
+        """
+        features, seconds = [], []
+        for record in records:
+            if 'size' in record and 'seconds' in record:
+                features.append((record['size'] / (1 << 20), record.get('pages', 0)))
+                seconds.append(record['seconds'])
+        if len(features) < 2:
+            return cls()
+
+        features = np.array(features, dtype=np.float64)
+        seconds = np.array(seconds, dtype=np.float64)
+        rates, _, rank, _ = np.linalg.lstsq(features, seconds, rcond=None)
+        if rank < 2 or (rates < 0).any():
+            # fall back to size alone, e.g. if every file has the same pages
+            size_mb = features[:, 0]
+            if not size_mb.sum():
+                return cls()
+            return cls(float(seconds.sum() / size_mb.sum()), 0.0)
+        return cls(float(rates[0]), float(rates[1]))
+
+    def predict(self, size: int, pages: int = 0) -> float:
+        return self.seconds_per_mb * size / (1 << 20) + self.seconds_per_page * pages
+
+
+def estimate_cost(
+    model: CostModel,
+    size: int,
+    pages: int,
+    history: Optional[dict] = None,
+) -> float:
+    """
+    Returns the estimated seconds of a file. The seconds of its last
+    successful conversion are used if it still has the same size.
+    """
+    if history is not None and history.get('size') == size and 'seconds' in history:
+        return history['seconds']
+    return model.predict(size, pages)
+
+
+def lpt_makespan(costs: Sequence[float], workers: int) -> float:
+    """
+    Returns the time for `workers` to finish tasks of `costs` given in
+    order, each to the first free worker.
+    """
+    finish = [0.0] * max(workers, 1)
+    for cost in costs:
+        heapq.heapreplace(finish, finish[0] + cost)
+    return max(finish)
+
+
+def pack_tasks(
+    costs: Sequence[float],
+    workers: int,
+    task_cost: Optional[float] = None,
+) -> List[List[int]]:
+    """
+    Groups the indices of files into tasks, largest first. Files that cost
+    less than `task_cost` share a task with other small files up to that
+    cost. `task_cost` defaults to the total cost over `TASKS_PER_WORKER`
+    tasks per worker, so there are enough tasks left to balance the
+    workers at the end.
+
+    Returns:
+        The tasks in descending order of cost.
+    """
+    if task_cost is None:
+        task_cost = sum(costs) / (max(workers, 1) * TASKS_PER_WORKER)
+
+    order = sorted(range(len(costs)), key=lambda index: -costs[index])
+    tasks = []
+    batch, batch_cost = [], 0.0
+    for index in order:
+        if costs[index] >= task_cost:
+            tasks.append(([index], costs[index]))
+            continue
+        batch.append(index)
+        batch_cost += costs[index]
+        if batch_cost >= task_cost:
+            tasks.append((batch, batch_cost))
+            batch, batch_cost = [], 0.0
+    if batch:
+        tasks.append((batch, batch_cost))
+
+    tasks.sort(key=lambda task: -task[1])
+    return [indices for indices, _ in tasks]
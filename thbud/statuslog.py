@@ -0,0 +1,100 @@
+"""
+Log of the outcome of every file of a batch run, one JSON object per line,
+so that a stopped run can be resumed and failed files retried.
+"""
+import datetime
+import json
+import os
+import threading
+from typing import Dict, Iterator, Optional, Set
+
+# statuses of a file, besides the name of the exception that failed it
+OK = 'ok'
+SKIPPED = 'skipped'
+CRASH = 'crash'
+
+
+def is_failure(status: str) -> bool:
+    return status not in (OK, SKIPPED)
+
+
+def new_run_id() -> str:
+    return datetime.datetime.now().strftime('%Y%m%dT%H%M%S') + f'-{os.getpid()}'
+
+
+class StatusLog:
+    """
+    Appends the outcome of files to a JSONL file at `path`. Every record
+    has the `run`, the `file`, its `status` and the `time` it was logged.
+
+    Every line is flushed when it is logged, so the log of a run that is
+    killed has every file that finished. A last line cut short by a kill is
+    ignored when reading.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ends_with_newline = None
+
+    def append(self, record: dict):
+        record = dict(record)
+        record.setdefault('time', datetime.datetime.now().isoformat(timespec='seconds'))
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if self._ends_with_newline is None:
+                self._ends_with_newline = self._check_newline()
+            if not self._ends_with_newline:
+                # end the line cut short by a kill, so that it stays apart
+                line = '\n' + line
+                self._ends_with_newline = True
+            with open(self.path, 'a', encoding='utf-8') as fp:
+                fp.write(line)
+                fp.flush()
+
+    def _check_newline(self) -> bool:
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return True
+        with open(self.path, 'rb') as fp:
+            fp.seek(-1, os.SEEK_END)
+            return fp.read(1) == b'\n'
+
+    def read(self) -> Iterator[dict]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as fp:
+            for line in fp:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def last_run(self) -> Optional[str]:
+        run = None
+        for record in self.read():
+            run = record['run']
+        return run
+
+    def files_of_run(self, run: str) -> Set[str]:
+        """
+        Returns the files with an outcome in `run`.
+        """
+        return {record['file'] for record in self.read() if record['run'] == run}
+
+    def last_statuses(self) -> Dict[str, dict]:
+        """
+        Returns the last record of every file, over all runs.
+        """
+        return {record['file']: record for record in self.read()}
+
+    def failed_files(self) -> Set[str]:
+        """
+        Returns the files whose last outcome is a failure.
+        """
+        return {
+            file for file, record in self.last_statuses().items()
+            if is_failure(record['status'])
+        }
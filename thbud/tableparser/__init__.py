@@ -1,2 +1,2 @@
-from .extract import extract_tables, is_on_line, dfs
+from .extract import extract_tables, is_on_line, are_on_lines, dfs, Table
 from .contains import has_table
\ No newline at end of file
@@ -1,9 +1,10 @@
+import math
 import numpy as np
-from typing import List, Dict, T, Union
+from bisect import bisect_right
+from collections import defaultdict
+from typing import List, Dict, Optional, T, Tuple, Union
 from fitz import Rect
 
-import numpy as np
-
 
 def is_on_line(point, line_start, line_end, tolerance=0.0001):
     # Unpack the x and y coordinates of the line start, line end, and point
@@ -12,15 +13,15 @@ def is_on_line(point, line_start, line_end, tolerance=0.0001):
     x3, y3 = point
 
     # Calculate the distance between the line start and line end
-    dist = np.sqrt((x2 - x1)**2 + (y2 - y1)**2)
+    dist = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
 
     # If the distance is 0, the line is actually a point, so return False
     if dist == 0:
         return False
 
     # Calculate the distances between the point and the line start and line end
-    dist1 = np.sqrt((x3 - x1)**2 + (y3 - y1)**2)
-    dist2 = np.sqrt((x3 - x2)**2 + (y3 - y2)**2)
+    dist1 = math.sqrt((x3 - x1)**2 + (y3 - y1)**2)
+    dist2 = math.sqrt((x3 - x2)**2 + (y3 - y2)**2)
 
     # Calculate the dot product of the vectors from the line start to the point and from the line start to the line end
     dot_product = ((x3 - x1) * (x2 - x1) + (y3 - y1) * (y2 - y1)) / (dist**2)
@@ -30,14 +31,103 @@ def is_on_line(point, line_start, line_end, tolerance=0.0001):
         return False
 
     # Calculate the distance between the point and the line, and return True if it's within the tolerance
-    return np.abs((y2 - y1) * x3 - (x2 - x1) * y3 + x2 * y1 - y2 * x1) / dist < tolerance
+    return abs((y2 - y1) * x3 - (x2 - x1) * y3 + x2 * y1 - y2 * x1) / dist < tolerance
 
 
+def are_on_lines(points, line_starts, line_ends, tolerance=0.0001) -> np.ndarray:
+    """
+    Vectorized `is_on_line`. The arguments are arrays of (x, y) pairs in
+    their last axis and are broadcast against each other, so arrays of the
+    same shape test point i against line i, while `points[:, None]` with
+    `line_starts[None, :]` and `line_ends[None, :]` test every point
+    against every line.
+
+    Args:
+        points: An array of shape (..., 2).
+        line_starts: An array of shape (..., 2).
+        line_ends: An array of shape (..., 2).
+        tolerance: The maximum distance between a point and a line.
+
+    Returns:
+        A boolean array of the broadcast shape without the last axis.
+    """
+    points = np.asarray(points, dtype=float)
+    line_starts = np.asarray(line_starts, dtype=float)
+    line_ends = np.asarray(line_ends, dtype=float)
+
+    x1, y1 = line_starts[..., 0], line_starts[..., 1]
+    x2, y2 = line_ends[..., 0], line_ends[..., 1]
+    x3, y3 = points[..., 0], points[..., 1]
+
+    dist = np.sqrt((x2 - x1)**2 + (y2 - y1)**2)
+    dist1 = np.sqrt((x3 - x1)**2 + (y3 - y1)**2)
+    dist2 = np.sqrt((x3 - x2)**2 + (y3 - y2)**2)
+
+    # lines of length 0 are points and never contain a point
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dot_product = (
+            (x3 - x1) * (x2 - x1) + (y3 - y1) * (y2 - y1)) / (dist**2)
+        distance_to_line = np.abs(
+            (y2 - y1) * x3 - (x2 - x1) * y3 + x2 * y1 - y2 * x1) / dist
+
+    return (
+        (dist != 0)
+        & (dot_product >= 0) & (dot_product <= 1)
+        & (dist1 <= dist) & (dist2 <= dist)
+        & (distance_to_line < tolerance)
+    )
+
+
+def _grid_cell(x: float, y: float, cell_size: float):
+    return int(x // cell_size), int(y // cell_size)
+
+
+def _build_endpoint_grid(rects: List[Rect], cell_size: float) -> Dict[tuple, List[int]]:
+    """
+    Buckets the end points (top left and bottom right) of every rect into
+    a uniform grid. The value of each cell is the list of rect indices
+    that have an end point inside the cell.
+
+    Args:
+        rects: A list of Rect objects.
+        cell_size: The width and height of a grid cell.
+    """
+    grid = defaultdict(list)
+    for idx, rect in enumerate(rects):
+        for point in (rect.top_left, rect.bottom_right):
+            grid[_grid_cell(point.x, point.y, cell_size)].append(idx)
+    return grid
+
+
+def _query_endpoint_grid(grid: Dict[tuple, List[int]], x0: float, y0: float, x1: float, y1: float, cell_size: float) -> List[int]:
+    """
+    Returns the sorted indices of rects having an end point in a grid cell
+    that overlaps the given bounding box.
+    """
+    cx0, cy0 = _grid_cell(x0, y0, cell_size)
+    cx1, cy1 = _grid_cell(x1, y1, cell_size)
+
+    candidates = set()
+    # Walk whichever is smaller: the covered cells or the occupied cells
+    if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(grid):
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                candidates.update(grid.get((cx, cy), ()))
+    else:
+        for (cx, cy), indices in grid.items():
+            if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                candidates.update(indices)
+    return sorted(candidates)
+
 
 def get_connected_lines(rects: List[Rect], tolerance: int = 10) -> Dict[Rect, List[Rect]]:
     """
     Returns a dictionary of lists of rects that are connected by lines.
 
+    A point can only lie on a line if it is inside the bounding box of the
+    line grown by `tolerance`, so the end points of all rects are indexed in
+    a grid and only rects with an end point near the line are tested.
+
     Args:
       rects: A list of Rect objects.
       tolerance: The tolerance for determining if a point is on a line.
@@ -45,24 +135,52 @@ def get_connected_lines(rects: List[Rect], tolerance: int = 10) -> Dict[Rect, Li
     Returns:
       A dictionary of lists of rects that are connected by lines.
     """
-    connected_lines = {}
-    for rect in rects:
+    cell_size = max(float(tolerance), 1.0) * 2
+    grid = _build_endpoint_grid(rects, cell_size)
+
+    # equal rects share a key, the last one of them wins
+    last_index = {rect: idx for idx, rect in enumerate(rects)}
+
+    # candidate pairs (line index, index of the rect that may touch it)
+    line_indices = []
+    other_indices = []
+    for idx, rect in enumerate(rects):
+        if last_index[rect] != idx:
+            continue
         start = rect.top_left
         end = rect.bottom_right
-        connected_lines[rect] = []
-
-        for line in rects:
+        candidates = _query_endpoint_grid(
+            grid,
+            min(start.x, end.x) - tolerance,
+            min(start.y, end.y) - tolerance,
+            max(start.x, end.x) + tolerance,
+            max(start.y, end.y) + tolerance,
+            cell_size,
+        )
+        for other_idx in candidates:
             # Skip the rect if it is the same as the rect we are checking
-            if line is rect:
+            if rects[other_idx] is rect:
                 continue
-
-            is_top_left_on_the_line = is_on_line(
-                line.top_left, start, end, tolerance)
-            is_bottom_right_on_the_line = is_on_line(
-                line.bottom_right, start, end, tolerance)
-
-            if is_top_left_on_the_line or is_bottom_right_on_the_line:
-                connected_lines[rect].append(line)
+            line_indices.append(idx)
+            other_indices.append(other_idx)
+
+    connected_lines = {rect: [] for rect in rects}
+    if not line_indices:
+        return connected_lines
+
+    coords = np.array([tuple(rect) for rect in rects], dtype=float)
+    lines = coords[line_indices]
+    others = coords[other_indices]
+    is_connected = (
+        are_on_lines(others[:, :2], lines[:, :2], lines[:, 2:], tolerance)
+        | are_on_lines(others[:, 2:], lines[:, :2], lines[:, 2:], tolerance)
+    )
+
+    for idx, other_idx in zip(
+        np.asarray(line_indices)[is_connected],
+        np.asarray(other_indices)[is_connected],
+    ):
+        connected_lines[rects[idx]].append(rects[other_idx])
 
     return connected_lines
 
@@ -110,6 +228,28 @@ def merge_rects(rects: List[Rect]) -> Rect:
     return big_rect
 
 
+def cluster_positions(positions: List[float], threshold: float = 5) -> List[float]:
+    """
+    Clusters positions that are closer than `threshold` to each other.
+
+    The positions are sorted once and each cluster is represented by its
+    smallest position, so a position starts a new cluster only if it is at
+    least `threshold` after the previous representative.
+
+    Args:
+        positions: A list of positions along one axis.
+        threshold: The minimum distance between two clusters.
+
+    Returns:
+        The sorted list of cluster representatives.
+    """
+    clusters = []
+    for position in sorted(positions):
+        if not clusters or position - clusters[-1] >= threshold:
+            clusters.append(position)
+    return clusters
+
+
 class Table:
     def __init__(self, rects: List[Rect]):
         self.rects = rects
@@ -120,6 +260,10 @@ class Table:
         self._find_horizontals()
         self._find_verticals()
 
+        # sorted y and x boundaries of the cells
+        self.row_bounds = []
+        self.column_bounds = []
+
         self.table_cells = []
         self._initialize_table_cells()
 
@@ -127,37 +271,17 @@ class Table:
         """
         Finds the horizontal lines in the table.
         """
-        horizontal_y0_list = []
-
-        def is_in_horizontal(rect):
-            threshold = 5
-            for horizontal in horizontal_y0_list:
-                if abs(rect.y0 - horizontal) < threshold:
-                    return True
-            return False
-        for rect in self.rects:
-            if rect.width > rect.height and not is_in_horizontal(rect):
-                horizontal_y0_list.append(rect.y0)
-
-        self.horizontals = horizontal_y0_list
+        self.horizontals = cluster_positions([
+            rect.y0 for rect in self.rects if rect.width > rect.height
+        ])
 
     def _find_verticals(self):
         """
         Finds the vertical lines in the table.
         """
-        vertical_x0_list = []
-
-        def is_in_vertical(rect):
-            threshold = 5
-            for vertical in vertical_x0_list:
-                if abs(rect.x0 - vertical) < threshold:
-                    return True
-            return False
-        for rect in self.rects:
-            if rect.width < rect.height and not is_in_vertical(rect):
-                vertical_x0_list.append(rect.x0)
-
-        self.verticals = vertical_x0_list
+        self.verticals = cluster_positions([
+            rect.x0 for rect in self.rects if rect.width < rect.height
+        ])
 
     def _initialize_table_cells(self):
         """
@@ -173,6 +297,8 @@ class Table:
 
         horizontals.sort()
         verticals.sort()
+        self.row_bounds = horizontals
+        self.column_bounds = verticals
         for i in range(len(horizontals) - 1):
             for j in range(len(verticals) - 1):
                 cell = Rect(
@@ -183,94 +309,197 @@ class Table:
                 )
                 self.table_cells.append((i, j, cell, []))
 
+    @property
+    def num_rows(self) -> int:
+        return max(len(self.row_bounds) - 1, 0)
+
+    @property
+    def num_columns(self) -> int:
+        return max(len(self.column_bounds) - 1, 0)
+
+    def find_cell(self, x: float, y: float) -> Optional[Tuple[int, int]]:
+        """
+        Finds the row and column of the cell containing the point (x, y).
+        A cell contains its top and left borders but not its bottom and
+        right borders, as `Rect.contains` does.
+
+        Returns:
+            The (row, column) of the cell, or None if the point is outside
+            of every cell.
+        """
+        i = bisect_right(self.row_bounds, y) - 1
+        j = bisect_right(self.column_bounds, x) - 1
+        if 0 <= i < self.num_rows and 0 <= j < self.num_columns:
+            return i, j
+        return None
+
     def add_word(self, word, x0, y0, x1, y1):
         """
         Adds a word to the table cell it belongs to.
         """
-        added = False
-        for ci, cj, cell, cwords in self.table_cells:
-            if cell.contains(((x0+x1)/2, (y0+y1)/2)):
-                cwords.append(word)
-                added = True
-                break
-
-        if not added:
+        cell_index = self.find_cell((x0+x1)/2, (y0+y1)/2)
+
+        if cell_index is None:
             raise Exception(
                 "Word not added to table cell. It is not contained in any table cell.")
 
+        i, j = cell_index
+        self.table_cells[i * self.num_columns + j][3].append(word)
+
+    def add_words(self, words: List[T], bboxes) -> List[T]:
+        """
+        Adds many words to the table cells they belong to at once.
+
+        Args:
+            words: A list of words.
+            bboxes: The (x0, y0, x1, y1) of each word, as a sequence or
+              an array of shape (len(words), 4).
+
+        Returns:
+            The words that are not contained in any table cell, in order.
+        """
+        if len(words) == 0:
+            return []
+
+        bboxes = np.asarray(bboxes, dtype=float).reshape(len(words), 4)
+        centers_x = (bboxes[:, 0] + bboxes[:, 2]) / 2
+        centers_y = (bboxes[:, 1] + bboxes[:, 3]) / 2
+
+        rows = np.searchsorted(self.row_bounds, centers_y, side='right') - 1
+        columns = np.searchsorted(
+            self.column_bounds, centers_x, side='right') - 1
+        inside = (
+            (rows >= 0) & (rows < self.num_rows)
+            & (columns >= 0) & (columns < self.num_columns)
+        )
+        cell_indices = rows * self.num_columns + columns
+
+        not_added = []
+        for word, is_inside, cell_index in zip(words, inside, cell_indices):
+            if is_inside:
+                self.table_cells[cell_index][3].append(word)
+            else:
+                not_added.append(word)
+        return not_added
+
+    def to_rows(self, separator: str = ' ') -> List[List[str]]:
+        """
+        Returns the text of the table as a list of rows, each a list of the
+        texts of its cells joined by `separator`.
+        """
+        rows = [[''] * self.num_columns for _ in range(self.num_rows)]
+        for i, j, _, cwords in self.table_cells:
+            rows[i][j] = separator.join(str(word) for word in cwords)
+        return rows
+
     def __repr__(self) -> str:
         return f"Table(horz={len(self.horizontals)}, vert={len(self.verticals)})"
 
 
+def connected_components(rects: List[Rect], graph: Dict[Rect, List[Rect]]) -> List[List[Rect]]:
+    """
+    Groups rects into the connected components of the (undirected)
+    connection graph with a disjoint-set forest.
+
+    Args:
+        rects: A list of Rect objects.
+        graph: A dictionary of lists of connected rects, as returned by
+          `get_connected_lines`.
+
+    Returns:
+        A list of components, each a list of rects in the order of `rects`.
+    """
+    index = {rect: idx for idx, rect in enumerate(rects)}
+    parent = list(range(len(rects)))
+    size = [1] * len(rects)
+
+    def find(idx):
+        # path halving
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    for rect, neighbours in graph.items():
+        a = find(index[rect])
+        for neighbour in neighbours:
+            b = find(index[neighbour])
+            if a == b:
+                continue
+            # union by size
+            if size[a] < size[b]:
+                a, b = b, a
+            parent[b] = a
+            size[a] += size[b]
+
+    components = {}
+    for idx, rect in enumerate(rects):
+        components.setdefault(find(idx), []).append(rect)
+
+    return list(components.values())
+
+
+def remove_contained_rects(rects: List[Rect]) -> List[Rect]:
+    """
+    Removes the rects that are contained in another rect of the list.
+
+    The rects are sorted by area from largest to smallest, so a rect can only
+    be contained in one that was already kept.
+
+    Args:
+        rects: A list of Rect objects.
+
+    Returns:
+        The rects that are not contained in any other rect, largest first.
+    """
+    kept = []
+    for rect in sorted(rects, key=lambda r: r.width * r.height, reverse=True):
+        if not any(big_rect.contains(rect) for big_rect in kept):
+            kept.append(rect)
+    return kept
+
+
 def extract_tables(rects: List[Rect]) -> List[Table]:
     """
     Extracts tables from a list of rectangles.
 
+    Every connected component of two or more rects is a table candidate.
+    Candidates contained in a bigger candidate are dropped.
+
     Args:
         rects: A list of `Rect` objects representing the rectangles to extract tables from.
 
     Returns:
         A list of `Table` objects representing the extracted tables.
     """
+    if len(rects) == 0:
+        return []
 
     # Get a dictionary of lists of connected lines
     connected_lines = get_connected_lines(rects)
 
-    # Define a list of table rectangles
-    table_rects = list()
+    # Merge the rects of each component into a single "big" rectangle
+    table_rects = remove_contained_rects([
+        merge_rects(component)
+        for component in connected_components(rects, connected_lines)
+        if len(component) > 1
+    ])
 
-    # Loop through each rectangle in the list of rectangles
-    for rect in rects:
-        # Create an empty list to keep track of visited rectangles
-        visited = list()
-
-        # Call the dfs function to find all rectangles connected to the current rectangle
-        ret = dfs(visited, connected_lines, rect)
-
-        # If the dfs function returns 0, the current rectangle is not connected to any other rectangles
-        if ret == 0:
-            continue
-
-        # Merge all visited rectangles into a single "big" rectangle
-        big_rect = merge_rects(visited)
-
-        # Append the big rectangle to the list of table rectangles if:
-        # the list is empty
-        if len(table_rects) == 0:
-            table_rects.append(big_rect)
-        # the big rectangle is not contained in any of the existing table rectangles
-        else:
-            contained = False
-            for table in table_rects:
-                # check if the big rectangle is contained in the table rectangle
-                if table.contains(big_rect):
-                    contained = True
-                    break
-
-                # check if the big rectangle contains the table rectangle
-                elif big_rect.contains(table):
-                    table_rects.remove(table)
-            # if the big rectangle is not contained in
-            # any of the existing table rectangles, append it to the list
-            if not contained:
-                table_rects.append(big_rect)
+    coords = np.array([tuple(rect) for rect in rects])
+    x0, y0, x1, y1 = coords.T
 
     table_list = []
 
     # Loop through each table rectangle
     for table in table_rects:
-        # Create an empty list to keep track of table rectangles
-        tab_rects = []
-        # page_image = new_image()
-
-        for rect in rects:
-            # If the rectangle is contained in the table rectangle,
-            # append it to the list of table rectangles
-            if table.contains(rect):
-                tab_rects.append(rect)
+        # A rectangle belongs to the table if the table rectangle contains it
+        inside = (
+            (table.x0 <= x0) & (x0 <= x1) & (x1 <= table.x1)
+            & (table.y0 <= y0) & (y0 <= y1) & (y1 <= table.y1)
+        )
+        tab_rects = [rects[idx] for idx in np.flatnonzero(inside)]
 
         # Append the list of table rectangles to the list of tables
         table_list.append(Table(tab_rects))
 
     return table_list
-
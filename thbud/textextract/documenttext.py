@@ -1,8 +1,12 @@
-from typing import List, Optional, Callable, Tuple, Union
+import io
+from typing import BinaryIO, List, Optional, Callable, Tuple, Union
 import fitz
 from .text import WordText, PageText, LineText
+from ..archive import read_document, split_archive_path
 from ..tableparser import (
-    has_table
+    has_table,
+    extract_tables,
+    Table,
 )
 import numpy as np
 import openpyxl
@@ -97,6 +101,58 @@ def page_contains_table(page: fitz.Page) -> bool:
     return has_table(image)
 
 
+def get_ruling_rects(page: fitz.Page) -> List[fitz.Rect]:
+    """
+    Returns the rects of the vector drawings that are inside the page.
+    """
+    return [
+        drawing['rect']
+        for drawing in page.get_drawings()
+        if is_rect_inside_page(drawing['rect'], page.rect.width, page.rect.height)
+    ]
+
+
+def extract_page_tables(page: fitz.Page, lines: List[LineText]) -> List[Table]:
+    """
+    Builds the tables of a page from its ruling lines and assigns the words
+    of `lines` to the table cells.
+
+    Args:
+        page (fitz.Page): The page to extract the tables from.
+        lines (List[LineText]): The lines of the page, in coordinates
+            normalized by the page size.
+
+    Returns:
+        List[Table]: The tables of the page. Empty if the page has no rulings.
+    """
+    rects = get_ruling_rects(page)
+    if not rects:
+        return []
+
+    tables = extract_tables(rects)
+    if not tables:
+        return []
+
+    words = [word for line in lines for word in line.words]
+    bboxes = np.array(
+        [(word.x0, word.y0, word.x1, word.y1) for word in words],
+        dtype=float,
+    ).reshape(len(words), 4)
+    bboxes *= (page.rect.width, page.rect.height,
+               page.rect.width, page.rect.height)
+
+    # words that are not in a table are passed on to the next one
+    for table in tables:
+        if not words:
+            break
+        index = {id(word): idx for idx, word in enumerate(words)}
+        words_left = table.add_words(words, bboxes)
+        bboxes = bboxes[[index[id(word)] for word in words_left]]
+        words = words_left
+
+    return tables
+
+
 class DocumentText:
     def __init__(
         self,
@@ -104,10 +160,21 @@ class DocumentText:
         words_loader: Optional[Callable[[
             fitz.Page], List[Tuple[float, float, float, float, str]]]] = None,
         lazy: bool = False,
+        parse_tables: bool = False,
+        stream: Optional[Union[bytes, BinaryIO]] = None,
     ) -> 'DocumentText':
+        """
+        Args:
+          filepath (str): path of the PDF, or of a PDF in a zip archive, see
+            `thbud.archive`.
+          stream (bytes or binary file, optional): the PDF, read instead of
+            `filepath`, which is then only used as its name.
+        """
         self.filepath = filepath
+        self.stream = stream
         self.page_label_to_index = dict()  # str as key
         self.lazy = lazy
+        self.parse_tables = parse_tables
         self.doc = None
         self.pages = []
         if words_loader is None:
@@ -128,8 +195,17 @@ class DocumentText:
         return words
 
     def _read_pdf_file(self,) -> List['PageText']:
+        stream = self.stream
+        if stream is None and split_archive_path(self.filepath) is not None:
+            stream = read_document(self.filepath)
         try:
-            doc: fitz.Document = fitz.open(self.filepath)
+            if stream is None:
+                doc: fitz.Document = fitz.open(self.filepath)
+            else:
+                # MuPDF reads the whole PDF from memory
+                if not isinstance(stream, (bytes, bytearray)):
+                    stream = stream.read()
+                doc = fitz.open(stream=stream, filetype='pdf')
         except fitz.FileNotFoundError as e:
             raise FileNotFoundError(
                 'File not found: {}'.format(self.filepath)) from e
@@ -143,7 +219,26 @@ class DocumentText:
                 continue
             self._load_page(pidx)
 
+    def close(self):
+        """
+        Closes the PDF, releasing the document and its caches. Pages that
+        were loaded stay readable, and loading other pages raises.
+        """
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
+        self.stream = None
+
+    def __enter__(self) -> 'DocumentText':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
     def _load_page(self, page_index: int) -> 'PageText':
+        if self.doc is None:
+            raise ValueError(
+                'Cannot load page {} of the closed doc {}'.format(page_index, self.filepath))
         for pidx, page in enumerate(self.doc.pages()):
             if pidx != page_index or self.pages[pidx] is not None:
                 continue
@@ -178,6 +273,8 @@ class DocumentText:
                 line.page = pagetext
 
             pagetext.contains_table = page_contains_table(page)
+            if self.parse_tables:
+                pagetext.tables = extract_page_tables(page, pagetext.lines)
             self.pages[pidx] = pagetext
 
     def get_page(self: 'DocumentText', page_index: int) -> 'PageText':
@@ -225,8 +322,20 @@ class DocumentText:
 
 
 class XLSXDocumentText:
-    def __init__(self, filepath: str) -> None:
+    def __init__(
+        self,
+        filepath: str,
+        stream: Optional[Union[bytes, BinaryIO]] = None,
+    ) -> None:
+        """
+        Args:
+          filepath (str): path of the XLSX file, or of an XLSX file in a zip
+            archive, see `thbud.archive`.
+          stream (bytes or binary file, optional): the XLSX file, read
+            instead of `filepath`, which is then only used as its name.
+        """
         self.filepath = filepath
+        self.stream = stream
         self.pages = []
         self.doc = None
         self.sheet_name_to_index = dict()
@@ -280,8 +389,36 @@ class XLSXDocumentText:
                         return True
         return False
 
+    def close(self):
+        """
+        The workbook is closed once it is read, so there is nothing to
+        release. For the same use as `DocumentText.close`.
+        """
+        self.doc = None
+        self.stream = None
+
+    def __enter__(self) -> 'XLSXDocumentText':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
     def _read_xlsx_file(self) -> None:
-        wb = openpyxl.load_workbook(self.filepath)
+        source = self.stream
+        if source is None:
+            if split_archive_path(self.filepath) is not None:
+                source = read_document(self.filepath)
+            else:
+                source = self.filepath
+        elif isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        wb = openpyxl.load_workbook(source)
+        try:
+            self._read_workbook(wb)
+        finally:
+            wb.close()
+
+    def _read_workbook(self, wb) -> None:
         for sheet_index, sheet in enumerate(wb.sheetnames):
             ws = wb[sheet]
             hidden_columns = {
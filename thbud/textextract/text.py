@@ -206,6 +206,8 @@ class PageText:
         width (float): The width of the page.
         height (float): The height of the page.
         is_image (bool): Whether the page is an image.
+        tables (List[Table]): The tables found in the ruling lines of the page,
+            with the words of the page assigned to their cells.
     """
 
     def __init__(
@@ -232,6 +234,7 @@ class PageText:
         self.is_image = is_image
         self.is_skipped = False
         self.contains_table = False
+        self.tables = []
         self._page_number = -1
         self.doc_id = None
         self.document = document
@@ -254,6 +257,12 @@ class PageText:
     def __repr__(self) -> str:
         return f'PageText({self.lines})'
 
+    def get_table_rows(self) -> List[List[List[str]]]:
+        """
+        Returns the text of every table on the page as rows of cell texts.
+        """
+        return [table.to_rows() for table in self.tables]
+
     def get_lines_with_begin_tokens(self, x0_tolerance=0.005) -> List[LineText]:
         TOKENS = ['<begin>', '<begin_indent>']
         x0_list = []
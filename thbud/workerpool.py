@@ -0,0 +1,183 @@
+"""
+A pool of worker processes that are replaced after a number of tasks or
+once their memory grows past a ceiling, for long batch runs whose workers
+would otherwise keep the memory of every document they parsed.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+# why a worker was replaced
+TASKS = 'tasks'
+RSS = 'rss'
+CRASH = 'crash'
+
+
+def rss_bytes() -> int:
+    """
+    Returns the resident set size of this process, or its peak where the
+    current size is not available.
+    """
+    try:
+        with open('/proc/self/statm') as fp:
+            return int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class WorkerError(Exception):
+    """
+    Exception raised in a worker. The exception itself may not be
+    picklable, so its type name, message and traceback are sent instead.
+    """
+
+    def __init__(self, type_name: str, message: str, traceback: str):
+        super().__init__(f'{type_name}: {message}')
+        self.type_name = type_name
+        self.message = message
+        self.traceback = traceback
+
+
+class WorkerCrashedError(Exception):
+    """
+    Exception when a worker process exits while it runs a task, e.g. when
+    it is killed for running out of memory.
+    """
+
+
+def _worker_main(conn, fn, max_tasks: Optional[int], max_rss: Optional[int]):
+    tasks = 0
+    while True:
+        try:
+            arg = conn.recv()
+        except EOFError:
+            return
+        try:
+            result = (True, fn(arg))
+        except Exception as e:
+            result = (False, (type(e).__name__, str(e), traceback.format_exc()))
+        tasks += 1
+
+        retire = None
+        if max_tasks is not None and tasks >= max_tasks:
+            retire = TASKS
+        elif max_rss is not None and rss_bytes() > max_rss:
+            retire = RSS
+        conn.send(result + (retire,))
+        if retire is not None:
+            return
+
+
+class _Worker:
+    def __init__(self, context, fn, max_tasks, max_rss):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, fn, max_tasks, max_rss),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def close(self):
+        self.conn.close()
+        self.process.join()
+
+
+class RecyclingPool:
+    """
+    Runs a function in `workers` processes. A worker is replaced after
+    `max_tasks` tasks, or after a task that leaves it with more than
+    `max_rss` bytes resident, or if it exits while running a task.
+
+    `run` blocks until the task is done, and can be called from several
+    threads, e.g. the workers of a `thbud.pipeline.Stage`, so at most
+    `workers` tasks run at once. The function and its argument and result
+    must be picklable.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[Any], Any],
+        workers: int = 1,
+        max_tasks: Optional[int] = None,
+        max_rss: Optional[int] = None,
+        context: str = 'spawn',
+    ):
+        if workers < 1:
+            raise ValueError('A pool needs at least one worker')
+        self.fn = fn
+        self.max_tasks = max_tasks
+        self.max_rss = max_rss
+        self.context = multiprocessing.get_context(context)
+        self.replaced: Dict[str, int] = {TASKS: 0, RSS: 0, CRASH: 0}
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        self.workers = workers
+        for _ in range(workers):
+            self._idle.put(None)  # started on first use
+        self._closed = False
+
+    def _start(self) -> _Worker:
+        return _Worker(self.context, self.fn, self.max_tasks, self.max_rss)
+
+    def _retire(self, worker: _Worker, reason: str) -> None:
+        # the replacement is started on the next task
+        worker.close()
+        with self._lock:
+            self.replaced[reason] += 1
+        return None
+
+    def run(self, arg):
+        """
+        Runs the function on `arg` in a worker and returns its result.
+
+        Raises:
+            WorkerError: If the function raised.
+            WorkerCrashedError: If the worker exited before it returned.
+        """
+        if self._closed:
+            raise RuntimeError('The pool is closed')
+        worker = self._idle.get()
+        try:
+            if worker is None:
+                worker = self._start()
+            try:
+                worker.conn.send(arg)
+                ok, value, retire = worker.conn.recv()
+            except (EOFError, OSError, BrokenPipeError):
+                worker.process.join()
+                exitcode = worker.process.exitcode
+                worker = self._retire(worker, CRASH)
+                raise WorkerCrashedError(f'Worker exited with code {exitcode}')
+            if retire is not None:
+                worker = self._retire(worker, retire)
+        finally:
+            self._idle.put(worker)
+
+        if ok:
+            return value
+        raise WorkerError(*value)
+
+    def close(self):
+        """
+        Stops the workers. Must not be called while tasks run.
+        """
+        self._closed = True
+        for _ in range(self.workers):
+            worker = self._idle.get()
+            if worker is not None:
+                worker.close()
+
+    def __enter__(self) -> 'RecyclingPool':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()